@@ -19,6 +19,12 @@ from models.shelf import Shelf
 from models.slot import Slot
 from models.device import Device
 from models.movement import Movement
+from models.operator_position import OperatorPosition
+from models.inventory_snapshot import InventorySnapshot
+from models.picking_plan_stat import PickingPlanStat
+from models.inventory_version import InventoryVersion
+from models.picking_plan import PickingPlan
+from models.picking_plan_item import PickingPlanItem
 
 load_dotenv()
 
@@ -35,6 +41,14 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Ignora tabelas mensais de arquivo de movimentos (criadas em runtime)"""
+    if type_ == "table" and name.startswith("movements_archive_"):
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -63,6 +77,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -84,7 +99,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
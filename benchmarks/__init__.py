@@ -0,0 +1,8 @@
+"""
+Benchmarks algorítmicos dos planejadores, da alocação e do cálculo de distância.
+
+Uso:
+    python -m benchmarks run --sizes 10,100,1000 --output bench.json
+    python -m benchmarks run --save-baseline
+    python -m benchmarks compare benchmarks/baseline.json bench.json --threshold 0.10
+"""
@@ -0,0 +1,69 @@
+"""
+CLI dos benchmarks: python -m benchmarks {run,compare}
+"""
+from benchmarks.runner import (
+    BENCHMARKS, run_benchmarks, compare_results, load_results, save_results
+)
+import argparse
+import os
+import sys
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _parse_sizes(value: str):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Roda os benchmarks")
+    run.add_argument("--sizes", type=_parse_sizes, default=[10, 100, 1000],
+                     help="Tamanhos das listas de picking (ex: 10,100,1000,10000)")
+    run.add_argument("--only", default=None,
+                     help=f"Benchmarks separados por vírgula ({', '.join(BENCHMARKS)})")
+    run.add_argument("--repeat", type=int, default=3, help="Execuções cronometradas por benchmark")
+    run.add_argument("--seed", type=int, default=42, help="Semente dos dados gerados")
+    run.add_argument("--output", help="Arquivo JSON de saída")
+    run.add_argument("--save-baseline", action="store_true", help=f"Grava em {DEFAULT_BASELINE}")
+
+    compare = sub.add_parser("compare", help="Compara resultados com uma baseline")
+    compare.add_argument("baseline", help="JSON da baseline")
+    compare.add_argument("current", help="JSON dos resultados atuais")
+    compare.add_argument("--threshold", type=float, default=0.10,
+                         help="Piora relativa tolerada em tempo/memória (padrão 0.10 = 10%%)")
+    compare.add_argument("--quality-threshold", type=float, default=0.0,
+                         help="Piora relativa tolerada na distância das rotas (padrão 0)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        names = [n.strip() for n in args.only.split(",")] if args.only else None
+        document = run_benchmarks(args.sizes, names, args.repeat, args.seed)
+        if args.output:
+            save_results(document, args.output)
+            print(f"Resultados gravados em {args.output}")
+        if args.save_baseline:
+            save_results(document, DEFAULT_BASELINE)
+            print(f"Baseline gravada em {DEFAULT_BASELINE}")
+        return 0
+
+    rows, regressions = compare_results(
+        load_results(args.baseline), load_results(args.current),
+        args.threshold, args.quality_threshold
+    )
+    for row in rows:
+        flag = "  REGRESSÃO" if row in regressions else ""
+        print(f"{row['benchmark']:<32} {row['metric']:<8} {row['baseline']:>12} -> "
+              f"{row['current']:>12} ({row['change']:+.1%}){flag}")
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressão(ões) acima do limite")
+        return 1
+    print("\n✅ Nenhuma regressão acima do limite")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,357 @@
+"""
+Gerador de carga local: simula uma frota de coletores (scanners) e supervisores
+contra a API HTTP (uvicorn local) e reporta latência p50/p95/p99, erros
+(incluindo "database is locked" do SQLite) e vazão por endpoint.
+
+Uso:
+    uvicorn main:app --workers 1 &
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --concurrency 30 --rate 100 --duration 60
+    python -m benchmarks.loadtest --mix scan_in=50,scan_out=30,dashboard=20 --json loadtest.json
+
+Com --rate 0 roda em malha fechada (cada worker dispara a próxima requisição
+assim que recebe a resposta). Com --rate > 0 as chegadas seguem um processo de
+Poisson e a latência é medida a partir do instante agendado, para não esconder
+filas (coordinated omission).
+"""
+from collections import defaultdict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlencode
+import argparse
+import http.client
+import json
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+
+DEFAULT_MIX = "scan_in=35,scan_out=25,picking_plan=5,assign=5,dashboard=15,slots_available=10,device_lookup=5"
+
+LOCKED_MARKER = "database is locked"
+
+
+class Stats:
+    """Acumula latências e erros por endpoint (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, latency_ms: float, error: Optional[str]) -> None:
+        with self._lock:
+            self.latencies[endpoint].append(latency_ms)
+            if error:
+                self.errors[endpoint][error] += 1
+
+    def report(self, elapsed_sec: float) -> dict:
+        report = {}
+        with self._lock:
+            for endpoint, values in sorted(self.latencies.items()):
+                ordered = sorted(values)
+                errors = dict(self.errors.get(endpoint, {}))
+                report[endpoint] = {
+                    "requests": len(ordered),
+                    "throughput_rps": round(len(ordered) / elapsed_sec, 2) if elapsed_sec else 0.0,
+                    "p50_ms": round(_percentile(ordered, 50), 2),
+                    "p95_ms": round(_percentile(ordered, 95), 2),
+                    "p99_ms": round(_percentile(ordered, 99), 2),
+                    "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+                    "errors": sum(errors.values()),
+                    "locked": errors.get("locked", 0),
+                    "error_breakdown": errors,
+                }
+        return report
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    """Percentil por posto mais próximo (lista já ordenada)"""
+    if not ordered:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class DevicePool:
+    """Device_ids já alocados por este teste, disponíveis para saída/picking"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_stock = deque()
+        self._counter = 0
+        self._run_id = uuid.uuid4().hex[:6]
+
+    def new_id(self) -> str:
+        with self._lock:
+            self._counter += 1
+            return f"LT-{self._run_id}-{self._counter:07d}"
+
+    def add(self, device_id: str) -> None:
+        with self._lock:
+            self._in_stock.append(device_id)
+
+    def take(self, n: int = 1) -> List[str]:
+        with self._lock:
+            taken = []
+            while self._in_stock and len(taken) < n:
+                taken.append(self._in_stock.popleft())
+            return taken
+
+    def peek(self) -> Optional[str]:
+        with self._lock:
+            return self._in_stock[0] if self._in_stock else None
+
+
+class Client:
+    """Conexão HTTP keep-alive de um worker"""
+
+    def __init__(self, base_url: str, operator_id: str, timeout: float):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.timeout = timeout
+        self.operator_id = operator_id
+        self.conn = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.conn = cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[dict] = None) -> Tuple[int, bytes]:
+        headers = dict(headers or {})
+        headers["X-Operator-Id"] = self.operator_id
+        for attempt in range(2):
+            if self.conn is None:
+                self._connect()
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        raise ConnectionError("unreachable")
+
+
+def _json_body(payload: dict) -> Tuple[bytes, dict]:
+    return json.dumps(payload).encode("utf-8"), {"Content-Type": "application/json"}
+
+
+def _csv_upload(device_ids: List[str]) -> Tuple[bytes, dict]:
+    """Multipart com csv_file (formato aceito por /assign/auto e /picking/plan)"""
+    boundary = uuid.uuid4().hex
+    content = "\n".join(device_ids).encode("utf-8")
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="csv_file"; filename="ids.csv"\r\n'
+        f"Content-Type: text/csv\r\n\r\n"
+    ).encode("utf-8") + content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+def _classify(status: int, body: bytes) -> Optional[str]:
+    text = body[:4096].decode("utf-8", errors="replace")
+    if LOCKED_MARKER in text:
+        return "locked"
+    if status >= 500:
+        return "http_5xx"
+    if status >= 400 and status != 404:
+        return "http_4xx"
+    if '"success":false' in text.replace(" ", ""):
+        return "app_error"
+    return None
+
+
+def op_scan_in(client: Client, pool: DevicePool) -> Tuple[int, bytes]:
+    device_id = pool.new_id()
+    body, headers = _json_body({"device_id": device_id})
+    status, data = client.request("POST", "/scan/in", body, headers)
+    if status == 200 and b'"success":true' in data.replace(b" ", b""):
+        pool.add(device_id)
+    return status, data
+
+
+def op_scan_out(client: Client, pool: DevicePool) -> Tuple[int, bytes]:
+    taken = pool.take(1)
+    device_id = taken[0] if taken else pool.new_id()
+    body, headers = _json_body({"device_id": device_id})
+    return client.request("POST", "/scan/out", body, headers)
+
+
+def op_picking_plan(client: Client, pool: DevicePool, plan_size: int = 20) -> Tuple[int, bytes]:
+    device_ids = pool.take(plan_size) or [pool.new_id()]
+    body, headers = _csv_upload(device_ids)
+    return client.request("POST", "/picking/plan", body, headers)
+
+
+def op_assign(client: Client, pool: DevicePool, batch: int = 5) -> Tuple[int, bytes]:
+    device_ids = [pool.new_id() for _ in range(batch)]
+    body, headers = _csv_upload(device_ids)
+    status, data = client.request("POST", "/assign/auto", body, headers)
+    if status == 200:
+        for device_id in device_ids:
+            pool.add(device_id)
+    return status, data
+
+
+def op_dashboard(client: Client, pool: DevicePool) -> Tuple[int, bytes]:
+    return client.request("GET", "/")
+
+
+def op_slots_available(client: Client, pool: DevicePool) -> Tuple[int, bytes]:
+    return client.request("GET", "/slots/available?" + urlencode({"limit": 50}))
+
+
+def op_device_lookup(client: Client, pool: DevicePool) -> Tuple[int, bytes]:
+    device_id = pool.peek() or "LT-missing"
+    return client.request("GET", f"/devices/{device_id}")
+
+
+OPERATIONS: Dict[str, Callable[[Client, DevicePool], Tuple[int, bytes]]] = {
+    "scan_in": op_scan_in,
+    "scan_out": op_scan_out,
+    "picking_plan": op_picking_plan,
+    "assign": op_assign,
+    "dashboard": op_dashboard,
+    "slots_available": op_slots_available,
+    "device_lookup": op_device_lookup,
+}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Operação desconhecida: {name} ({', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    if not mix:
+        raise ValueError("Mix vazio")
+    return mix
+
+
+def run_load(
+    base_url: str,
+    concurrency: int,
+    duration_sec: float,
+    rate: float,
+    mix: Dict[str, float],
+    timeout: float = 30.0,
+    random_seed: Optional[int] = None
+) -> dict:
+    """Executa a carga e retorna o relatório por endpoint"""
+    rng = random.Random(random_seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    stats = Stats()
+    pool = DevicePool()
+    deadline = time.perf_counter() + duration_sec
+    work: "queue.Queue[Optional[Tuple[str, float]]]" = queue.Queue()
+
+    def execute(client: Client, name: str, scheduled: float) -> None:
+        error = None
+        try:
+            status, body = OPERATIONS[name](client, pool)
+            error = _classify(status, body)
+        except Exception as e:
+            error = "locked" if LOCKED_MARKER in str(e) else f"conn_error:{type(e).__name__}"
+        stats.record(name, (time.perf_counter() - scheduled) * 1000, error)
+
+    def open_loop_worker(index: int) -> None:
+        client = Client(base_url, f"loadtest-{index}", timeout)
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            execute(client, *item)
+
+    def closed_loop_worker(index: int) -> None:
+        client = Client(base_url, f"loadtest-{index}", timeout)
+        worker_rng = random.Random(rng.random())
+        while time.perf_counter() < deadline:
+            name = worker_rng.choices(names, weights)[0]
+            execute(client, name, time.perf_counter())
+
+    target = closed_loop_worker if rate <= 0 else open_loop_worker
+    threads = [threading.Thread(target=target, args=(i,), daemon=True) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    if rate > 0:
+        # Chegadas de Poisson: intervalos exponenciais com média 1/rate
+        next_at = started
+        while next_at < deadline:
+            now = time.perf_counter()
+            if next_at > now:
+                time.sleep(next_at - now)
+            work.put((rng.choices(names, weights)[0], next_at))
+            next_at += rng.expovariate(rate)
+        for _ in threads:
+            work.put(None)
+
+    for t in threads:
+        t.join()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "config": {
+            "url": base_url,
+            "concurrency": concurrency,
+            "duration_sec": duration_sec,
+            "rate": rate,
+            "mix": mix,
+        },
+        "elapsed_sec": round(elapsed, 2),
+        "endpoints": stats.report(elapsed),
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\nDuração: {report['elapsed_sec']}s  concorrência: {report['config']['concurrency']}  "
+          f"taxa: {report['config']['rate'] or 'malha fechada'}")
+    header = f"{'endpoint':<18}{'reqs':>8}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'erros':>8}{'locked':>8}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, row in report["endpoints"].items():
+        print(f"{endpoint:<18}{row['requests']:>8}{row['throughput_rps']:>9.1f}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+              f"{row['max_ms']:>10.1f}{row['errors']:>8}{row['locked']:>8}")
+    print("(latências em ms)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL base da API")
+    parser.add_argument("--concurrency", type=int, default=30, help="Workers simultâneos (scanners)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duração em segundos")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Chegadas por segundo (Poisson); 0 = malha fechada")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Pesos por operação (nome=peso,...)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por requisição (s)")
+    parser.add_argument("--seed", type=int, default=None, help="Semente do gerador")
+    parser.add_argument("--json", dest="json_path", help="Grava o relatório em JSON")
+    args = parser.parse_args(argv)
+
+    report = run_load(
+        args.url, args.concurrency, args.duration, args.rate,
+        parse_mix(args.mix), args.timeout, args.seed
+    )
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Execução dos benchmarks, gravação de resultados/baselines em JSON e comparação
+"""
+from sqlalchemy.orm import Session
+from models.slot import Slot
+from services.distance_service import DistanceService
+from services.assignment_service import AssignmentService
+from services.picking_service import PickingService
+from benchmarks.warehouse import create_warehouse, pick_list
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+
+# Chamadas por medição do kernel de distância
+DISTANCE_CALLS = 100_000
+
+
+def measure(fn: Callable[[], Optional[float]], repeat: int) -> dict:
+    """
+    Mede fn: tempo de parede (mediana/mínimo de `repeat` execuções sem tracemalloc)
+    e alocações (pico e blocos vivos) em uma execução extra sob tracemalloc.
+    fn pode retornar a qualidade da solução (menor é melhor).
+    """
+    timings = []
+    quality = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        quality = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        fn()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+
+    return {
+        "wall_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "peak_kb": round(peak / 1024, 1),
+        "alloc_blocks": blocks,
+        "quality": quality,
+    }
+
+
+def _route_quality(start_slot: Slot, route: List[Slot]) -> float:
+    if not route:
+        return 0.0
+    return DistanceService.calculate_distance(start_slot, route[0]) + PickingService._route_distance(route)
+
+
+def _target_slots(db: Session, device_ids: List[str]) -> Tuple[Slot, List[Slot]]:
+    start_slot = AssignmentService.get_default_start_slot(db)
+    device_slot_map = PickingService.get_device_slots(db, device_ids)
+    return start_slot, [device_slot_map[d] for d in device_ids if d in device_slot_map]
+
+
+def bench_distance(db: Session, size: int, repeat: int) -> dict:
+    slots = db.query(Slot).limit(2000).all()
+    rng = random.Random(size)
+    pairs = [(rng.choice(slots), rng.choice(slots)) for _ in range(DISTANCE_CALLS)]
+    calc = DistanceService.calculate_distance
+
+    def run():
+        for a, b in pairs:
+            calc(a, b)
+
+    result = measure(run, repeat)
+    result["calls"] = DISTANCE_CALLS
+    return result
+
+
+def bench_nearest_neighbor(db: Session, size: int, repeat: int) -> dict:
+    start_slot, targets = _target_slots(db, pick_list(db, size))
+    return measure(
+        lambda: _route_quality(start_slot, PickingService.nearest_neighbor_route(start_slot, targets)),
+        repeat
+    )
+
+
+def bench_two_opt(db: Session, size: int, repeat: int) -> dict:
+    start_slot, targets = _target_slots(db, pick_list(db, size))
+    initial = PickingService.nearest_neighbor_route(start_slot, targets)
+    result = measure(
+        lambda: _route_quality(start_slot, PickingService.two_opt_improve(initial)),
+        repeat
+    )
+    result["initial_quality"] = _route_quality(start_slot, initial)
+    return result
+
+
+def bench_find_nearest_free_slot(db: Session, size: int, repeat: int) -> dict:
+    start_slot = AssignmentService.get_default_start_slot(db)
+
+    def run():
+        slot = AssignmentService.find_nearest_free_slot(db, start_slot)
+        return DistanceService.calculate_distance(start_slot, slot) if slot else None
+
+    return measure(run, repeat)
+
+
+def bench_picking_plan(db: Session, size: int, repeat: int) -> dict:
+    device_ids = pick_list(db, size)
+    return measure(
+        lambda: PickingService.create_picking_plan(db, device_ids)["total_distance"],
+        repeat
+    )
+
+
+BENCHMARKS: Dict[str, Callable[[Session, int, int], dict]] = {
+    "distance": bench_distance,
+    "nearest_neighbor": bench_nearest_neighbor,
+    "two_opt": bench_two_opt,
+    "find_nearest_free_slot": bench_find_nearest_free_slot,
+    "picking_plan": bench_picking_plan,
+}
+
+# Benchmarks cujo custo não depende do tamanho da lista de picking
+SIZE_INDEPENDENT = {"distance"}
+
+
+def run_benchmarks(
+    sizes: List[int],
+    names: Optional[List[str]] = None,
+    repeat: int = 3,
+    random_seed: int = 42,
+    log: Callable[[str], None] = print
+) -> dict:
+    """Roda os benchmarks selecionados para cada tamanho e retorna o documento de resultados"""
+    names = names or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Benchmarks desconhecidos: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for size in sizes:
+        db = create_warehouse(size, random_seed=random_seed)
+        try:
+            for name in names:
+                if name in SIZE_INDEPENDENT and size != sizes[0]:
+                    continue
+                key = name if name in SIZE_INDEPENDENT else f"{name}[{size}]"
+                results[key] = BENCHMARKS[name](db, size, repeat)
+                log(f"{key:<32} {results[key]['wall_ms']:>12.3f} ms  "
+                    f"peak {results[key]['peak_kb']:>10.1f} KiB  quality {results[key]['quality']}")
+        finally:
+            db.close()
+
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "sizes": sizes,
+            "repeat": repeat,
+            "random_seed": random_seed,
+        },
+        "results": results,
+    }
+
+
+def compare_results(
+    baseline: dict,
+    current: dict,
+    threshold: float = 0.10,
+    quality_threshold: float = 0.0
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Compara dois documentos de resultados.
+    Regressão: tempo ou pico de memória acima de baseline * (1 + threshold),
+    ou qualidade de rota acima de baseline * (1 + quality_threshold).
+    Retorna (linhas da comparação, regressões).
+    """
+    rows = []
+    regressions = []
+    base_results = baseline.get("results", {})
+    for key, cur in current.get("results", {}).items():
+        base = base_results.get(key)
+        if base is None:
+            continue
+
+        checks = [
+            ("wall_ms", threshold),
+            ("peak_kb", threshold),
+            ("quality", quality_threshold),
+        ]
+        for metric, limit in checks:
+            old, new = base.get(metric), cur.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+            row = {"benchmark": key, "metric": metric, "baseline": old, "current": new, "change": change}
+            rows.append(row)
+            if change > limit:
+                regressions.append(row)
+
+    return rows, regressions
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(document: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
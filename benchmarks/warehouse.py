@@ -0,0 +1,52 @@
+"""
+Armazéns sintéticos em SQLite em memória, populados como o seed.py
+"""
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from models.database import Base
+from models.device import Device
+from seed import build_topology, seed_topology, seed_synthetic_inventory
+from services.topology_registry import TopologyRegistry
+from typing import List
+import math
+import random
+
+# Dimensões de cada prateleira nos armazéns gerados (iguais à topologia fixa)
+ROWS = 24
+COLS = 40
+SHELVES_PER_AISLE = 2
+
+
+def create_warehouse(devices: int, random_seed: int = 42, free_ratio: float = 0.5) -> Session:
+    """
+    Cria um banco em memória com ruas suficientes para `devices` ocupando
+    no máximo (1 - free_ratio) dos slots, e retorna uma sessão aberta.
+    """
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+
+    slots_per_aisle = SHELVES_PER_AISLE * ROWS * COLS
+    needed_slots = max(devices / max(1.0 - free_ratio, 0.01), 1)
+    aisles = max(3, math.ceil(needed_slots / slots_per_aisle))
+
+    db = sessionmaker(bind=engine, autoflush=False)()
+    seed_topology(db, build_topology(aisles, SHELVES_PER_AISLE, ROWS, COLS))
+    if devices:
+        seed_synthetic_inventory(db, devices, random_seed=random_seed)
+    db.commit()
+
+    # Registro de topologia é por processo: apontar para o armazém recém-criado
+    TopologyRegistry.load(db)
+    return db
+
+
+def pick_list(db: Session, size: int, random_seed: int = 42) -> List[str]:
+    """Sorteia `size` device_ids em estoque (determinístico pela semente)"""
+    device_ids = [row[0] for row in db.execute(select(Device.device_id).order_by(Device.id))]
+    rng = random.Random(random_seed)
+    return rng.sample(device_ids, min(size, len(device_ids)))
@@ -1,29 +1,44 @@
 """
 Aplicação principal FastAPI para gestão de slots e picking
 """
-from fastapi import FastAPI, Request, Depends, Form, UploadFile, File
+from fastapi import FastAPI, Request, Depends, Form, UploadFile, File, Query, HTTPException
 from fastapi.responses import HTMLResponse
-from jinja2 import Environment, FileSystemLoader
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import Optional
 import os
-from models.database import get_db, Base, engine
+import time
+import asyncio
+from models.database import get_db, Base, engine, SessionLocal
 from models.slot import Slot
 from models.device import Device, DeviceStatus
 from models.movement import Movement
-from routers import slots_router, assign_router, picking_router, scan_router, devices_router
+from routers import slots_router, assign_router, picking_router, scan_router, devices_router, movements_router, inventory_router, metrics_router, profiles_router, changes_router, exports_router, backups_router, cost_profiles_router
+from routers.dependencies import get_operator_id, get_cost_profile, inventory_cache_key
 from services.assignment_service import AssignmentService
 from services.picking_service import PickingService
-
-# Configurar templates Jinja2
-template_env = Environment(loader=FileSystemLoader("templates"))
+from services.movement_archive_service import MovementArchiveService, run_compactor
+from services.snapshot_service import InventorySnapshotService, run_snapshotter
+from services.backup_service import BackupService, run_backup_scheduler
+from services.distance_service import DistanceService
+from services.cost_profile_service import CostProfile, CostProfileService, run_cost_profile_watcher
+from services.layout_service import LayoutService
+from services.metrics import REQUEST_LATENCY, REQUEST_DB_QUERIES
+from services.query_monitor import QueryMonitor
+from services.profiling_service import ProfilingService
+from services.template_renderer import TemplateRenderer
+from services.nearest_slot_service import NearestSlotService, InvalidCursor
+from services.inventory_version_service import InventoryVersionService, FragmentCache
+from services.topology_registry import TopologyRegistry, run_topology_watcher
 
 def render_template(template_name: str, context: dict):
     """Renderiza um template Jinja2 e retorna HTMLResponse"""
-    template = template_env.get_template(template_name)
-    html_content = template.render(**context)
-    return HTMLResponse(content=html_content)
+    return TemplateRenderer.render(template_name, context)
+
+
+def stream_template(template_name: str, context: dict):
+    """Renderiza um template Jinja2 em streaming (parciais com muitas linhas)"""
+    return TemplateRenderer.stream(template_name, context)
 
 # Criar diretório storage se não existir
 os.makedirs("storage", exist_ok=True)
@@ -37,6 +52,101 @@ app.include_router(assign_router)
 app.include_router(picking_router)
 app.include_router(scan_router)
 app.include_router(devices_router)
+app.include_router(movements_router)
+app.include_router(inventory_router)
+app.include_router(metrics_router)
+app.include_router(profiles_router)
+app.include_router(changes_router)
+app.include_router(exports_router)
+app.include_router(backups_router)
+app.include_router(cost_profiles_router)
+
+# Contagem/tempo de statements SQL por requisição, statements lentos e detector de N+1
+QueryMonitor.instrument(engine)
+
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Latência e statements SQL por rota (template da rota, não o path concreto)"""
+    started = time.perf_counter()
+    queries = QueryMonitor.start_request(f"{request.method} {request.url.path}")
+    status = "5xx"
+    try:
+        response = await call_next(request)
+        status = f"{response.status_code // 100}xx"
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        REQUEST_LATENCY.labels(request.method, route_path, status).observe(
+            time.perf_counter() - started
+        )
+        REQUEST_DB_QUERIES.labels(route_path).observe(queries.count)
+
+
+@app.middleware("http")
+async def etag_middleware(request: Request, call_next):
+    """Aplica o ETag da versão do inventário definido pela dependência inventory_cache_key"""
+    response = await call_next(request)
+    etag = getattr(request.state, "etag", None)
+    if etag and response.status_code == 200:
+        response.headers["ETag"] = etag
+        # Sempre revalidar: o ETag muda a cada mutação do inventário
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+# Corpo gravado no profile (truncado)
+PROFILE_BODY_LIMIT = 64 * 1024
+
+
+@app.middleware("http")
+async def profiling_middleware(request: Request, call_next):
+    """
+    Profile de CPU (amostragem) e memória (tracemalloc) da requisição quando
+    o header X-Profile (ou ?profile=) traz o PROFILING_TOKEN
+    """
+    token = request.headers.get("x-profile") or request.query_params.get("profile")
+    if not token or not ProfilingService.is_authorized(token):
+        return await call_next(request)
+
+    profile = ProfilingService.start()
+    if profile is None:
+        response = await call_next(request)
+        response.headers["X-Profile"] = "busy"
+        return response
+
+    # Ler o corpo para gravá-lo junto e reentregá-lo à aplicação
+    body = await request.body()
+
+    async def replay_body():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    status = 500
+    try:
+        response = await call_next(Request(request.scope, replay_body))
+        status = response.status_code
+    finally:
+        route = request.scope.get("route")
+        name = ProfilingService.finish(profile, {
+            "method": request.method,
+            "path": request.url.path,
+            "route": getattr(route, "path", None),
+            "query": {k: v for k, v in request.query_params.multi_items() if k != "profile"},
+            "path_params": request.scope.get("path_params", {}),
+            "headers": {
+                k: v for k, v in request.headers.items()
+                if k in ("content-type", "x-operator-id", "user-agent")
+            },
+            "body": body[:PROFILE_BODY_LIMIT].decode("utf-8", errors="replace"),
+            "body_truncated": len(body) > PROFILE_BODY_LIMIT,
+            "status": status,
+        })
+    response.headers["X-Profile-Id"] = name
+    return response
+
+# Tarefas em background iniciadas na startup
+_background_tasks = []
 
 
 @app.on_event("startup")
@@ -44,10 +154,77 @@ async def startup_event():
     """Inicializar banco de dados na startup"""
     Base.metadata.create_all(bind=engine)
 
+    # Linha da versão do inventário (ETags/cache de leituras) e registro de topologia
+    db = SessionLocal()
+    try:
+        InventoryVersionService.ensure_row(db)
+        TopologyRegistry.load(db)
+    finally:
+        db.close()
+
+    # Compilar templates antes da primeira requisição
+    TemplateRenderer.precompile()
+
+    # Modelo físico de distâncias (tabela pré-calculada e mapeada em memória)
+    if DistanceService.DISTANCE_MODEL == "layout":
+        db = SessionLocal()
+        try:
+            DistanceService.set_layout(LayoutService.load_or_build(db))
+        finally:
+            db.close()
+
+    # Perfis de custo (embutidos + COST_PROFILES_FILE)
+    CostProfileService.profiles()
+
+    # Ranking de distâncias do ponto de partida padrão (primeira página de slots livres)
+    db = SessionLocal()
+    try:
+        start_slot = AssignmentService.get_default_start_slot(db)
+        if start_slot:
+            NearestSlotService.ranking(db, start_slot)
+    finally:
+        db.close()
+
+    # Compactador do histórico de movimentos (somente se houver retenção configurada)
+    if MovementArchiveService.RETENTION_DAYS > 0:
+        _background_tasks.append(asyncio.create_task(run_compactor()))
+
+    # Recarga da topologia (e do layout) quando a geometria dos slots muda
+    if TopologyRegistry.CHECK_INTERVAL_SEC > 0:
+        _background_tasks.append(asyncio.create_task(run_topology_watcher()))
+
+    # Recarga dos perfis de custo quando o arquivo muda
+    if CostProfileService.CHECK_INTERVAL_SEC > 0:
+        _background_tasks.append(asyncio.create_task(run_cost_profile_watcher()))
+
+    # Fotos periódicas do inventário para consultas "as-of"
+    if InventorySnapshotService.INTERVAL_SEC > 0:
+        _background_tasks.append(asyncio.create_task(run_snapshotter()))
+
+    # Backups online do banco (somente SQLite em arquivo)
+    if BackupService.INTERVAL_SEC > 0 and BackupService.database_path():
+        _background_tasks.append(asyncio.create_task(run_backup_scheduler()))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Cancelar tarefas em background"""
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
+
 
 @app.get("/", response_class=HTMLResponse)
-async def dashboard(request: Request, db: Session = Depends(get_db)):
-    """Dashboard principal"""
+async def dashboard(
+    request: Request,
+    db: Session = Depends(get_db),
+    cache_key: tuple = Depends(inventory_cache_key)
+):
+    """Dashboard principal (em cache até a próxima mutação do inventário)"""
+    cached = FragmentCache.response(cache_key)
+    if cached is not None:
+        return cached
+
     # Contar slots totais
     total_slots = db.query(func.count(Slot.id)).scalar() or 0
 
@@ -75,13 +252,14 @@ async def dashboard(request: Request, db: Session = Depends(get_db)):
             if slot:
                 movement.from_slot_human_code = slot.human_code
 
-    return render_template("index.html", {
+    return FragmentCache.store(cache_key, render_template("index.html", {
         "request": request,
         "total_slots": total_slots,
         "free_slots": free_slots,
         "devices_in_stock": devices_in_stock,
-        "recent_movements": recent_movements
-    })
+        "recent_movements": recent_movements,
+        "inventory_version": cache_key[2]
+    }))
 
 
 @app.get("/assign", response_class=HTMLResponse)
@@ -114,7 +292,9 @@ async def assign_devices_auto_template(
     request: Request,
     device_ids: Optional[str] = Form(None),
     csv_file: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    operator_id: Optional[str] = Depends(get_operator_id),
+    profile: Optional[CostProfile] = Depends(get_cost_profile)
 ):
     """Renderiza template parcial com resultado da alocação"""
     # Processar device_ids
@@ -147,7 +327,9 @@ async def assign_devices_auto_template(
         })
 
     # Chamar serviço
-    result = AssignmentService.assign_devices_auto(db, device_ids_list)
+    result = AssignmentService.assign_devices_auto(
+        db, device_ids_list, operator_id=operator_id, profile=profile
+    )
 
     return render_template("partials/assign_result.html", {
         "request": request,
@@ -163,7 +345,9 @@ async def create_picking_plan_template(
     request: Request,
     device_ids: Optional[str] = Form(None),
     csv_file: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    operator_id: Optional[str] = Depends(get_operator_id),
+    profile: Optional[CostProfile] = Depends(get_cost_profile)
 ):
     """Renderiza template parcial com plano de picking"""
     # Processar device_ids
@@ -195,76 +379,82 @@ async def create_picking_plan_template(
         })
 
     # Chamar serviço
-    result = PickingService.create_picking_plan(db, device_ids_list)
+    result = PickingService.create_picking_plan(
+        db, device_ids_list, operator_id=operator_id, profile=profile
+    )
+    # Grava a estatística do plano (pré-visualização: nada mais pendente)
+    db.commit()
 
     # Adicionar flag picked=False para cada item
     route = result.get("route", [])
     for item in route:
         item["picked"] = False
 
-    return render_template("partials/picking_result.html", {
+    return stream_template("partials/picking_result.html", {
         "request": request,
         "route": route,
         "total_distance": result.get("total_distance", 0.0),
-        "start_position": result.get("start_position")
+        "start_position": result.get("start_position"),
+        "quality": result.get("quality")
     })
 
 
 @app.get("/slots/available/htmx", response_class=HTMLResponse)
 async def get_available_slots_template(
     request: Request,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    rows_only: bool = False,
     start_rua: Optional[int] = None,
     start_prateleira: Optional[str] = None,
     start_linha: Optional[int] = None,
     start_coluna: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache_key: tuple = Depends(inventory_cache_key)
 ):
-    """Renderiza template parcial com slots livres"""
-    # Determinar ponto inicial
-    if start_rua and start_prateleira and start_linha and start_coluna:
-        from services.codecs import row_to_letter
-        row_letter = row_to_letter(start_linha)
-        human_code = f"R{start_rua}-{start_prateleira}-{row_letter}-C{start_coluna}"
-        start_slot = db.query(Slot).filter(Slot.human_code == human_code).first()
-    else:
-        start_slot = AssignmentService.get_default_start_slot(db)
-
-    if not start_slot:
-        # Se não encontrar ponto inicial, retornar slots livres sem ordenação
-        slots = db.query(Slot).filter(Slot.occupied == False).limit(limit).all()
-        return render_template("partials/slots_result.html", {
-            "request": request,
-            "slots": slots
-        })
-
-    # Buscar slots livres e calcular distâncias
-    from services.distance_service import DistanceService
-    free_slots = db.query(Slot).filter(Slot.occupied == False).all()
-
-    slots_with_distance = [
-        (slot, DistanceService.calculate_distance(start_slot, slot))
-        for slot in free_slots
-    ]
-
-    # Ordenar por distância
-    slots_with_distance.sort(key=lambda x: x[1])
-
-    # Limitar resultados
-    slots_with_distance = slots_with_distance[:limit]
-
-    slots = [s for s, _ in slots_with_distance]
-
-    # Buscar informações relacionadas (aisle e shelf)
+    """
+    Renderiza template parcial com slots livres, uma página por vez (limit/cursor).
+    A última linha da página carrega a próxima ao ficar visível (scroll infinito);
+    com rows_only=1 devolve só as linhas, para anexar à tabela existente.
+    """
+    start_slot = None
+    if not cursor:
+        start_slot = NearestSlotService.start_slot_from_params(
+            db, start_rua, start_prateleira, start_linha, start_coluna
+        )
+
+    try:
+        results, next_cursor = NearestSlotService.nearest_free(db, start_slot, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    slots = [slot for slot, _ in results]
+
+    # Buscar informações relacionadas (aisle e shelf) em lote
     from models.aisle import Aisle
     from models.shelf import Shelf
+    aisles = {a.id: a for a in db.query(Aisle).filter(Aisle.id.in_({s.aisle_id for s in slots}))}
+    shelves = {sh.id: sh for sh in db.query(Shelf).filter(Shelf.id.in_({s.shelf_id for s in slots}))}
     for slot in slots:
-        slot.aisle = db.query(Aisle).filter(Aisle.id == slot.aisle_id).first()
-        slot.shelf = db.query(Shelf).filter(Shelf.id == slot.shelf_id).first()
+        slot.aisle = aisles.get(slot.aisle_id)
+        slot.shelf = shelves.get(slot.shelf_id)
+
+    next_url = None
+    if next_cursor:
+        next_page = request.url.include_query_params(cursor=next_cursor, rows_only=1)
+        next_url = f"{next_page.path}?{next_page.query}"
+
+    if rows_only:
+        return stream_template("partials/slots_rows.html", {
+            "request": request,
+            "slots": slots,
+            "next_url": next_url
+        })
 
-    return render_template("partials/slots_result.html", {
+    return stream_template("partials/slots_result.html", {
         "request": request,
-        "slots": slots
+        "slots": slots,
+        "total": db.query(func.count(Slot.id)).filter(Slot.occupied == False).scalar() or 0,
+        "next_url": next_url
     })
 
 
@@ -272,9 +462,14 @@ async def get_available_slots_template(
 async def search_devices_template(
     request: Request,
     query: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache_key: tuple = Depends(inventory_cache_key)
 ):
     """Renderiza template parcial com resultados da busca"""
+    cached = FragmentCache.response(cache_key)
+    if cached is not None:
+        return cached
+
     # Buscar por device_id
     from models.device import Device
     from models.slot import Slot
@@ -283,14 +478,10 @@ async def search_devices_template(
         Device.device_id.ilike(f"%{query}%")
     ).all()
 
-    # Buscar por human_code do slot
-    slots = db.query(Slot).filter(
+    # Buscar por human_code do slot (join, sem lista de slot_ids no IN)
+    devices_by_slot = db.query(Device).join(Slot, Device.slot_id == Slot.id).filter(
         Slot.human_code.ilike(f"%{query}%")
     ).all()
-    slot_ids = [s.id for s in slots]
-    devices_by_slot = db.query(Device).filter(
-        Device.slot_id.in_(slot_ids)
-    ).all() if slot_ids else []
 
     # Combinar resultados (sem duplicatas)
     all_devices = {}
@@ -322,10 +513,10 @@ async def search_devices_template(
             "col": col
         })
 
-    return render_template("partials/search_result.html", {
+    return FragmentCache.store(cache_key, render_template("partials/search_result.html", {
         "request": request,
         "results": results
-    })
+    }))
 
 
 if __name__ == "__main__":
@@ -4,6 +4,12 @@ from .shelf import Shelf
 from .slot import Slot
 from .device import Device
 from .movement import Movement
+from .operator_position import OperatorPosition
+from .inventory_snapshot import InventorySnapshot
+from .picking_plan_stat import PickingPlanStat
+from .inventory_version import InventoryVersion
+from .picking_plan import PickingPlan
+from .picking_plan_item import PickingPlanItem
 
-__all__ = ["Base", "get_db", "engine", "Aisle", "Shelf", "Slot", "Device", "Movement"]
+__all__ = ["Base", "get_db", "engine", "Aisle", "Shelf", "Slot", "Device", "Movement", "OperatorPosition", "InventorySnapshot", "PickingPlanStat", "InventoryVersion", "PickingPlan", "PickingPlanItem"]
 
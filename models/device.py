@@ -20,6 +20,7 @@ class Device(Base):
     index = Column(Integer)  # Índice para ordenação
     status = Column(SQLEnum(DeviceStatus), default=DeviceStatus.OUT_STOCK, nullable=False)
     slot_id = Column(Integer, ForeignKey("slots.id"), unique=True, nullable=True)
+    plan_id = Column(String, ForeignKey("picking_plans.id"), nullable=True, index=True)  # Plano que reservou o device
 
     slot = relationship("Slot", back_populates="device")
     movements = relationship("Movement", back_populates="device")
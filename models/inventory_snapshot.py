@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, DateTime, JSON
+from sqlalchemy.sql import func
+from .database import Base
+
+
+class InventorySnapshot(Base):
+    """Foto compacta do inventário (device_id -> slot_id) em um instante"""
+    __tablename__ = "inventory_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    ts = Column(DateTime, server_default=func.now(), nullable=False, index=True)
+    last_movement_id = Column(Integer, nullable=False)  # Último movimento refletido na foto
+    device_count = Column(Integer, nullable=False, default=0)
+    data = Column(JSON, nullable=False)  # {device_id: slot_id}
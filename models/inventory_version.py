@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.sql import func
+from .database import Base
+
+
+class InventoryVersion(Base):
+    """Versão do inventário (linha única), incrementada na mesma transação de cada mutação"""
+    __tablename__ = "inventory_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
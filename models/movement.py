@@ -22,8 +22,9 @@ class Movement(Base):
     from_slot_id = Column(Integer, ForeignKey("slots.id"), nullable=True)
     to_slot_id = Column(Integer, ForeignKey("slots.id"), nullable=True)
     type = Column(SQLEnum(MovementType), nullable=False)
-    ts = Column(DateTime, server_default=func.now(), nullable=False)
+    ts = Column(DateTime, server_default=func.now(), nullable=False, index=True)
     meta_json = Column(JSON, nullable=True)
+    operator_id = Column(String, nullable=True, index=True)  # Operador que registrou o movimento
 
     device = relationship("Device", back_populates="movements")
 
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from .database import Base
+
+
+class OperatorPosition(Base):
+    """Posição atual de cada operador (último slot onde registrou movimento)"""
+    __tablename__ = "operator_positions"
+
+    operator_id = Column(String, primary_key=True)
+    slot_id = Column(Integer, ForeignKey("slots.id"), nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    slot = relationship("Slot")
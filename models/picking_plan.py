@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Enum as SQLEnum
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from .database import Base
+import enum
+
+
+class PlanStatus(str, enum.Enum):
+    ACTIVE = "ACTIVE"
+    COMPLETED = "COMPLETED"
+    CANCELLED = "CANCELLED"
+
+
+class PickingPlan(Base):
+    """Plano de picking com os devices reservados (devices.plan_id) e as paradas (picking_plan_items)"""
+    __tablename__ = "picking_plans"
+
+    id = Column(String, primary_key=True)  # PickingPlanService.new_id (ordenável pela criação)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False, index=True)
+    operator_id = Column(String, nullable=True, index=True)
+    status = Column(SQLEnum(PlanStatus), default=PlanStatus.ACTIVE, nullable=False, index=True)
+    requested_devices = Column(Integer, nullable=False)
+    reserved_devices = Column(Integer, nullable=False, default=0)
+    total_distance = Column(Float, nullable=False, default=0.0)
+    start_slot_id = Column(Integer, nullable=True)
+    return_distance = Column(Float, nullable=True)
+    excluded_json = Column(JSON, nullable=True)  # Devices pedidos e não reservados (com o motivo)
+    cost_profile = Column(String, nullable=True)  # Perfil de custo usado na rota (CostProfileService)
+    completed_at = Column(DateTime, nullable=True)
+
+    items = relationship("PickingPlanItem", back_populates="plan", order_by="PickingPlanItem.seq")
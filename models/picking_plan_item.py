@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, Enum as SQLEnum
+from sqlalchemy.orm import relationship
+from .database import Base
+import enum
+
+
+class PlanItemStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    PICKED = "PICKED"
+    RELEASED = "RELEASED"  # Plano cancelado antes da coleta
+
+
+class PickingPlanItem(Base):
+    """Parada de um plano de picking, na ordem da rota, com o progresso da coleta"""
+    __tablename__ = "picking_plan_items"
+    __table_args__ = (
+        Index("ix_picking_plan_items_plan_seq", "plan_id", "seq", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    plan_id = Column(String, ForeignKey("picking_plans.id"), nullable=False)
+    seq = Column(Integer, nullable=False)  # Ordem na rota (1..n)
+    device_id = Column(String, nullable=False, index=True)
+    slot_id = Column(Integer, nullable=False)
+    human_code = Column(String, nullable=False)
+    row = Column(Integer, nullable=False)
+    col = Column(Integer, nullable=False)
+    distance_from_prev = Column(Float, nullable=False)
+    cumulative_distance = Column(Float, nullable=False)
+    status = Column(SQLEnum(PlanItemStatus), default=PlanItemStatus.PENDING, nullable=False)
+    picked_at = Column(DateTime, nullable=True)
+
+    plan = relationship("PickingPlan", back_populates="items")
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy.sql import func
+from .database import Base
+
+
+class PickingPlanStat(Base):
+    """Telemetria de qualidade de cada plano de picking (para agregação)"""
+    __tablename__ = "picking_plan_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False, index=True)
+    operator_id = Column(String, nullable=True)
+    distance_model = Column(String, nullable=False)
+    requested_devices = Column(Integer, nullable=False)
+    stops = Column(Integer, nullable=False)
+
+    # Distâncias a partir do slot de início (sem retorno)
+    total_distance = Column(Float, nullable=False)
+    nn_distance = Column(Float, nullable=False)  # Rota do Nearest Neighbor, antes do 2-opt
+    lower_bound = Column(Float, nullable=False)  # Árvore geradora mínima (início + paradas)
+    gap = Column(Float, nullable=True)  # (total - lower_bound) / lower_bound
+
+    two_opt_iterations = Column(Integer, nullable=False, default=0)
+    two_opt_stop_reason = Column(String, nullable=True)
+    solver = Column(String, nullable=True)  # heuristic ou branch_and_bound (listas pequenas)
+    optimal = Column(Boolean, nullable=True)  # ótimo provado pelo branch-and-bound
+
+    # Tempo por fase (ms)
+    lookup_ms = Column(Float, nullable=False, default=0.0)
+    nearest_neighbor_ms = Column(Float, nullable=False, default=0.0)
+    exact_ms = Column(Float, nullable=False, default=0.0)
+    two_opt_ms = Column(Float, nullable=False, default=0.0)
+    lower_bound_ms = Column(Float, nullable=False, default=0.0)
+    total_ms = Column(Float, nullable=False, default=0.0)
@@ -14,6 +14,7 @@ class Shelf(Base):
     id = Column(Integer, primary_key=True, index=True)
     aisle_id = Column(Integer, ForeignKey("aisles.id"), nullable=False)
     code = Column(String, nullable=False)  # "P1", "P2"
+    side = Column(String, nullable=False, default="left", server_default="left")  # "left", "right"
 
     aisle = relationship("Aisle", back_populates="shelves")
     slots = relationship("Slot", back_populates="shelf", cascade="all, delete-orphan")
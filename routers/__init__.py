@@ -3,6 +3,14 @@ from .assign import router as assign_router
 from .picking import router as picking_router
 from .scan import router as scan_router
 from .devices import router as devices_router
+from .movements import router as movements_router
+from .inventory import router as inventory_router
+from .metrics import router as metrics_router
+from .profiles import router as profiles_router
+from .changes import router as changes_router
+from .exports import router as exports_router
+from .backups import router as backups_router
+from .cost_profiles import router as cost_profiles_router
 
-__all__ = ["slots_router", "assign_router", "picking_router", "scan_router", "devices_router"]
+__all__ = ["slots_router", "assign_router", "picking_router", "scan_router", "devices_router", "movements_router", "inventory_router", "metrics_router", "profiles_router", "changes_router", "exports_router", "backups_router", "cost_profiles_router"]
 
@@ -3,12 +3,15 @@ Rotas para alocação automática de devices
 """
 from fastapi import APIRouter, Depends, UploadFile, File, Form
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import csv
 import io
 from models.database import get_db
 from schemas.assignment_schemas import AssignmentRequest, AssignmentResponse
 from services.assignment_service import AssignmentService
+from services.response_encoder import ResponseEncoder, ResponseFormat
+from services.cost_profile_service import CostProfile
+from routers.dependencies import get_operator_id, get_cost_profile, response_format
 
 router = APIRouter(prefix="/assign", tags=["assign"])
 
@@ -17,11 +20,17 @@ router = APIRouter(prefix="/assign", tags=["assign"])
 async def assign_devices_auto(
     request: AssignmentRequest = None,
     csv_file: UploadFile = File(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    operator_id: Optional[str] = Depends(get_operator_id),
+    profile: Optional[CostProfile] = Depends(get_cost_profile),
+    output: ResponseFormat = Depends(response_format)
 ):
     """
     Aloca automaticamente devices em slots livres
     Pode receber lista de device_ids no body ou upload de CSV
+    A alocação parte da posição do operador (header X-Operator-Id), se informado
+    "Mais próximo" segue o perfil de custo (header X-Cost-Profile), se informado
+    Resposta em JSON, NDJSON (um item alocado por linha) ou MessagePack, conforme Accept
     """
     device_ids = []
 
@@ -47,30 +56,24 @@ async def assign_devices_auto(
             unique_device_ids.append(did)
 
     if not unique_device_ids:
-        return AssignmentResponse(
-            assigned=[],
-            failed=[],
-            current_position=None,
-            error="Nenhum device_id fornecido"
-        )
+        return ResponseEncoder.respond({
+            "assigned": [],
+            "failed": [],
+            "current_position": None,
+            "error": "Nenhum device_id fornecido"
+        }, output, "assigned")
 
     # Chamar serviço de alocação
-    result = AssignmentService.assign_devices_auto(db, unique_device_ids)
-
-    # Converter para formato de response
-    return AssignmentResponse(
-        assigned=[
-            {
-                "device_id": item["device_id"],
-                "slot_id": item["slot_id"],
-                "human_code": item["human_code"],
-                "row": item["row"],
-                "col": item["col"]
-            }
-            for item in result["assigned"]
-        ],
-        failed=result.get("failed", []),
-        current_position=result.get("current_position"),
-        error=result.get("error")
+    result = AssignmentService.assign_devices_auto(
+        db, unique_device_ids, operator_id=operator_id, profile=profile
     )
 
+    # Saída do serviço já tem o formato de AssignmentResponse: serializar direto
+    return ResponseEncoder.respond({
+        "assigned": result["assigned"],
+        "failed": result.get("failed", []),
+        "current_position": result.get("current_position"),
+        "cost_profile": result.get("cost_profile"),
+        "error": result.get("error")
+    }, output, "assigned")
+
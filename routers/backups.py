@@ -0,0 +1,28 @@
+"""
+Rotas de backup online do banco
+"""
+from fastapi import APIRouter, HTTPException
+from services.backup_service import BackupService, BackupInProgress
+import asyncio
+
+router = APIRouter(prefix="/backups", tags=["backups"])
+
+
+@router.get("")
+async def list_backups():
+    """Backups disponíveis, do mais recente para o mais antigo"""
+    return {"directory": BackupService.DIRECTORY, "backups": BackupService.list_backups()}
+
+
+@router.post("")
+async def create_backup():
+    """
+    Cria um backup sob demanda (cópia incremental pela API de backup do SQLite)
+    e aplica a retenção (BACKUP_KEEP)
+    """
+    try:
+        return await asyncio.to_thread(BackupService.create_backup)
+    except BackupInProgress:
+        raise HTTPException(status_code=409, detail="Já existe um backup em andamento")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
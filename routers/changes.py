@@ -0,0 +1,64 @@
+"""
+Rotas do feed de mudanças do inventário (Server-Sent Events e WebSocket)
+"""
+from fastapi import APIRouter, Header, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import json
+from services.change_feed import ChangeFeed
+from services.inventory_version_service import InventoryVersionService
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+def _sse(kind: str, payload: dict) -> str:
+    if kind == "heartbeat":
+        return ": keepalive\n\n"
+    lines = []
+    if kind == "change":
+        lines.append(f"id: {payload['version']}")
+    lines.append(f"event: {kind}")
+    lines.append(f"data: {json.dumps(payload, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/stream")
+async def change_stream(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="Versão já conhecida pelo cliente (replay a partir dela)"),
+    last_event_id: Optional[str] = Header(None, description="Enviado pelo EventSource ao reconectar")
+):
+    """
+    Server-Sent Events: "change" (uma mensagem por versão do inventário, id = versão)
+    e "resync" (recarregar o estado pelas leituras). Reconexões do EventSource
+    retomam do Last-Event-ID.
+    """
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    async def events():
+        yield "retry: 3000\n\n"
+        async for kind, payload in ChangeFeed.listen(since, InventoryVersionService.current):
+            if kind == "heartbeat" and await request.is_disconnected():
+                break
+            yield _sse(kind, payload)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def change_socket(
+    websocket: WebSocket,
+    since: Optional[int] = Query(None, ge=0)
+):
+    """WebSocket com as mesmas mensagens do SSE: {"type": "change" | "resync" | "heartbeat", ...}"""
+    await websocket.accept()
+    try:
+        async for kind, payload in ChangeFeed.listen(since, InventoryVersionService.current):
+            await websocket.send_json({"type": kind, **payload})
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,27 @@
+"""
+Rotas dos perfis de custo (distância por tipo de separador/equipamento)
+"""
+from fastapi import APIRouter, HTTPException
+from services.cost_profile_service import CostProfileService, DEFAULT_PROFILE
+
+router = APIRouter(prefix="/cost-profiles", tags=["cost-profiles"])
+
+
+@router.get("")
+async def list_cost_profiles():
+    """Perfis disponíveis com os custos (escolhidos por X-Cost-Profile ou ?cost_profile=)"""
+    return {
+        "default": DEFAULT_PROFILE,
+        "file": CostProfileService.FILE,
+        "profiles": CostProfileService.list_profiles(),
+    }
+
+
+@router.post("/reload")
+async def reload_cost_profiles():
+    """Recarrega COST_PROFILES_FILE agora (arquivo inválido: 400, perfis atuais mantidos)"""
+    try:
+        CostProfileService.load()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"profiles": CostProfileService.list_profiles()}
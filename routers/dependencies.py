@@ -0,0 +1,76 @@
+"""
+Dependências compartilhadas entre as rotas
+"""
+from fastapi import Header, Query, HTTPException, Request
+from typing import Optional
+from services.profiling_service import ProfilingService
+from services.inventory_version_service import InventoryVersionService
+from services.response_encoder import ResponseEncoder, ResponseFormat
+from services.cost_profile_service import CostProfile, CostProfileService
+
+
+def get_operator_id(
+    x_operator_id: Optional[str] = Header(None, description="Identificador do operador/sessão"),
+    operator_id: Optional[str] = Query(None, description="Identificador do operador/sessão (alternativa ao header)")
+) -> Optional[str]:
+    """
+    Identifica o operador pelo header X-Operator-Id ou pelo parâmetro operator_id.
+    Retorna None quando não informado (comportamento legado: posição global).
+    """
+    value = x_operator_id or operator_id
+    if value:
+        value = value.strip()
+    return value or None
+
+
+def get_cost_profile(
+    x_cost_profile: Optional[str] = Header(None, description="Perfil de custo (GET /cost-profiles)"),
+    cost_profile: Optional[str] = Query(None, description="Perfil de custo (alternativa ao header)")
+) -> Optional[CostProfile]:
+    """
+    Perfil de custo pelo header X-Cost-Profile ou pelo parâmetro cost_profile.
+    Retorna None quando não informado (modelo global, perfil "default").
+    """
+    name = (x_cost_profile or cost_profile or "").strip()
+    if not name:
+        return None
+    profile = CostProfileService.get(name)
+    if profile is None:
+        raise HTTPException(status_code=400, detail=f"Perfil de custo {name} não encontrado")
+    return profile
+
+
+def require_profiling_token(
+    x_profile_token: Optional[str] = Header(None, description="Token de profiling (PROFILING_TOKEN)"),
+    token: Optional[str] = Query(None, description="Token de profiling (alternativa ao header)")
+) -> None:
+    """Restringe as rotas de profiling a quem tem o PROFILING_TOKEN"""
+    if not ProfilingService.enabled():
+        raise HTTPException(status_code=404, detail="Profiling desativado")
+    if not ProfilingService.is_authorized(x_profile_token or token):
+        raise HTTPException(status_code=403, detail="Token de profiling inválido")
+
+
+def inventory_cache_key(request: Request) -> tuple:
+    """
+    Chave (rota, parâmetros, versão do inventário) da leitura atual.
+    Se o cliente já tem a versão (If-None-Match), responde 304 sem tocar no banco.
+    O ETag é aplicado à resposta pelo middleware.
+    """
+    key = InventoryVersionService.cache_key(request.url.path, tuple(request.query_params.multi_items()))
+    etag = InventoryVersionService.etag(key)
+    request.state.etag = etag
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        raise HTTPException(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return key
+
+
+def response_format(
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    format: Optional[str] = Query(None, description="json, ndjson ou msgpack (alternativa ao header Accept)")
+) -> ResponseFormat:
+    """Formato da resposta negociado por Accept/format e gzip por Accept-Encoding"""
+    return ResponseEncoder.negotiate(accept, accept_encoding, format)
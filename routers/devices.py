@@ -2,10 +2,14 @@
 Rotas para consulta de devices
 """
 from fastapi import APIRouter, Depends, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from typing import Optional, List
 from models.database import get_db
+from routers.dependencies import inventory_cache_key
+from services.inventory_version_service import FragmentCache
 from models.device import Device
 from models.slot import Slot
 from schemas.device_schemas import DeviceResponse
@@ -16,11 +20,16 @@ router = APIRouter(prefix="/devices", tags=["devices"])
 @router.get("/{device_id}", response_model=DeviceResponse)
 async def get_device(
     device_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache_key: tuple = Depends(inventory_cache_key)
 ):
     """
     Busca device por device_id
     """
+    cached = FragmentCache.response(cache_key)
+    if cached is not None:
+        return cached
+
     device = db.query(Device).filter(Device.device_id == device_id).first()
 
     if not device:
@@ -38,7 +47,7 @@ async def get_device(
             row = slot.row_index
             col = slot.col_index
 
-    return DeviceResponse(
+    return FragmentCache.store(cache_key, JSONResponse(jsonable_encoder(DeviceResponse(
         id=device.id,
         device_id=device.device_id,
         status=device.status,
@@ -46,30 +55,31 @@ async def get_device(
         slot_human_code=slot_human_code,
         row=row,
         col=col
-    )
+    ))))
 
 
 @router.get("/search/query")
 async def search_devices(
     query: str = Query(..., description="Busca por device_id ou human_code do slot"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache_key: tuple = Depends(inventory_cache_key)
 ):
     """
     Busca devices por device_id ou human_code do slot
     """
+    cached = FragmentCache.response(cache_key)
+    if cached is not None:
+        return cached
+
     # Buscar por device_id
     devices_by_id = db.query(Device).filter(
         Device.device_id.ilike(f"%{query}%")
     ).all()
 
-    # Buscar por human_code do slot
-    slots = db.query(Slot).filter(
+    # Buscar por human_code do slot (join, sem lista de slot_ids no IN)
+    devices_by_slot = db.query(Device).join(Slot, Device.slot_id == Slot.id).filter(
         Slot.human_code.ilike(f"%{query}%")
     ).all()
-    slot_ids = [s.id for s in slots]
-    devices_by_slot = db.query(Device).filter(
-        Device.slot_id.in_(slot_ids)
-    ).all() if slot_ids else []
 
     # Combinar resultados (sem duplicatas)
     all_devices = {}
@@ -101,5 +111,5 @@ async def search_devices(
             col=col
         ))
 
-    return {"results": results}
+    return FragmentCache.store(cache_key, JSONResponse(jsonable_encoder({"results": results})))
 
@@ -0,0 +1,89 @@
+"""
+Rotas de exportação em streaming (CSV ou NDJSON) para BI/auditoria
+"""
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Iterator, Optional, Sequence
+from datetime import datetime
+from models.database import get_db
+from models.device import DeviceStatus
+from models.movement import MovementType
+from models.picking_plan import PickingPlan
+from services.export_service import (
+    ExportService, MEDIA_TYPES, MOVEMENT_COLUMNS, INVENTORY_COLUMNS, PLAN_COLUMNS
+)
+from services.response_encoder import ResponseEncoder
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+FORMAT_QUERY = Query("csv", pattern="^(csv|ndjson)$", description="csv ou ndjson")
+
+
+def _stream(
+    filename: str,
+    export_format: str,
+    columns: Sequence[str],
+    rows: Iterator[tuple],
+    accept_encoding: Optional[str]
+) -> StreamingResponse:
+    """Resposta em streaming; gzip quando o cliente aceita"""
+    gzip = ResponseEncoder.GZIP_MIN_BYTES > 0 and ResponseEncoder.negotiate(None, accept_encoding).gzip
+    headers = {"Content-Disposition": f"attachment; filename={filename}.{export_format}"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        ExportService.chunks(export_format, columns, rows, gzip=gzip),
+        media_type=MEDIA_TYPES[export_format],
+        headers=headers
+    )
+
+
+@router.get("/movements")
+async def export_movements(
+    format: str = FORMAT_QUERY,
+    since: Optional[datetime] = Query(None, description="Início do intervalo (ISO 8601)"),
+    until: Optional[datetime] = Query(None, description="Fim do intervalo (ISO 8601)"),
+    device_id: Optional[str] = Query(None),
+    type: Optional[MovementType] = Query(None),
+    operator_id: Optional[str] = Query(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """
+    Movimentos (tabela ativa e arquivos mensais) em ordem cronológica
+    """
+    rows = ExportService.movement_rows(
+        device_id=device_id, since=since, until=until,
+        movement_type=type.value if type else None, operator_id=operator_id
+    )
+    return _stream("movements", format, MOVEMENT_COLUMNS, rows, accept_encoding)
+
+
+@router.get("/inventory")
+async def export_inventory(
+    format: str = FORMAT_QUERY,
+    status: Optional[DeviceStatus] = Query(None),
+    aisle_id: Optional[int] = Query(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """
+    Inventário atual: cada device com status, slot e plano
+    """
+    rows = ExportService.inventory_rows(status=status, aisle_id=aisle_id)
+    return _stream("inventory", format, INVENTORY_COLUMNS, rows, accept_encoding)
+
+
+@router.get("/plans/{plan_id}")
+async def export_plan(
+    plan_id: str,
+    format: str = FORMAT_QUERY,
+    accept_encoding: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Paradas de um plano de picking com o progresso de cada uma
+    """
+    if db.get(PickingPlan, plan_id) is None:
+        raise HTTPException(status_code=404, detail=f"Plano {plan_id} não encontrado")
+    rows = ExportService.plan_rows(plan_id)
+    return _stream(f"picking_plan_{plan_id}", format, PLAN_COLUMNS, rows, accept_encoding)
@@ -0,0 +1,92 @@
+"""
+Rotas para consulta do inventário em um instante passado (auditoria)
+"""
+from fastapi import APIRouter, Depends, Query, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+from models.database import get_db
+from models.slot import Slot
+from models.inventory_snapshot import InventorySnapshot
+from services.snapshot_service import InventorySnapshotService
+
+router = APIRouter(prefix="/inventory", tags=["inventory"])
+
+
+@router.get("/as-of")
+async def get_inventory_as_of(
+    ts: datetime = Query(..., description="Instante desejado (ISO 8601, UTC)"),
+    slot: Optional[str] = Query(None, description="human_code do slot, ex: R2-P1-C-C14"),
+    device_id: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Reconstrói o inventário no instante ts:
+    - com slot: qual device estava no slot
+    - com device_id: em qual slot o device estava
+    - sem filtros: ocupação total e por rua
+    """
+    result = InventorySnapshotService.inventory_as_of(db, ts)
+    devices = result["devices"]
+
+    response = {
+        "as_of": ts,
+        "snapshot_id": result["snapshot_id"],
+        "replayed_movements": result["replayed_movements"],
+    }
+
+    if slot:
+        slot_obj = db.query(Slot).filter(Slot.human_code == slot).first()
+        if not slot_obj:
+            raise HTTPException(status_code=404, detail=f"Slot {slot} não encontrado")
+        response["slot"] = slot
+        response["device_id"] = next(
+            (did for did, sid in devices.items() if sid == slot_obj.id), None
+        )
+        return response
+
+    if device_id:
+        slot_id = devices.get(device_id)
+        slot_obj = db.get(Slot, slot_id) if slot_id else None
+        response["device_id"] = device_id
+        response["slot_id"] = slot_id
+        response["slot_human_code"] = slot_obj.human_code if slot_obj else None
+        return response
+
+    # Ocupação por rua
+    aisle_by_slot = dict(db.query(Slot.id, Slot.aisle_id).all())
+    by_aisle = {}
+    for slot_id in devices.values():
+        aisle_id = aisle_by_slot.get(slot_id)
+        by_aisle[aisle_id] = by_aisle.get(aisle_id, 0) + 1
+
+    response["occupied_slots"] = len(devices)
+    response["occupied_by_aisle"] = by_aisle
+    return response
+
+
+@router.get("/snapshots")
+async def list_snapshots(
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Lista as fotos de inventário mais recentes (sem o conteúdo)"""
+    snapshots = db.query(
+        InventorySnapshot.id,
+        InventorySnapshot.ts,
+        InventorySnapshot.last_movement_id,
+        InventorySnapshot.device_count
+    ).order_by(InventorySnapshot.id.desc()).limit(limit).all()
+    return {"snapshots": [dict(s._mapping) for s in snapshots]}
+
+
+@router.post("/snapshots")
+async def create_snapshot(db: Session = Depends(get_db)):
+    """Grava uma foto do inventário sob demanda"""
+    snapshot = InventorySnapshotService.take_snapshot(db, force=True)
+    return {
+        "id": snapshot.id,
+        "ts": snapshot.ts,
+        "last_movement_id": snapshot.last_movement_id,
+        "device_count": snapshot.device_count
+    }
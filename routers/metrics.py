@@ -0,0 +1,36 @@
+"""
+Rota de métricas no formato texto do Prometheus
+"""
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from models.database import get_db
+from models.slot import Slot
+from models.device import Device, DeviceStatus
+from services.metrics import REGISTRY, INVENTORY_FREE_SLOTS, INVENTORY_DEVICES, CHANGE_FEED_SUBSCRIBERS
+from services.change_feed import ChangeFeed
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(db: Session = Depends(get_db)):
+    """
+    Expõe histogramas de latência, etapas dos serviços, 2-opt,
+    statements por requisição, gauges de inventário e assinantes do feed
+    """
+    # Gauges de inventário são calculados no momento da coleta
+    INVENTORY_FREE_SLOTS.set(
+        db.query(func.count(Slot.id)).filter(Slot.occupied == False).scalar() or 0
+    )
+    counts = dict(db.query(Device.status, func.count(Device.id)).group_by(Device.status).all())
+    for status in DeviceStatus:
+        INVENTORY_DEVICES.labels(status.value).set(counts.get(status, 0))
+    CHANGE_FEED_SUBSCRIBERS.set(ChangeFeed.subscriber_count())
+
+    return PlainTextResponse(
+        REGISTRY.render(),
+        # O Starlette acrescenta "; charset=utf-8" ao content-type
+        media_type="text/plain; version=0.0.4"
+    )
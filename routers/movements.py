@@ -0,0 +1,51 @@
+"""
+Rotas para consulta e arquivamento do histórico de movimentos
+"""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+from models.database import get_db
+from services.movement_archive_service import MovementArchiveService
+
+router = APIRouter(prefix="/movements", tags=["movements"])
+
+
+@router.get("")
+async def list_movements(
+    device_id: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None, description="Início do intervalo (ISO 8601)"),
+    until: Optional[datetime] = Query(None, description="Fim do intervalo (ISO 8601)"),
+    limit: int = Query(100, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """
+    Lista movimentos (mais recentes primeiro) cobrindo tabela ativa e arquivos mensais
+    """
+    results = MovementArchiveService.query_movements(
+        db, device_id=device_id, since=since, until=until, limit=limit
+    )
+    return {"results": results}
+
+
+@router.get("/archives")
+async def list_archives(db: Session = Depends(get_db)):
+    """Lista as tabelas mensais de arquivo"""
+    return {"archives": MovementArchiveService.list_archive_tables(db)}
+
+
+@router.post("/compact")
+def compact_movements(
+    retention_days: Optional[int] = Query(None, ge=1),
+    max_batches: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    """
+    Arquiva sob demanda movimentos mais antigos que retention_days
+    (padrão: MOVEMENT_RETENTION_DAYS).
+    Rota síncrona: o compactador bloqueia (pausa entre lotes) e roda no
+    threadpool, sem travar o event loop
+    """
+    return MovementArchiveService.compact(
+        db, retention_days=retention_days, max_batches=max_batches
+    )
@@ -1,34 +1,45 @@
 """
 Rotas para picking (coleta de devices)
 """
-from fastapi import APIRouter, Depends, UploadFile, File, Response
+from fastapi import APIRouter, Depends, UploadFile, File, Response, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 import csv
 import io
 import json
 from models.database import get_db
-from schemas.picking_schemas import PickingPlanRequest, PickingPlanResponse
+from models.picking_plan import PickingPlan, PlanStatus
+from schemas.picking_schemas import (
+    PickingPlanRequest, PickingPlanResponse, MarkPickedBulkRequest, BulkTransitionResponse
+)
 from services.picking_service import PickingService
+from services.plan_stats_service import PlanStatsService
+from services.picking_plan_service import PickingPlanService
+from services.export_service import ExportService, CSV
+from services.response_encoder import ResponseEncoder, ResponseFormat
+from services.cost_profile_service import CostProfile
+from routers.dependencies import get_operator_id, get_cost_profile, response_format
 
 router = APIRouter(prefix="/picking", tags=["picking"])
 
-# Guardar último plano em memória (em produção usar cache/DB)
-_last_picking_plan = None
-
-
 @router.post("/plan", response_model=PickingPlanResponse)
 async def create_picking_plan(
     request: PickingPlanRequest = None,
     csv_file: UploadFile = File(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    operator_id: Optional[str] = Depends(get_operator_id),
+    profile: Optional[CostProfile] = Depends(get_cost_profile),
+    output: ResponseFormat = Depends(response_format)
 ):
     """
     Cria plano de picking para uma lista de devices
     Pode receber lista de device_ids no body ou upload de CSV
+    A rota parte da posição do operador (header X-Operator-Id), se informado
+    As distâncias seguem o perfil de custo (header X-Cost-Profile), se informado
+    Resposta em JSON, NDJSON (uma parada por linha) ou MessagePack, conforme Accept
     """
-    global _last_picking_plan
-
     device_ids = []
 
     # Se há arquivo CSV, processar primeiro
@@ -53,118 +64,184 @@ async def create_picking_plan(
             unique_device_ids.append(did)
 
     if not unique_device_ids:
-        return PickingPlanResponse(
-            route=[],
-            total_distance=0.0,
-            return_distance=None,
-            start_position=None,
-            error="Nenhum device_id fornecido"
-        )
-
-    # Criar plano de picking
-    result = PickingService.create_picking_plan(db, unique_device_ids)
+        return ResponseEncoder.respond({
+            "route": [],
+            "total_distance": 0.0,
+            "return_distance": None,
+            "start_position": None,
+            "quality": None,
+            "plan_id": None,
+            "excluded": [],
+            "error": "Nenhum device_id fornecido"
+        }, output, "route")
+
+    # Criar plano e reservar os devices da rota (IN_TRANSIT com plan_id) na mesma transação
+    result = PickingService.reserve_picking_plan(
+        db, unique_device_ids, operator_id=operator_id, profile=profile
+    )
 
-    # Marcar todos como IN_TRANSIT
-    PickingService.mark_devices_in_transit(db, unique_device_ids)
+    # Saída do serviço já tem o formato de PickingPlanResponse: serializar direto
+    return ResponseEncoder.respond({
+        "route": result.get("route", []),
+        "total_distance": result.get("total_distance", 0.0),
+        "return_distance": result.get("return_distance"),
+        "start_position": result.get("start_position"),
+        "quality": result.get("quality"),
+        "plan_id": result.get("plan_id"),
+        "excluded": result.get("excluded", []),
+        "cost_profile": result.get("cost_profile"),
+        "error": result.get("error")
+    }, output, "route")
+
+
+@router.get("/stats")
+async def picking_plan_stats(
+    since: Optional[datetime] = Query(None, description="Início do intervalo (ISO 8601)"),
+    until: Optional[datetime] = Query(None, description="Fim do intervalo (ISO 8601)"),
+    operator_id: Optional[str] = Query(None),
+    distance_model: Optional[str] = Query(None, description="manhattan ou layout"),
+    db: Session = Depends(get_db)
+):
+    """
+    Agrega a telemetria dos planos: gap até o limite inferior, ganho do 2-opt,
+    motivos de parada e tempo por fase, no geral e por faixa de tamanho
+    """
+    return PlanStatsService.summary(
+        db, since=since, until=until, operator_id=operator_id, distance_model=distance_model
+    )
 
-    # Guardar em memória para exportação e reset
-    _last_picking_plan = {
-        **result,
-        "device_ids": unique_device_ids
-    }
 
-    return PickingPlanResponse(
-        route=result.get("route", []),
-        total_distance=result.get("total_distance", 0.0),
-        return_distance=result.get("return_distance"),
-        start_position=result.get("start_position"),
-        error=result.get("error")
+def _plan_csv_response(plan_id: str) -> StreamingResponse:
+    """CSV com as paradas do plano, na ordem da rota (em streaming)"""
+    header = (
+        "Ordem",
+        "Device ID",
+        "Slot (Código Humano)",
+        "Linha",
+        "Coluna",
+        "Distância do Anterior",
+        "Distância Acumulada",
+        "Status"
+    )
+    rows = (
+        (seq, device_id, human_code, row, col, f"{distance_from_prev:.2f}", f"{cumulative_distance:.2f}", status)
+        for seq, device_id, _, human_code, row, col, distance_from_prev, cumulative_distance, status, _
+        in ExportService.plan_rows(plan_id)
+    )
+    return StreamingResponse(
+        ExportService.chunks(CSV, header, rows),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=picking_plan_{plan_id}.csv"}
     )
 
 
 @router.get("/plan.csv")
-async def export_picking_plan_csv():
+async def export_picking_plan_csv(
+    db: Session = Depends(get_db),
+    operator_id: Optional[str] = Depends(get_operator_id)
+):
     """
-    Exporta o último plano de picking como CSV
+    Exporta o plano de picking mais recente (do operador, se X-Operator-Id) como CSV
     """
-    global _last_picking_plan
-
-    if not _last_picking_plan:
+    plan = PickingPlanService.latest(db, operator_id=operator_id)
+    if not plan:
         return Response(
             content="Nenhum plano de picking disponível",
             media_type="text/plain",
             status_code=404
         )
+    return _plan_csv_response(plan.id)
 
-    route = _last_picking_plan.get("route", [])
-
-    # Criar CSV em memória
-    output = io.StringIO()
-    writer = csv.writer(output)
 
-    # Cabeçalho
-    writer.writerow([
-        "Ordem",
-        "Device ID",
-        "Slot (Código Humano)",
-        "Linha",
-        "Coluna",
-        "Distância do Anterior",
-        "Distância Acumulada"
-    ])
-
-    # Dados
-    for idx, item in enumerate(route, start=1):
-        writer.writerow([
-            idx,
-            item["device_id"],
-            item["human_code"],
-            item["row"],
-            item["col"],
-            f"{item['distance_from_prev']:.2f}",
-            f"{item['cumulative_distance']:.2f}"
-        ])
-
-    csv_content = output.getvalue()
-    output.close()
-
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=picking_plan.csv"}
-    )
+@router.get("/plans")
+async def list_picking_plans(
+    status: Optional[PlanStatus] = Query(None, description="ACTIVE, COMPLETED ou CANCELLED"),
+    operator_id: Optional[str] = Query(None),
+    device_id: Optional[str] = Query(None, description="Só planos que incluem o device"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Planos mais recentes primeiro, com o progresso (itens por status)"""
+    return ResponseEncoder.json_response(PickingPlanService.list_plans(
+        db, status=status, operator_id=operator_id, device_id=device_id, limit=limit
+    ))
+
+
+@router.get("/plans/{plan_id}")
+async def get_picking_plan(plan_id: str, db: Session = Depends(get_db)):
+    """Plano com as paradas na ordem da rota e o status de cada uma"""
+    plan = PickingPlanService.get(db, plan_id)
+    if plan is None:
+        raise HTTPException(status_code=404, detail=f"Plano {plan_id} não encontrado")
+    return ResponseEncoder.json_response(plan)
+
+
+@router.get("/plans/{plan_id}/plan.csv")
+async def export_plan_csv(plan_id: str, db: Session = Depends(get_db)):
+    """Exporta um plano específico como CSV"""
+    if db.get(PickingPlan, plan_id) is None:
+        raise HTTPException(status_code=404, detail=f"Plano {plan_id} não encontrado")
+    return _plan_csv_response(plan_id)
+
+
+@router.post("/plans/{plan_id}/reset")
+async def reset_plan(
+    plan_id: str,
+    db: Session = Depends(get_db),
+    operator_id: Optional[str] = Depends(get_operator_id)
+):
+    """Cancela o plano: os devices ainda reservados por ele voltam para IN_STOCK"""
+    return PickingService.cancel_picking_plan(db, plan_id, operator_id)
 
 
 @router.post("/mark-picked")
 async def mark_device_picked(
     device_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    operator_id: Optional[str] = Depends(get_operator_id)
 ):
     """
     Marca um device como coletado (picked)
     """
-    result = PickingService.mark_device_picked(db, device_id)
+    result = PickingService.mark_device_picked(db, device_id, operator_id)
     return result
 
 
+@router.post("/mark-picked/bulk", response_model=BulkTransitionResponse)
+async def mark_devices_picked(
+    request: MarkPickedBulkRequest,
+    db: Session = Depends(get_db),
+    operator_id: Optional[str] = Depends(get_operator_id),
+    output: ResponseFormat = Depends(response_format)
+):
+    """
+    Marca a rota inteira como coletada em uma transação (UPDATE em lote + movimentos)
+    Retorna o resultado por device: updated, not_found, invalid_status ou no_slot
+    """
+    result = PickingService.mark_devices_picked(db, request.device_ids, operator_id)
+    return ResponseEncoder.respond(result, output, "results")
+
+
 @router.post("/mark-in-transit")
 async def mark_device_in_transit(
     device_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    operator_id: Optional[str] = Depends(get_operator_id)
 ):
-    result = PickingService.mark_device_in_transit(db, device_id)
+    result = PickingService.mark_device_in_transit(db, device_id, operator_id)
     return result
 
 
 @router.post("/reset")
-async def reset_picking_plan(db: Session = Depends(get_db)):
-    """Cancela o plano atual: retorna devices IN_TRANSIT para IN_STOCK."""
-    global _last_picking_plan
-    if not _last_picking_plan or not _last_picking_plan.get("device_ids"):
+async def reset_picking_plan(
+    db: Session = Depends(get_db),
+    operator_id: Optional[str] = Depends(get_operator_id)
+):
+    """
+    Cancela o plano ativo mais recente (do operador, se X-Operator-Id):
+    retorna para IN_STOCK os devices ainda reservados por ele.
+    """
+    plan = PickingPlanService.latest(db, status=PlanStatus.ACTIVE, operator_id=operator_id)
+    if not plan:
         return {"success": False, "error": "Nenhum plano ativo"}
-    dids = _last_picking_plan.get("device_ids", [])
-    result = PickingService.reset_devices_from_transit(db, dids)
-    # Limpar plano em memória
-    _last_picking_plan = None
-    return result
-
+    return PickingService.cancel_picking_plan(db, plan.id, operator_id)
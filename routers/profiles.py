@@ -0,0 +1,24 @@
+"""
+Rotas para listar e baixar profiles de requisições
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from routers.dependencies import require_profiling_token
+from services.profiling_service import ProfilingService
+
+router = APIRouter(prefix="/profiles", tags=["profiles"], dependencies=[Depends(require_profiling_token)])
+
+
+@router.get("")
+async def list_profiles():
+    """Lista os profiles gravados (mais recentes primeiro)"""
+    return {"profiles": ProfilingService.list_profiles()}
+
+
+@router.get("/{name}")
+async def download_profile(name: str):
+    """Baixa um profile (JSON com pilhas de CPU, diferença de memória e parâmetros)"""
+    path = ProfilingService.profile_path(name)
+    if not path:
+        raise HTTPException(status_code=404, detail=f"Profile {name} não encontrado")
+    return FileResponse(path, media_type="application/json", filename=name)
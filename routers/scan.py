@@ -3,6 +3,7 @@ Rotas para scan IN/OUT de devices
 """
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
+from typing import Optional
 from models.database import get_db
 from models.slot import Slot
 from models.device import Device, DeviceStatus
@@ -10,6 +11,10 @@ from models.movement import Movement, MovementType
 from schemas.scan_schemas import ScanInRequest, ScanOutRequest, ScanResponse
 from services.assignment_service import AssignmentService
 from services.picking_service import PickingService
+from services.picking_plan_service import PickingPlanService
+from services.operator_service import OperatorService
+from services.inventory_version_service import InventoryVersionService
+from routers.dependencies import get_operator_id
 
 router = APIRouter(prefix="/scan", tags=["scan"])
 
@@ -17,10 +22,12 @@ router = APIRouter(prefix="/scan", tags=["scan"])
 @router.post("/in", response_model=ScanResponse)
 async def scan_in(
     request: ScanInRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    operator_id: Optional[str] = Depends(get_operator_id)
 ):
     """
     Scan IN: faz entrada de device (aloca automaticamente se não informado slot)
+    Com operador identificado (header X-Operator-Id), aloca a partir da posição dele
     """
     device_id = request.device_id
     slot_human_code = request.slot_human_code
@@ -43,8 +50,9 @@ async def scan_in(
                 error=f"Slot {slot_human_code} já está ocupado"
             )
     else:
-        # Alocar automaticamente no slot livre mais próximo do ponto dinâmico (último movimento)
-        start_slot = AssignmentService.get_dynamic_start_slot(db)
+        # Alocar automaticamente no slot livre mais próximo do ponto dinâmico
+        # (posição do operador ou último movimento)
+        start_slot = AssignmentService.get_dynamic_start_slot(db, operator_id)
         if not start_slot:
             return ScanResponse(
                 success=False,
@@ -62,6 +70,8 @@ async def scan_in(
             )
 
     try:
+        meta = {"auto_allocated": slot_human_code is None}
+
         # Buscar ou criar device
         device = db.query(Device).filter(Device.device_id == device_id).first()
 
@@ -79,6 +89,12 @@ async def scan_in(
                 if old_slot:
                     old_slot.occupied = False
 
+            # Reservado por um plano: sai do plano (item pendente liberado)
+            if device.plan_id:
+                meta["released_plan_id"] = device.plan_id
+                PickingPlanService.release_device(db, device_id)
+                device.plan_id = None
+
             device.status = DeviceStatus.IN_STOCK
             device.slot_id = slot.id
 
@@ -91,9 +107,12 @@ async def scan_in(
             from_slot_id=None,
             to_slot_id=slot.id,
             type=MovementType.CHECK_IN,
-            meta_json={"auto_allocated": slot_human_code is None}
+            meta_json=meta,
+            operator_id=operator_id
         )
         db.add(movement)
+        OperatorService.update_position(db, operator_id, slot.id)
+        InventoryVersionService.bump(db)
 
         db.commit()
 
@@ -118,7 +137,8 @@ async def scan_in(
 @router.post("/out", response_model=ScanResponse)
 async def scan_out(
     request: ScanOutRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    operator_id: Optional[str] = Depends(get_operator_id)
 ):
     """
     Scan OUT: faz saída de device (libera slot)
@@ -126,7 +146,7 @@ async def scan_out(
     device_id = request.device_id
 
     # Chamar serviço de picking que já faz isso
-    result = PickingService.mark_device_picked(db, device_id)
+    result = PickingService.mark_device_picked(db, device_id, operator_id)
 
     if result.get("success"):
         return ScanResponse(
@@ -1,17 +1,15 @@
 """
 Rotas para gerenciamento de slots
 """
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
 from typing import Optional, List
 from models.database import get_db
-from models.slot import Slot
-from models.aisle import Aisle
-from services.distance_service import DistanceService
-from services.assignment_service import AssignmentService
-from schemas.slot_schemas import SlotResponse
-import os
+from routers.dependencies import inventory_cache_key
+from services.inventory_version_service import FragmentCache
+from services.response_encoder import ResponseEncoder
+from services.nearest_slot_service import NearestSlotService, InvalidCursor
+from schemas.slot_schemas import SlotResponse, NearestSlotsResponse
 
 router = APIRouter(prefix="/slots", tags=["slots"])
 
@@ -23,55 +21,76 @@ async def get_available_slots(
     start_prateleira: Optional[str] = Query(None),
     start_linha: Optional[int] = Query(None, ge=1, le=24),
     start_coluna: Optional[int] = Query(None, ge=1, le=40),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache_key: tuple = Depends(inventory_cache_key)
 ):
     """
     Lista slots livres ordenados pelo percurso mais curto
     a partir de um ponto inicial (padrão RUA1/P1/L1/C1)
+    Para paginar, use /slots/nearest
     """
-    # Determinar ponto inicial
-    if start_rua and start_prateleira and start_linha and start_coluna:
-        from services.codecs import row_to_letter
-        row_letter = row_to_letter(start_linha)
-        human_code = f"R{start_rua}-{start_prateleira}-{row_letter}-C{start_coluna}"
-        start_slot = db.query(Slot).filter(Slot.human_code == human_code).first()
-    else:
-        start_slot = AssignmentService.get_default_start_slot(db)
+    cached = FragmentCache.response(cache_key)
+    if cached is not None:
+        return cached
 
-    if not start_slot:
-        # Se não encontrar ponto inicial, retornar slots livres sem ordenação
-        slots = db.query(Slot).filter(Slot.occupied == False).limit(limit).all()
-        return [SlotResponse(
-            id=s.id,
-            aisle_id=s.aisle_id,
-            shelf_id=s.shelf_id,
-            row_index=s.row_index,
-            col_index=s.col_index,
-            human_code=s.human_code,
-            occupied=s.occupied
-        ) for s in slots]
+    start_slot = NearestSlotService.start_slot_from_params(
+        db, start_rua, start_prateleira, start_linha, start_coluna
+    )
 
-    # Buscar slots livres e calcular distâncias
-    free_slots = db.query(Slot).filter(Slot.occupied == False).all()
+    # Sem ponto inicial, retorna slots livres sem ordenação por distância
+    results, _ = NearestSlotService.nearest_free(db, start_slot, limit)
 
-    slots_with_distance = [
-        (slot, DistanceService.calculate_distance(start_slot, slot))
-        for slot in free_slots
-    ]
+    return FragmentCache.store(cache_key, ResponseEncoder.json_response([{
+        "id": s.id,
+        "aisle_id": s.aisle_id,
+        "shelf_id": s.shelf_id,
+        "row_index": s.row_index,
+        "col_index": s.col_index,
+        "human_code": s.human_code,
+        "occupied": s.occupied
+    } for s, _ in results]))
 
-    # Ordenar por distância
-    slots_with_distance.sort(key=lambda x: x[1])
 
-    # Limitar resultados
-    slots_with_distance = slots_with_distance[:limit]
+@router.get("/nearest", response_model=NearestSlotsResponse)
+async def get_nearest_slots(
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    start_rua: Optional[int] = Query(None, ge=1),
+    start_prateleira: Optional[str] = Query(None),
+    start_linha: Optional[int] = Query(None, ge=1),
+    start_coluna: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db),
+    cache_key: tuple = Depends(inventory_cache_key)
+):
+    """
+    Slots livres em ordem de distância ao ponto inicial, paginados por cursor.
+    O cursor guarda o ponto inicial: nas páginas seguintes basta enviar cursor.
+    """
+    cached = FragmentCache.response(cache_key)
+    if cached is not None:
+        return cached
+
+    start_slot = None
+    if not cursor:
+        start_slot = NearestSlotService.start_slot_from_params(
+            db, start_rua, start_prateleira, start_linha, start_coluna
+        )
 
-    return [SlotResponse(
-        id=s.id,
-        aisle_id=s.aisle_id,
-        shelf_id=s.shelf_id,
-        row_index=s.row_index,
-        col_index=s.col_index,
-        human_code=s.human_code,
-        occupied=s.occupied
-    ) for s, _ in slots_with_distance]
+    try:
+        results, next_cursor = NearestSlotService.nearest_free(db, start_slot, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    return FragmentCache.store(cache_key, ResponseEncoder.json_response({
+        "results": [{
+            "id": s.id,
+            "aisle_id": s.aisle_id,
+            "shelf_id": s.shelf_id,
+            "row_index": s.row_index,
+            "col_index": s.col_index,
+            "human_code": s.human_code,
+            "occupied": s.occupied,
+            "distance": distance
+        } for s, distance in results],
+        "next_cursor": next_cursor
+    }))
@@ -27,5 +27,6 @@ class AssignmentResponse(BaseModel):
     assigned: List[AssignedItem]
     failed: List[str]
     current_position: Optional[CurrentPosition] = None
+    cost_profile: Optional[str] = None
     error: Optional[str] = None
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class PickingPlanRequest(BaseModel):
@@ -24,11 +24,55 @@ class StartPosition(BaseModel):
     human_code: str
 
 
+class PlanQuality(BaseModel):
+    """Qualidade da rota: limite inferior, gap, ganho do 2-opt, solver e tempo por fase"""
+    lower_bound: float
+    gap: Optional[float] = None
+    nn_distance: float
+    improvement: float
+    two_opt_iterations: int
+    two_opt_stop_reason: str
+    solver: str = "heuristic"  # heuristic ou branch_and_bound
+    optimal: bool = False
+    phases_ms: Dict[str, float]
+
+
+class ExcludedDevice(BaseModel):
+    """Device pedido e não reservado pelo plano"""
+    device_id: str
+    outcome: str  # not_found, invalid_status, no_slot, contended (reservado por outro plano)
+    status: Optional[str] = None
+
+
 class PickingPlanResponse(BaseModel):
     """Response do plano de picking"""
     route: List[PickingItem]
     total_distance: float
     return_distance: Optional[float] = None
     start_position: Optional[StartPosition] = None
+    quality: Optional[PlanQuality] = None
+    plan_id: Optional[str] = None
+    excluded: List[ExcludedDevice] = []
+    cost_profile: Optional[str] = None
     error: Optional[str] = None
 
+
+
+class MarkPickedBulkRequest(BaseModel):
+    """Request para marcar uma rota inteira como coletada"""
+    device_ids: List[str]
+
+
+class DeviceTransitionResult(BaseModel):
+    """Resultado por device de uma transição em lote"""
+    device_id: str
+    outcome: str  # updated, not_found, invalid_status, no_slot
+    status: Optional[str] = None
+
+
+class BulkTransitionResponse(BaseModel):
+    """Response das transições de status em lote"""
+    success: bool
+    updated: int = 0
+    results: List[DeviceTransitionResult] = []
+    error: Optional[str] = None
@@ -13,6 +13,17 @@ class SlotResponse(BaseModel):
     occupied: bool
 
 
+class NearestSlot(SlotResponse):
+    """Slot livre com a distância até o ponto de partida"""
+    distance: Optional[float] = None
+
+
+class NearestSlotsResponse(BaseModel):
+    """Página de slots livres em ordem de distância"""
+    results: List[NearestSlot]
+    next_cursor: Optional[str] = None
+
+
 class AvailableSlotsRequest(BaseModel):
     """Request para buscar slots livres próximos"""
     limit: int = 50
@@ -1,24 +1,283 @@
 """
-Script para popular o banco de dados com a topologia fixa:
+Script para popular o banco de dados com a topologia do armazém.
+
+Topologia padrão (sem argumentos):
 - RUA 1: 1 prateleira na esquerda (P1)
 - RUA 2: 2 prateleiras (P1 esquerda, P2 direita)
 - RUA 3: 1 prateleira na direita (P1)
 - Cada prateleira: 24 linhas (horizontal) × 40 slots (horizontal) = 960 slots
 - Total: 4 prateleiras × 960 slots = 3.840 slots
+
+Outras topologias podem ser descritas em um arquivo JSON (--spec) ou geradas
+por argumentos (--aisles, --shelves-per-aisle, --rows, --cols, --shelf-side).
+Os slots são inseridos em lote (Core insert em blocos), o que permite montar
+armazéns com centenas de milhares de slots em segundos.
+
+Exemplo de spec JSON:
+{
+    "rows": 24,
+    "cols": 40,
+    "aisles": [
+        {"name": "RUA 1", "shelves": [{"code": "P1", "side": "left"}]},
+        {"name": "RUA 2", "shelves": [{"code": "P1", "side": "left"}, {"code": "P2", "side": "right"}]}
+    ]
+}
+
+Opcionalmente gera devices e histórico de movimentos sintéticos (--devices, --movements).
 """
 from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
 from models.database import SessionLocal, engine, Base
 from models.aisle import Aisle
 from models.shelf import Shelf
 from models.slot import Slot
+from models.device import Device, DeviceStatus
+from models.movement import Movement, MovementType
 from services.codecs import row_to_letter
+from datetime import datetime, timedelta
+from typing import Optional
+import argparse
+import json
+import random
+import time
+
+# Linhas são codificadas como letras (A..Z)
+MAX_ROWS = 26
+
+# Tamanho dos blocos de insert em lote
+CHUNK_SIZE = 10000
+
+DEFAULT_TOPOLOGY = {
+    "rows": 24,
+    "cols": 40,
+    "aisles": [
+        {"name": "RUA 1", "shelves": [{"code": "P1", "side": "left"}]},
+        {"name": "RUA 2", "shelves": [{"code": "P1", "side": "left"}, {"code": "P2", "side": "right"}]},
+        {"name": "RUA 3", "shelves": [{"code": "P1", "side": "right"}]},
+    ],
+}
+
+
+def build_topology(
+    aisles: int,
+    shelves_per_aisle: int,
+    rows: int,
+    cols: int,
+    shelf_side: str = "left"
+) -> dict:
+    """
+    Gera uma spec de topologia regular.
+    Com uma prateleira por rua, usa shelf_side; com duas ou mais,
+    alterna esquerda/direita (P1 esquerda, P2 direita, ...).
+    """
+    spec_aisles = []
+    for rua_num in range(1, aisles + 1):
+        shelves = []
+        for shelf_num in range(1, shelves_per_aisle + 1):
+            if shelves_per_aisle == 1:
+                side = shelf_side
+            else:
+                side = "left" if shelf_num % 2 == 1 else "right"
+            shelves.append({"code": f"P{shelf_num}", "side": side})
+        spec_aisles.append({"name": f"RUA {rua_num}", "shelves": shelves})
+    return {"rows": rows, "cols": cols, "aisles": spec_aisles}
+
+
+def validate_topology(spec: dict) -> None:
+    """Valida a spec antes de gravar (levanta ValueError)"""
+    rows = spec.get("rows")
+    cols = spec.get("cols")
+    if not isinstance(rows, int) or not 1 <= rows <= MAX_ROWS:
+        raise ValueError(f"rows deve estar entre 1 e {MAX_ROWS} (linhas são letras A..Z)")
+    if not isinstance(cols, int) or cols < 1:
+        raise ValueError("cols deve ser >= 1")
+    if not spec.get("aisles"):
+        raise ValueError("A topologia precisa de pelo menos uma rua")
+
+    names = set()
+    for aisle in spec["aisles"]:
+        name = aisle.get("name", "")
+        if not name.split() or not name.split()[-1].isdigit():
+            raise ValueError(f"Nome de rua inválido: {name!r} (esperado 'RUA <n>')")
+        if name in names:
+            raise ValueError(f"Rua duplicada: {name}")
+        names.add(name)
+        codes = set()
+        for shelf in aisle.get("shelves", []):
+            if shelf.get("code") in codes:
+                raise ValueError(f"Prateleira duplicada em {name}: {shelf.get('code')}")
+            codes.add(shelf.get("code"))
+            if shelf.get("side", "left") not in ("left", "right"):
+                raise ValueError(f"Lado inválido em {name}/{shelf.get('code')}: {shelf.get('side')}")
+
+
+def load_topology(path: str) -> dict:
+    """Carrega spec de topologia de um arquivo JSON"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _bulk_insert(db: Session, table, rows: list) -> None:
+    """Insere linhas em blocos de CHUNK_SIZE usando executemany do Core"""
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.execute(insert(table), rows[start:start + CHUNK_SIZE])
+
+
+def seed_topology(db: Session, spec: dict) -> dict:
+    """
+    Grava ruas, prateleiras e slots da spec usando inserts em lote.
+    Não faz commit. Retorna contagens criadas.
+    """
+    validate_topology(spec)
+    rows = spec["rows"]
+    cols = spec["cols"]
+    row_letters = [row_to_letter(r) for r in range(1, rows + 1)]
+
+    aisle_table = Aisle.__table__
+    shelf_table = Shelf.__table__
+    slot_table = Slot.__table__
+
+    shelves_created = 0
+    slots_created = 0
+    for aisle_spec in spec["aisles"]:
+        rua_num = aisle_spec["name"].split()[-1]
+        aisle_id = db.execute(
+            insert(aisle_table).values(name=aisle_spec["name"])
+        ).inserted_primary_key[0]
 
+        for shelf_spec in aisle_spec.get("shelves", []):
+            shelf_id = db.execute(
+                insert(shelf_table).values(
+                    aisle_id=aisle_id,
+                    code=shelf_spec["code"],
+                    side=shelf_spec.get("side", "left")
+                )
+            ).inserted_primary_key[0]
+            shelves_created += 1
 
-def seed_database():
-    """Popula o banco com a topologia fixa"""
+            slot_rows = []
+            for row in range(1, rows + 1):
+                prefix = f"R{rua_num}-{shelf_spec['code']}-{row_letters[row - 1]}-C"
+                for col in range(1, cols + 1):
+                    slot_rows.append({
+                        "aisle_id": aisle_id,
+                        "shelf_id": shelf_id,
+                        "row_index": row,
+                        "col_index": col,
+                        "human_code": f"{prefix}{col}",
+                        "occupied": False,
+                    })
+            _bulk_insert(db, slot_table, slot_rows)
+            slots_created += len(slot_rows)
+
+    return {
+        "aisles": len(spec["aisles"]),
+        "shelves": shelves_created,
+        "slots": slots_created,
+    }
+
+
+def seed_synthetic_inventory(
+    db: Session,
+    devices: int,
+    movements: int = 0,
+    history_days: int = 30,
+    random_seed: Optional[int] = None
+) -> dict:
+    """
+    Gera devices sintéticos em slots aleatórios e um histórico de movimentos
+    consistente com o estado final (CHECK_IN inicial + trocas de slot com
+    CHECK_OUT/CHECK_IN), com timestamps crescentes nos últimos history_days.
+    Não faz commit.
+    """
+    rng = random.Random(random_seed)
+    slot_ids = [row[0] for row in db.execute(
+        select(Slot.id).where(Slot.occupied == False)
+    )]
+    if devices > len(slot_ids):
+        raise ValueError(f"Devices ({devices}) excedem slots livres ({len(slot_ids)})")
+
+    rng.shuffle(slot_ids)
+    device_slot = {f"SYN{i:07d}": slot_ids[i] for i in range(devices)}
+    free_slots = slot_ids[devices:]
+
+    # Cada troca gera 2 movimentos (saída + entrada)
+    swaps = movements // 2 if free_slots else 0
+    total_events = devices + swaps
+    now = datetime.utcnow()
+    start = now - timedelta(days=history_days)
+    step = (now - start) / max(total_events, 1)
+
+    movement_rows = []
+    current = {}
+    ts = start
+    for device_id, slot_id in device_slot.items():
+        current[device_id] = slot_id
+        movement_rows.append({
+            "device_id": device_id,
+            "from_slot_id": None,
+            "to_slot_id": slot_id,
+            "type": MovementType.CHECK_IN,
+            "ts": ts,
+            "meta_json": {"synthetic": True},
+        })
+        ts += step
+
+    device_ids = list(device_slot.keys())
+    for _ in range(swaps):
+        device_id = rng.choice(device_ids)
+        free_index = rng.randrange(len(free_slots))
+        old_slot, new_slot = current[device_id], free_slots[free_index]
+        free_slots[free_index] = old_slot
+        current[device_id] = new_slot
+        movement_rows.append({
+            "device_id": device_id,
+            "from_slot_id": old_slot,
+            "to_slot_id": None,
+            "type": MovementType.CHECK_OUT,
+            "ts": ts,
+            "meta_json": {"synthetic": True},
+        })
+        movement_rows.append({
+            "device_id": device_id,
+            "from_slot_id": None,
+            "to_slot_id": new_slot,
+            "type": MovementType.CHECK_IN,
+            "ts": ts,
+            "meta_json": {"synthetic": True},
+        })
+        ts += step
+
+    _bulk_insert(db, Device.__table__, [
+        {"device_id": device_id, "index": i, "status": DeviceStatus.IN_STOCK, "slot_id": slot_id}
+        for i, (device_id, slot_id) in enumerate(current.items())
+    ])
+    _bulk_insert(db, Movement.__table__, movement_rows)
+
+    occupied = list(current.values())
+    for start_idx in range(0, len(occupied), CHUNK_SIZE):
+        chunk = occupied[start_idx:start_idx + CHUNK_SIZE]
+        db.execute(
+            Slot.__table__.update().where(Slot.id.in_(chunk)).values(occupied=True)
+        )
+
+    return {"devices": devices, "movements": len(movement_rows)}
+
+
+def seed_database(
+    spec: Optional[dict] = None,
+    devices: int = 0,
+    movements: int = 0,
+    history_days: int = 30,
+    random_seed: Optional[int] = None
+):
+    """Popula o banco com a topologia (padrão: topologia fixa) e, opcionalmente, dados sintéticos"""
     # Criar todas as tabelas
     Base.metadata.create_all(bind=engine)
 
+    spec = spec or DEFAULT_TOPOLOGY
+    started = time.perf_counter()
+
     db: Session = SessionLocal()
     try:
         # Verificar se já existe dados
@@ -26,67 +285,22 @@ def seed_database():
             print("Banco já possui dados. Use --force para recriar.")
             return
 
-        # Criar 3 Ruas
-        aisles = []
-        for rua_num in range(1, 4):
-            aisle = Aisle(name=f"RUA {rua_num}")
-            db.add(aisle)
-            aisles.append(aisle)
-
-        db.flush()  # Para obter os IDs das ruas
-
-        # Criar prateleiras conforme topologia:
-        # RUA 1: 1 prateleira na esquerda (P1)
-        # RUA 2: 2 prateleiras (P1 esquerda, P2 direita)
-        # RUA 3: 1 prateleira na direita (P1)
-        shelves = []
-        for aisle in aisles:
-            rua_num = int(aisle.name.split()[-1])
-            if rua_num == 1:
-                # RUA 1: apenas P1 (esquerda)
-                shelf = Shelf(aisle_id=aisle.id, code="P1")
-                db.add(shelf)
-                shelves.append(shelf)
-            elif rua_num == 2:
-                # RUA 2: P1 (esquerda) e P2 (direita)
-                shelf1 = Shelf(aisle_id=aisle.id, code="P1")
-                shelf2 = Shelf(aisle_id=aisle.id, code="P2")
-                db.add(shelf1)
-                db.add(shelf2)
-                shelves.append(shelf1)
-                shelves.append(shelf2)
-            elif rua_num == 3:
-                # RUA 3: apenas P1 (direita)
-                shelf = Shelf(aisle_id=aisle.id, code="P1")
-                db.add(shelf)
-                shelves.append(shelf)
-
-        db.flush()  # Para obter os IDs das prateleiras
-
-        # Criar slots: 24 linhas (horizontal) × 40 slots (horizontal) por prateleira
-        for shelf in shelves:
-            # Extrair número da rua do nome da rua (ex: "RUA 1" -> 1)
-            rua_num = shelf.aisle.name.split()[-1]
-            for row in range(1, 25):  # 1..24 (linhas horizontais)
-                row_letter = row_to_letter(row)
-                for col in range(1, 41):  # 1..40 (slots horizontais)
-                    human_code = f"R{rua_num}-{shelf.code}-{row_letter}-C{col}"
-                    slot = Slot(
-                        aisle_id=shelf.aisle_id,
-                        shelf_id=shelf.id,
-                        row_index=row,
-                        col_index=col,
-                        human_code=human_code,
-                        occupied=False
-                    )
-                    db.add(slot)
+        counts = seed_topology(db, spec)
+        synthetic = None
+        if devices:
+            synthetic = seed_synthetic_inventory(
+                db, devices, movements, history_days, random_seed
+            )
 
         db.commit()
-        total_slots = len(shelves) * 24 * 40
-        print(f"✅ Seed concluído!")
-        print(f"   - {len(aisles)} ruas criadas")
-        print(f"   - {len(shelves)} prateleiras criadas")
-        print(f"   - {total_slots} slots criados")
+        elapsed = time.perf_counter() - started
+        print(f"✅ Seed concluído em {elapsed:.2f}s!")
+        print(f"   - {counts['aisles']} ruas criadas")
+        print(f"   - {counts['shelves']} prateleiras criadas")
+        print(f"   - {counts['slots']} slots criados")
+        if synthetic:
+            print(f"   - {synthetic['devices']} devices sintéticos")
+            print(f"   - {synthetic['movements']} movimentos sintéticos")
 
     except Exception as e:
         db.rollback()
@@ -96,13 +310,44 @@ def seed_database():
         db.close()
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Popula o banco com a topologia do armazém")
+    parser.add_argument("--force", action="store_true", help="Apaga e recria o banco antes do seed")
+    parser.add_argument("--spec", help="Arquivo JSON com a topologia")
+    parser.add_argument("--aisles", type=int, help="Quantidade de ruas (topologia gerada)")
+    parser.add_argument("--shelves-per-aisle", type=int, default=1, help="Prateleiras por rua")
+    parser.add_argument("--rows", type=int, default=24, help=f"Linhas por prateleira (máx. {MAX_ROWS})")
+    parser.add_argument("--cols", type=int, default=40, help="Colunas por prateleira")
+    parser.add_argument("--shelf-side", choices=["left", "right"], default="left",
+                        help="Lado da prateleira quando há apenas uma por rua")
+    parser.add_argument("--devices", type=int, default=0, help="Devices sintéticos a gerar")
+    parser.add_argument("--movements", type=int, default=0, help="Movimentos sintéticos extras de histórico")
+    parser.add_argument("--history-days", type=int, default=30, help="Janela do histórico sintético")
+    parser.add_argument("--random-seed", type=int, default=None, help="Semente para dados sintéticos")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    import sys
-    if "--force" in sys.argv:
+    args = parse_args()
+
+    spec = None
+    if args.spec:
+        spec = load_topology(args.spec)
+    elif args.aisles:
+        spec = build_topology(
+            args.aisles, args.shelves_per_aisle, args.rows, args.cols, args.shelf_side
+        )
+
+    if args.force:
         # Deletar tudo e recriar
         Base.metadata.drop_all(bind=engine)
         Base.metadata.create_all(bind=engine)
         print("⚠️  Banco recriado do zero")
 
-    seed_database()
-
+    seed_database(
+        spec,
+        devices=args.devices,
+        movements=args.movements,
+        history_days=args.history_days,
+        random_seed=args.random_seed
+    )
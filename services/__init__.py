@@ -1,6 +1,7 @@
 from .distance_service import DistanceService
 from .assignment_service import AssignmentService
 from .picking_service import PickingService
+from .operator_service import OperatorService
 
-__all__ = ["DistanceService", "AssignmentService", "PickingService"]
+__all__ = ["DistanceService", "AssignmentService", "PickingService", "OperatorService"]
 
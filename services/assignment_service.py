@@ -8,6 +8,11 @@ from models.slot import Slot
 from models.device import Device, DeviceStatus
 from models.movement import Movement, MovementType
 from services.distance_service import DistanceService
+from services.cost_profile_service import CostProfile, DEFAULT_PROFILE
+from services.operator_service import OperatorService
+from services.inventory_version_service import InventoryVersionService
+from services.topology_registry import TopologyRegistry, format_human_code
+from services.metrics import SERVICE_STAGE_SECONDS, timed
 from typing import List, Optional
 import os
 from dotenv import load_dotenv
@@ -29,12 +34,11 @@ class AssignmentService:
         start_linha = int(os.getenv("START_LINHA", "1"))
         start_coluna = int(os.getenv("START_COLUNA", "1"))
 
-        from services.codecs import row_to_letter
-        row_letter = row_to_letter(start_linha)
-
-        # Buscar slot pelo human_code
-        human_code = f"R{start_rua}-{start_prateleira}-{row_letter}-C{start_coluna}"
-        slot = db.query(Slot).filter(Slot.human_code == human_code).first()
+        # human_code → id pelo registro de topologia; busca por chave primária
+        slot_id = TopologyRegistry.get(db).id_for_code(
+            format_human_code(start_rua, start_prateleira, start_linha, start_coluna)
+        )
+        slot = db.get(Slot, slot_id) if slot_id is not None else None
 
         if not slot:
             # Fallback: primeiro slot livre
@@ -45,13 +49,25 @@ class AssignmentService:
         return slot
 
     @staticmethod
-    def get_dynamic_start_slot(db: Session) -> Optional[Slot]:
+    def get_dynamic_start_slot(
+        db: Session,
+        operator_id: Optional[str] = None
+    ) -> Optional[Slot]:
         """
-        Usa o último movimento como ponto atual, priorizando:
+        Se operator_id for informado, usa a posição registrada do operador
+        (cada operador parte de onde realmente está).
+
+        Sem operador, usa o último movimento global como ponto atual, priorizando:
         - to_slot_id de CHECK_IN/MOVE (posição atual)
         - from_slot_id de CHECK_OUT (onde estávamos por último)
         Fallback: get_default_start_slot
         """
+        if operator_id:
+            slot = OperatorService.get_position_slot(db, operator_id)
+            if slot:
+                return slot
+            return AssignmentService.get_default_start_slot(db)
+
         last_move = db.query(Movement).order_by(Movement.ts.desc()).first()
         if last_move:
             if last_move.to_slot_id:
@@ -65,58 +81,70 @@ class AssignmentService:
         return AssignmentService.get_default_start_slot(db)
 
     @staticmethod
-    def find_nearest_free_slot(db: Session, current_slot: Slot) -> Optional[Slot]:
+    def find_nearest_free_slot(
+        db: Session,
+        current_slot: Slot,
+        profile: Optional[CostProfile] = None
+    ) -> Optional[Slot]:
         """
         Encontra o slot livre mais próximo do slot atual
         Verifica tanto o flag occupied quanto se já existe device usando o slot
+        Com profile, a distância usa os custos do perfil
         """
         # Buscar IDs de slots já ocupados por devices (flush para garantir que veja objetos pendentes)
         db.flush()
-        occupied_slot_ids = [row[0] for row in db.query(Device.slot_id).filter(
+        occupied_slot_ids = {row[0] for row in db.query(Device.slot_id).filter(
             Device.slot_id.isnot(None)
-        ).all()]
-
-        # Buscar slots que não estão ocupados E não têm device alocado
-        free_slots = db.query(Slot).filter(
-            Slot.occupied == False
-        ).all()
-        
-        # Filtrar slots que não estão na lista de ocupados
-        if occupied_slot_ids:
-            free_slots = [s for s in free_slots if s.id not in occupied_slot_ids]
-
-        if not free_slots:
+        ).all()}
+
+        # Só os ids dos slots livres vêm do banco; a geometria vem do registro de topologia
+        free_slot_ids = [
+            slot_id for (slot_id,) in db.query(Slot.id).filter(Slot.occupied == False)
+            if slot_id not in occupied_slot_ids
+        ]
+        if not free_slot_ids:
             return None
 
+        topology = TopologyRegistry.get(db)
+        distance = DistanceService.distance_function(profile)
+        a, s, r, c = current_slot.aisle_id, current_slot.shelf_id, current_slot.row_index, current_slot.col_index
+
         # Calcular distância e aplicar desempate priorizando mesma coluna
-        slots_with_distance = []
-        for slot in free_slots:
-            dist = DistanceService.calculate_distance(current_slot, slot)
-            d_col = abs(current_slot.col_index - slot.col_index)
-            d_row = abs(current_slot.row_index - slot.row_index)
+        best_key = None
+        best_id = None
+        for slot_id in free_slot_ids:
+            coords = topology.coords(slot_id)
+            if coords is None:
+                continue
+            aisle_id, shelf_id, row, col = coords
+            dist = 0 if slot_id == current_slot.id else distance(a, s, r, c, aisle_id, shelf_id, row, col)
             # chave: distância, variação de coluna, variação de linha, coluna, linha
-            key = (dist, d_col, d_row, slot.col_index, slot.row_index)
-            slots_with_distance.append((slot, key))
+            key = (dist, abs(c - col), abs(r - row), col, row)
+            if best_key is None or key < best_key:
+                best_key, best_id = key, slot_id
 
-        # Ordenar por distância com desempate determinístico
-        slots_with_distance.sort(key=lambda x: x[1])
-        return slots_with_distance[0][0]
+        return db.get(Slot, best_id) if best_id is not None else None
 
     @staticmethod
     def assign_devices_auto(
         db: Session,
         device_ids: List[str],
-        start_slot: Optional[Slot] = None
+        start_slot: Optional[Slot] = None,
+        operator_id: Optional[str] = None,
+        profile: Optional[CostProfile] = None
     ) -> dict:
         """
         Aloca automaticamente uma lista de devices em slots livres
         usando algoritmo guloso (sempre ao slot livre mais próximo)
+        Com operator_id, parte da posição do operador e a atualiza a cada alocação
+        Com profile, "mais próximo" segue os custos do perfil (ex.: zona dourada)
 
         Retorna:
             {
                 "assigned": [{device_id, slot_id, human_code}],
                 "failed": [device_id],
-                "current_position": {slot_id, human_code}
+                "current_position": {slot_id, human_code},
+                "cost_profile": str
             }
         """
         if not device_ids:
@@ -124,7 +152,8 @@ class AssignmentService:
 
         # Usar slot de início dinâmico (último movimento) se não fornecido
         if start_slot is None:
-            start_slot = AssignmentService.get_dynamic_start_slot(db)
+            with timed(SERVICE_STAGE_SECONDS.labels("assignment", "start_slot")):
+                start_slot = AssignmentService.get_dynamic_start_slot(db, operator_id)
 
         if not start_slot:
             return {
@@ -142,9 +171,10 @@ class AssignmentService:
         try:
             for device_id in device_ids:
                 # Encontrar slot livre mais próximo
-                nearest_slot = AssignmentService.find_nearest_free_slot(
-                    db, current_position
-                )
+                with timed(SERVICE_STAGE_SECONDS.labels("assignment", "find_nearest_free_slot")):
+                    nearest_slot = AssignmentService.find_nearest_free_slot(
+                        db, current_position, profile
+                    )
 
                 if not nearest_slot:
                     failed.append(device_id)
@@ -183,9 +213,11 @@ class AssignmentService:
                     from_slot_id=None,  # Alocação nova
                     to_slot_id=nearest_slot.id,
                     type=MovementType.CHECK_IN,
-                    meta_json={"auto_assigned": True}
+                    meta_json={"auto_assigned": True},
+                    operator_id=operator_id
                 )
                 db.add(movement)
+                OperatorService.update_position(db, operator_id, nearest_slot.id)
 
                 # Flush para garantir que o próximo find_nearest_free_slot veja esta alocação
                 db.flush()
@@ -201,7 +233,10 @@ class AssignmentService:
                 # Atualizar posição atual para o próximo device
                 current_position = nearest_slot
 
-            db.commit()
+            if assigned:
+                InventoryVersionService.bump(db)
+            with timed(SERVICE_STAGE_SECONDS.labels("assignment", "db_commit")):
+                db.commit()
 
             final_position = {
                 "slot_id": current_position.id,
@@ -211,7 +246,8 @@ class AssignmentService:
             return {
                 "assigned": assigned,
                 "failed": failed,
-                "current_position": final_position
+                "current_position": final_position,
+                "cost_profile": profile.name if profile is not None else DEFAULT_PROFILE
             }
 
         except Exception as e:
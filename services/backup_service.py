@@ -0,0 +1,261 @@
+"""
+Backups online do banco SQLite (API de backup do SQLite, sem parar o serviço):
+- Cópia incremental em passos de BACKUP_PAGES_PER_STEP páginas, com pausa
+  entre os passos para que scans e alocações gravem sem esperar
+- Se o banco muda durante a cópia, o SQLite reinicia o backup; após
+  BACKUP_MAX_RESTARTS reinícios a cópia é feita em um único passo (em WAL a
+  leitura não bloqueia escritas)
+- O arquivo é escrito como .partial e renomeado ao final: um backup listado
+  está sempre completo
+- Agendado (BACKUP_INTERVAL_SEC) e sob demanda (POST /backups), com retenção
+  dos BACKUP_KEEP mais recentes
+- Vários workers: cópia e poda rodam sob um lock de arquivo em BACKUP_DIR
+  (flock), e o agendamento pula o backup se outro worker já fez um recente
+"""
+from models.database import engine
+from services.metrics import SERVICE_STAGE_SECONDS, timed
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # sem flock (Windows): lock só dentro do processo
+    fcntl = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_SUFFIX = ".db"
+_PARTIAL_SUFFIX = ".partial"
+_LOCK_FILE = ".backup.lock"
+
+
+class BackupInProgress(Exception):
+    """Já existe um backup em andamento (neste ou em outro processo)"""
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+class BackupService:
+    """Cria, lista e poda backups do banco"""
+
+    DIRECTORY = os.getenv("BACKUP_DIR", "./storage/backups")
+    INTERVAL_SEC = int(os.getenv("BACKUP_INTERVAL_SEC", "86400"))  # 0 = sem agendamento
+    KEEP = int(os.getenv("BACKUP_KEEP", "7"))  # 0 = manter todos
+    PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+    STEP_PAUSE_SEC = float(os.getenv("BACKUP_STEP_PAUSE_SEC", "0.01"))
+    MAX_RESTARTS = int(os.getenv("BACKUP_MAX_RESTARTS", "3"))
+
+    _lock = threading.Lock()
+
+    @staticmethod
+    def database_path() -> Optional[str]:
+        """Arquivo do banco (None se não for SQLite em arquivo)"""
+        url = engine.url
+        if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+            return None
+        return os.path.abspath(url.database)
+
+    @staticmethod
+    @contextmanager
+    def _exclusive(blocking: bool):
+        """
+        Lock do diretório de backups entre threads e processos (flock em
+        BACKUP_DIR/.backup.lock); sem blocking, levanta BackupInProgress se ocupado
+        """
+        if not BackupService._lock.acquire(blocking=blocking):
+            raise BackupInProgress()
+        try:
+            os.makedirs(BackupService.DIRECTORY, exist_ok=True)
+            with open(os.path.join(BackupService.DIRECTORY, _LOCK_FILE), "a") as lock_file:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                    except BlockingIOError:
+                        raise BackupInProgress()
+                yield
+        finally:
+            BackupService._lock.release()
+
+    @staticmethod
+    def _prefix(database_path: str) -> str:
+        return os.path.splitext(os.path.basename(database_path))[0] + "-"
+
+    @staticmethod
+    def _copy(source: sqlite3.Connection, target_path: str, pages: int) -> int:
+        """Executa a API de backup; retorna quantos reinícios houve"""
+        state = {"remaining": None, "restarts": 0}
+
+        def progress(status, remaining, total):
+            # Restante aumentou: o banco mudou e o SQLite recomeçou a cópia
+            if state["remaining"] is not None and remaining > state["remaining"]:
+                state["restarts"] += 1
+                if state["restarts"] > BackupService.MAX_RESTARTS:
+                    raise _TooManyRestarts()
+            state["remaining"] = remaining
+            if remaining and BackupService.STEP_PAUSE_SEC > 0:
+                time.sleep(BackupService.STEP_PAUSE_SEC)
+
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target, pages=pages, progress=progress)
+            # Arquivo autocontido (a cópia herda o modo WAL da origem)
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+        return state["restarts"]
+
+    @staticmethod
+    def create_backup(skip_if_newer_than_sec: Optional[float] = None) -> Optional[dict]:
+        """
+        Cria um backup completo; levanta BackupInProgress se já houver um rodando
+        (em qualquer worker). Com skip_if_newer_than_sec, retorna None sem copiar
+        se o backup mais recente for mais novo que isso (agendamento por worker)
+        """
+        database_path = BackupService.database_path()
+        if database_path is None:
+            raise ValueError("Backup disponível apenas para SQLite em arquivo")
+
+        with BackupService._exclusive(blocking=False):
+            if skip_if_newer_than_sec is not None:
+                latest = BackupService._latest_mtime(database_path)
+                if latest is not None and time.time() - latest < skip_if_newer_than_sec:
+                    return None
+            return BackupService._create_locked(database_path)
+
+    @staticmethod
+    def _create_locked(database_path: str) -> dict:
+        partial_path = None
+        try:
+            now = datetime.utcnow()
+            name = f"{BackupService._prefix(database_path)}{now:%Y%m%d-%H%M%S}-{now.microsecond // 1000:03d}{_SUFFIX}"
+            final_path = os.path.join(BackupService.DIRECTORY, name)
+            partial_path = final_path + _PARTIAL_SUFFIX
+
+            started = time.perf_counter()
+            source = sqlite3.connect(database_path, check_same_thread=False)
+            try:
+                with timed(SERVICE_STAGE_SECONDS.labels("backup", "copy")):
+                    incremental = True
+                    try:
+                        restarts = BackupService._copy(
+                            source, partial_path, max(1, BackupService.PAGES_PER_STEP)
+                        )
+                    except _TooManyRestarts:
+                        # Escritas contínuas: copiar o restante de uma vez
+                        logger.info(
+                            "Backup reiniciado mais de %d vezes: cópia em um passo", BackupService.MAX_RESTARTS
+                        )
+                        os.remove(partial_path)
+                        incremental = False
+                        restarts = BackupService.MAX_RESTARTS + 1
+                        BackupService._copy(source, partial_path, -1)
+            finally:
+                source.close()
+            os.replace(partial_path, final_path)
+
+            pruned = BackupService._prune_locked(BackupService.KEEP)
+            return {
+                "name": name,
+                "path": final_path,
+                "size_bytes": os.path.getsize(final_path),
+                "duration_ms": (time.perf_counter() - started) * 1000,
+                "incremental": incremental,
+                "restarts": restarts,
+                "pruned": pruned,
+            }
+        except Exception:
+            if partial_path and os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+    @staticmethod
+    def list_backups() -> List[dict]:
+        """Backups completos, do mais recente para o mais antigo"""
+        database_path = BackupService.database_path()
+        if database_path is None or not os.path.isdir(BackupService.DIRECTORY):
+            return []
+        prefix = BackupService._prefix(database_path)
+        backups = []
+        for name in os.listdir(BackupService.DIRECTORY):
+            if not (name.startswith(prefix) and name.endswith(_SUFFIX)):
+                continue
+            path = os.path.join(BackupService.DIRECTORY, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Podado por outro processo durante a listagem
+                continue
+            backups.append({
+                "name": name,
+                "size_bytes": stat.st_size,
+                "created_at": datetime.utcfromtimestamp(stat.st_mtime).isoformat(),
+            })
+        # Nome leva o instante (AAAAMMDD-HHMMSS-mmm): ordem lexicográfica = cronológica
+        return sorted(backups, key=lambda backup: backup["name"], reverse=True)
+
+    @staticmethod
+    def _latest_mtime(database_path: str) -> Optional[float]:
+        prefix = BackupService._prefix(database_path)
+        latest = None
+        for name in os.listdir(BackupService.DIRECTORY):
+            if name.startswith(prefix) and name.endswith(_SUFFIX):
+                try:
+                    mtime = os.stat(os.path.join(BackupService.DIRECTORY, name)).st_mtime
+                except FileNotFoundError:
+                    continue
+                latest = mtime if latest is None else max(latest, mtime)
+        return latest
+
+    @staticmethod
+    def prune(keep: Optional[int] = None) -> List[str]:
+        """Remove os backups além dos keep mais recentes; retorna os nomes removidos"""
+        keep = keep if keep is not None else BackupService.KEEP
+        with BackupService._exclusive(blocking=True):
+            return BackupService._prune_locked(keep)
+
+    @staticmethod
+    def _prune_locked(keep: int) -> List[str]:
+        if keep <= 0:
+            return []
+        removed = []
+        for backup in BackupService.list_backups()[keep:]:
+            try:
+                os.remove(os.path.join(BackupService.DIRECTORY, backup["name"]))
+            except FileNotFoundError:
+                # Já removido (ex.: manualmente): nada a fazer
+                continue
+            removed.append(backup["name"])
+        return removed
+
+
+async def run_backup_scheduler(interval_sec: Optional[int] = None) -> None:
+    """Loop em background que cria backups periódicos (thread separada)"""
+    interval_sec = interval_sec or BackupService.INTERVAL_SEC
+
+    while True:
+        await asyncio.sleep(interval_sec)
+        try:
+            # Cada worker tem o próprio agendamento: só um backup por intervalo
+            result = await asyncio.to_thread(BackupService.create_backup, interval_sec / 2)
+            if result is None:
+                logger.info("Backup agendado ignorado: outro worker fez um backup recente")
+                continue
+            logger.info("Backup criado: %s (%.0f ms)", result["name"], result["duration_ms"])
+        except asyncio.CancelledError:
+            raise
+        except BackupInProgress:
+            logger.info("Backup agendado ignorado: outro backup em andamento")
+        except Exception:
+            logger.exception("Erro ao criar backup do banco")
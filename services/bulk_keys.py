@@ -0,0 +1,72 @@
+"""
+Filtro por listas grandes de chaves (device_ids, slot_ids):
+- Até BULK_KEYS_TEMP_TABLE_MIN chaves: IN (...) comum
+- Acima disso: as chaves vão para uma tabela temporária da conexão (inserts em
+  lote via executemany) e o filtro vira IN (SELECT key FROM tabela), que o
+  banco resolve como join. O statement tem tamanho constante, não esbarra no
+  limite de variáveis do SQLite e serve também para UPDATE/DELETE.
+"""
+from sqlalchemy import Column, Integer, MetaData, String, Table, delete, insert, select
+from sqlalchemy.orm import Session
+from contextlib import contextmanager, suppress
+from typing import Iterable, Iterator, List
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_metadata = MetaData()
+
+# Uma tabela por tipo de chave; TEMPORARY = visível só na conexão que a criou
+_TABLES = {
+    str: Table("_bulk_keys_str", _metadata, Column("key", String, primary_key=True), prefixes=["TEMPORARY"]),
+    int: Table("_bulk_keys_int", _metadata, Column("key", Integer, primary_key=True), prefixes=["TEMPORARY"]),
+}
+
+
+class BulkKeys:
+    """Critério de filtro por muitas chaves, por IN direto ou tabela temporária"""
+
+    TEMP_TABLE_MIN = int(os.getenv("BULK_KEYS_TEMP_TABLE_MIN", "500"))
+    CHUNK_SIZE = int(os.getenv("BULK_KEYS_CHUNK_SIZE", "5000"))  # linhas por executemany
+
+    @staticmethod
+    def unique(keys: Iterable) -> List:
+        """Chaves sem repetição (e sem None), na ordem original"""
+        return list(dict.fromkeys(key for key in keys if key is not None))
+
+    @staticmethod
+    def chunks(keys: List, size: int = None) -> Iterator[List]:
+        size = size or BulkKeys.CHUNK_SIZE
+        for start in range(0, len(keys), size):
+            yield keys[start:start + size]
+
+    @staticmethod
+    @contextmanager
+    def matching(db: Session, column, keys: Iterable):
+        """
+        Critério "column pertence a keys" para usar em filter()/where().
+        Com tabela temporária, as chaves valem até o fim do bloco with (mesma
+        transação de db); não aninhar dois blocos do mesmo tipo de chave.
+        """
+        keys = BulkKeys.unique(keys)
+        if len(keys) <= BulkKeys.TEMP_TABLE_MIN:
+            yield column.in_(keys)
+            return
+
+        table = _TABLES[int if isinstance(keys[0], int) else str]
+        connection = db.connection()
+        table.create(bind=connection, checkfirst=True)
+        connection.execute(delete(table))
+        for chunk in BulkKeys.chunks(keys):
+            connection.execute(insert(table), [{"key": key} for key in chunk])
+        try:
+            yield column.in_(select(table.c.key))
+        except BaseException:
+            # Limpa mesmo com erro no bloco (o chamador pode seguir usando a sessão);
+            # se a transação já ficou inválida, o rollback descarta as chaves
+            with suppress(Exception):
+                connection.execute(delete(table))
+            raise
+        else:
+            connection.execute(delete(table))
@@ -0,0 +1,201 @@
+"""
+Feed de mudanças do inventário (server push):
+- Mudanças de ocupação de slot, status de device e novos movimentos são
+  capturadas no flush da sessão e publicadas no commit, agrupadas pela
+  versão do inventário (uma mensagem por versão)
+- Broker em processo: cada assinante (SSE/WebSocket) tem uma fila própria
+  no seu loop de eventos; publicar é seguro a partir de qualquer thread
+- Buffer circular das últimas versões para replay na reconexão; se o buffer
+  não cobre a versão pedida (ou há saltos de versão, p.ex. mutações de outro
+  worker), o assinante recebe "resync" e recarrega o estado pelas leituras
+"""
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models.database import SessionLocal
+from models.slot import Slot
+from models.device import Device
+from models.movement import Movement
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_STAGED_KEY = "change_feed_changes"
+
+
+def _value(value):
+    return getattr(value, "value", value)
+
+
+class Subscription:
+    """Fila de um assinante, consumida no loop de eventos em que foi criada"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def deliver(self, message: dict) -> None:
+        # Executado no loop do assinante (call_soon_threadsafe)
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Assinante lento: descarta e pede resync em vez de acumular memória
+            self.overflowed = True
+
+
+class ChangeFeed:
+    """Broker em processo com replay por versão"""
+
+    BUFFER_SIZE = int(os.getenv("CHANGE_FEED_BUFFER", "1000"))  # versões guardadas para replay
+    QUEUE_SIZE = int(os.getenv("CHANGE_FEED_QUEUE_SIZE", "256"))  # mensagens pendentes por assinante
+    HEARTBEAT_SEC = float(os.getenv("CHANGE_FEED_HEARTBEAT_SEC", "15"))
+
+    _buffer: deque = deque(maxlen=max(1, BUFFER_SIZE))
+    _subscribers: set = set()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def stage(db: Session, change: dict) -> None:
+        """Registra uma mudança na transação atual (publicada no commit com a versão)"""
+        db.info.setdefault(_STAGED_KEY, []).append(change)
+
+    @staticmethod
+    def take_staged(db: Session) -> List[dict]:
+        return db.info.pop(_STAGED_KEY, None) or []
+
+    @staticmethod
+    def publish(version: int, changes: List[dict]) -> None:
+        """Publica a versão (chamado após o commit que a gravou)"""
+        message = {"version": version, "ts": datetime.utcnow().isoformat(), "changes": changes}
+        with ChangeFeed._lock:
+            ChangeFeed._buffer.append(message)
+            subscribers = list(ChangeFeed._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # Loop já encerrado: o assinante será removido ao sair
+                pass
+
+    @staticmethod
+    def subscribe(since: Optional[int]) -> Tuple[Subscription, Optional[List[dict]]]:
+        """
+        Registra um assinante no loop atual. Retorna (assinatura, replay):
+        replay são as versões > since ainda no buffer, ou None se o buffer
+        não cobre since (o cliente deve fazer resync).
+        """
+        subscription = Subscription(asyncio.get_running_loop(), max(1, ChangeFeed.QUEUE_SIZE))
+        with ChangeFeed._lock:
+            # Registro e cópia do buffer sob o mesmo lock: nada se perde entre os dois
+            ChangeFeed._subscribers.add(subscription)
+            buffered = list(ChangeFeed._buffer)
+
+        if since is None:
+            return subscription, []
+        replay = [message for message in buffered if message["version"] > since]
+        expected = since + 1
+        for message in replay:
+            if message["version"] != expected:
+                return subscription, None
+            expected += 1
+        return subscription, replay
+
+    @staticmethod
+    def unsubscribe(subscription: Subscription) -> None:
+        with ChangeFeed._lock:
+            ChangeFeed._subscribers.discard(subscription)
+
+    @staticmethod
+    def subscriber_count() -> int:
+        return len(ChangeFeed._subscribers)
+
+    @staticmethod
+    async def listen(
+        since: Optional[int],
+        current_version: Callable[[], int]
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Itera ("change", mensagem), ("resync", {"version"}) e ("heartbeat", {}).
+        current_version (bloqueante, roda em thread) dá o ponto de partida quando
+        since é None e detecta, a cada heartbeat, versões que não passaram por
+        este processo.
+        """
+        subscription, replay = ChangeFeed.subscribe(since)
+        try:
+            current = await asyncio.to_thread(current_version)
+            last = since if since is not None else current
+            if replay is None or last > current:
+                # Buffer não cobre since, ou versão desconhecida (banco recriado)
+                last = current
+                yield "resync", {"version": last}
+            else:
+                for message in replay:
+                    last = message["version"]
+                    yield "change", message
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), ChangeFeed.HEARTBEAT_SEC)
+                except asyncio.TimeoutError:
+                    current = await asyncio.to_thread(current_version)
+                    if current > last:
+                        last = current
+                        yield "resync", {"version": last}
+                    else:
+                        yield "heartbeat", {}
+                    continue
+
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    while not subscription.queue.empty():
+                        subscription.queue.get_nowait()
+                    last = max(last, message["version"])
+                    yield "resync", {"version": last}
+                    continue
+                if message["version"] <= last:
+                    continue  # já enviado no replay
+                if message["version"] != last + 1:
+                    last = message["version"]
+                    yield "resync", {"version": last}
+                    continue
+                last = message["version"]
+                yield "change", message
+        finally:
+            ChangeFeed.unsubscribe(subscription)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _capture_changes(session: Session, flush_context) -> None:
+    """Converte o que o flush gravou em mudanças compactas (ids já atribuídos)"""
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Slot):
+            if obj in session.new:
+                continue  # criação de topologia, não ocupação
+            if inspect(obj).attrs.occupied.history.has_changes():
+                ChangeFeed.stage(session, {
+                    "kind": "slot", "id": obj.id, "human_code": obj.human_code, "occupied": obj.occupied
+                })
+        elif isinstance(obj, Device):
+            status = inspect(obj).attrs.status.history
+            slot = inspect(obj).attrs.slot_id.history
+            if obj in session.new or status.has_changes() or slot.has_changes():
+                ChangeFeed.stage(session, {
+                    "kind": "device",
+                    "device_id": obj.device_id,
+                    "status": _value(obj.status),
+                    "previous_status": _value(status.deleted[0]) if status.deleted else None,
+                    "slot_id": obj.slot_id,
+                })
+        elif isinstance(obj, Movement) and obj in session.new:
+            ChangeFeed.stage(session, {
+                "kind": "movement", "id": obj.id, "device_id": obj.device_id, "type": _value(obj.type)
+            })
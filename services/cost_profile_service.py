@@ -0,0 +1,366 @@
+"""
+Perfis de custo nomeados (a pé, carrinho, escada...) escolhidos por requisição:
+- Custos próprios de rua/prateleira/linha/coluna
+- Linhas altas: a partir de uma linha (ex.: R), subir ou descer cada linha custa
+  mais (escada); o custo vertical é a diferença entre as posições acumuladas
+- Zona dourada: slots fora da faixa de linhas ergonômica pagam um custo de
+  acesso, dividido entre as duas pontas do trecho (a distância continua simétrica)
+
+O perfil "default" é o modelo global (CUSTO_* do .env) e não pode ser
+redefinido; os demais são os embutidos mais os de COST_PROFILES_FILE.
+Cada perfil monta sob demanda, e guarda, as próprias tabelas de custo por linha;
+a parte horizontal do modelo físico (layout) é geometria e continua compartilhada.
+
+Recarga a quente: o arquivo é verificado a cada COST_PROFILES_CHECK_INTERVAL_SEC
+(mtime) ou via POST /cost-profiles/reload; os novos perfis substituem os
+anteriores por referência (requisições em andamento terminam com o perfil antigo).
+"""
+from services.codecs import letter_to_row
+from services.distance_service import DistanceService
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = "default"
+
+# Perfis embutidos (custos ausentes herdam do "default"); o arquivo pode sobrescrevê-los
+BUILTIN_PROFILES = {
+    "walking": {
+        "description": "Separador a pé: linhas altas pedem banqueta, preferência pela zona dourada",
+        "high_rows": {"from": "R", "row_cost": 3},
+        "golden_zone": {"from": "E", "to": "L", "outside_cost": 2},
+    },
+    "cart": {
+        "description": "Carrinho: trocar de rua ou de prateleira custa mais (manobra)",
+        "aisle_cost": 20,
+        "shelf_cost": 8,
+    },
+    "ladder": {
+        "description": "Linhas R-X exigem escada",
+        "high_rows": {"from": "R", "row_cost": 6},
+    },
+}
+
+
+def _row(value, field: str) -> int:
+    """Linha informada como índice (1..) ou letra (A..X)"""
+    if isinstance(value, int) and value >= 1:
+        return value
+    if isinstance(value, str) and len(value.strip()) == 1 and value.strip().isalpha():
+        return letter_to_row(value)
+    raise ValueError(f"{field}: linha inválida ({value!r})")
+
+
+def _cost(value, field: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f"{field}: custo inválido ({value!r})")
+    return value
+
+
+class CostProfile:
+    """Custos de um perfil (imutável) com tabelas por linha montadas sob demanda"""
+
+    __slots__ = (
+        "name", "description", "aisle_cost", "shelf_cost", "row_cost", "col_cost",
+        "high_rows_from", "high_row_cost", "golden_zone", "outside_zone_cost",
+        "version", "layout_aisle_extra", "layout_shelf_extra", "_rows",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        aisle_cost,
+        shelf_cost,
+        row_cost,
+        col_cost,
+        high_rows_from: Optional[int] = None,
+        high_row_cost=None,
+        golden_zone: Optional[Tuple[int, int]] = None,
+        outside_zone_cost=0,
+        description: str = ""
+    ):
+        self.name = name
+        self.description = description
+        self.aisle_cost = aisle_cost
+        self.shelf_cost = shelf_cost
+        self.row_cost = row_cost
+        self.col_cost = col_cost
+        self.high_rows_from = high_rows_from
+        self.high_row_cost = row_cost if high_row_cost is None else high_row_cost
+        self.golden_zone = golden_zone
+        self.outside_zone_cost = outside_zone_cost
+        payload = (
+            aisle_cost, shelf_cost, row_cost, col_cost,
+            high_rows_from, self.high_row_cost, golden_zone, outside_zone_cost,
+        )
+        # Identifica os custos (caches e cursores de outro perfil/versão não se misturam)
+        self.version = hashlib.sha1(repr(payload).encode("utf-8")).hexdigest()[:12]
+        # Com layout, o caminho físico já inclui a troca de rua/prateleira do modelo
+        # global; o que o perfil cobra acima disso (manobra) entra por cima
+        self.layout_aisle_extra = max(0, aisle_cost - DistanceService.CUSTO_MUDAR_RUA)
+        self.layout_shelf_extra = max(0, shelf_cost - DistanceService.CUSTO_MUDAR_PRATELEIRA)
+        # (posição vertical acumulada, custo de acesso) por linha; índice 0 sem uso
+        self._rows: Tuple[List, List] = ([0, 0], [0, self._access_cost(1)])
+
+    @staticmethod
+    def from_spec(name: str, spec: dict, base: "CostProfile") -> "CostProfile":
+        """Perfil a partir da spec do arquivo; custos ausentes herdam de base"""
+        if not isinstance(spec, dict):
+            raise ValueError(f"Perfil {name}: spec deve ser um objeto")
+
+        def cost(key: str, default):
+            return _cost(spec[key], f"{name}.{key}") if key in spec else default
+
+        high_rows_from = high_row_cost = None
+        high_rows = spec.get("high_rows")
+        if high_rows:
+            high_rows_from = _row(high_rows.get("from"), f"{name}.high_rows.from")
+            high_row_cost = _cost(high_rows.get("row_cost"), f"{name}.high_rows.row_cost")
+
+        golden_zone = None
+        outside_zone_cost = 0
+        zone = spec.get("golden_zone")
+        if zone:
+            golden_zone = (
+                _row(zone.get("from"), f"{name}.golden_zone.from"),
+                _row(zone.get("to"), f"{name}.golden_zone.to"),
+            )
+            if golden_zone[0] > golden_zone[1]:
+                raise ValueError(f"{name}.golden_zone: from depois de to")
+            outside_zone_cost = _cost(zone.get("outside_cost", 0), f"{name}.golden_zone.outside_cost")
+
+        return CostProfile(
+            name,
+            aisle_cost=cost("aisle_cost", base.aisle_cost),
+            shelf_cost=cost("shelf_cost", base.shelf_cost),
+            row_cost=cost("row_cost", base.row_cost),
+            col_cost=cost("col_cost", base.col_cost),
+            high_rows_from=high_rows_from,
+            high_row_cost=high_row_cost,
+            golden_zone=golden_zone,
+            outside_zone_cost=outside_zone_cost,
+            description=str(spec.get("description", "")),
+        )
+
+    def _step_cost(self, row: int):
+        """Custo de passar da linha row - 1 para row"""
+        if self.high_rows_from is not None and row >= self.high_rows_from:
+            return self.high_row_cost
+        return self.row_cost
+
+    def _access_cost(self, row: int):
+        zone = self.golden_zone
+        if zone is None or zone[0] <= row <= zone[1]:
+            return 0
+        return self.outside_zone_cost
+
+    def _extend(self, row: int) -> Tuple[List, List]:
+        """Estende as tabelas até a linha row (troca por referência, segura entre threads)"""
+        offsets, access = self._rows
+        offsets, access = list(offsets), list(access)
+        for r in range(len(offsets), row + 1):
+            offsets.append(offsets[-1] + self._step_cost(r))
+            access.append(self._access_cost(r))
+        self._rows = (offsets, access)
+        return self._rows
+
+    def distance_from_coords(
+        self,
+        layout,
+        aisle_id_1, shelf_id_1, row_1, col_1,
+        aisle_id_2, shelf_id_2, row_2, col_2
+    ):
+        """
+        Distância com os custos do perfil. Com layout, a parte horizontal vem
+        da tabela do modelo físico mais o que aisle_cost/shelf_cost excedem os
+        custos globais (col_cost e reduções não se aplicam: ver layout_ignored)
+        """
+        travel = None
+        if layout is not None:
+            travel = layout.travel_cost(aisle_id_1, shelf_id_1, col_1, aisle_id_2, shelf_id_2, col_2)
+            if travel is not None:
+                if aisle_id_1 != aisle_id_2:
+                    travel += self.layout_aisle_extra
+                if shelf_id_1 != shelf_id_2:
+                    travel += self.layout_shelf_extra
+        if travel is None:
+            travel = abs(col_1 - col_2) * self.col_cost
+            if aisle_id_1 != aisle_id_2:
+                travel += self.aisle_cost
+            if shelf_id_1 != shelf_id_2:
+                travel += self.shelf_cost
+
+        offsets, access = self._rows
+        if row_1 >= len(offsets) or row_2 >= len(offsets):
+            offsets, access = self._extend(max(row_1, row_2))
+
+        cost = travel + abs(offsets[row_1] - offsets[row_2])
+        if self.golden_zone is not None and (travel or row_1 != row_2):
+            cost += (access[row_1] + access[row_2]) / 2
+        return cost
+
+    def layout_ignored(self) -> List[str]:
+        """Custos do perfil que o modelo físico (DISTANCE_MODEL=layout) não aplica"""
+        ignored = []
+        if self.col_cost != DistanceService.CUSTO_POR_COLUNA:
+            ignored.append("col_cost")
+        if self.aisle_cost < DistanceService.CUSTO_MUDAR_RUA:
+            ignored.append("aisle_cost")
+        if self.shelf_cost < DistanceService.CUSTO_MUDAR_PRATELEIRA:
+            ignored.append("shelf_cost")
+        return ignored
+
+    def to_dict(self, layout_active: bool = False) -> dict:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "version": self.version,
+            "aisle_cost": self.aisle_cost,
+            "shelf_cost": self.shelf_cost,
+            "row_cost": self.row_cost,
+            "col_cost": self.col_cost,
+            "high_rows": (
+                {"from": self.high_rows_from, "row_cost": self.high_row_cost}
+                if self.high_rows_from is not None else None
+            ),
+            "golden_zone": (
+                {"from": self.golden_zone[0], "to": self.golden_zone[1], "outside_cost": self.outside_zone_cost}
+                if self.golden_zone is not None else None
+            ),
+            "layout_ignored": self.layout_ignored() if layout_active else [],
+        }
+
+
+class CostProfileService:
+    """Perfis de custo correntes do processo (carregados sob demanda, recarregáveis)"""
+
+    FILE = os.getenv("COST_PROFILES_FILE", "cost_profiles.json")
+    CHECK_INTERVAL_SEC = int(os.getenv("COST_PROFILES_CHECK_INTERVAL_SEC", "10"))  # 0 = sem recarga automática
+
+    _profiles: Optional[Dict[str, CostProfile]] = None
+    _mtime: Optional[float] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _file_mtime() -> Optional[float]:
+        path = CostProfileService.FILE
+        return os.path.getmtime(path) if path and os.path.exists(path) else None
+
+    @staticmethod
+    def default_profile() -> CostProfile:
+        """Modelo global (CUSTO_* do .env)"""
+        return CostProfile(
+            DEFAULT_PROFILE,
+            aisle_cost=DistanceService.CUSTO_MUDAR_RUA,
+            shelf_cost=DistanceService.CUSTO_MUDAR_PRATELEIRA,
+            row_cost=DistanceService.CUSTO_POR_LINHA,
+            col_cost=DistanceService.CUSTO_POR_COLUNA,
+            description="Custos globais do .env (CUSTO_*)",
+        )
+
+    @staticmethod
+    def _build(specs: dict) -> Dict[str, CostProfile]:
+        base = CostProfileService.default_profile()
+        profiles = {DEFAULT_PROFILE: base}
+        for name, spec in specs.items():
+            if name == DEFAULT_PROFILE:
+                logger.warning("Perfil %s ignorado: use as variáveis CUSTO_* do .env", DEFAULT_PROFILE)
+                continue
+            profiles[name] = CostProfile.from_spec(name, spec, base)
+        return profiles
+
+    @staticmethod
+    def load() -> Dict[str, CostProfile]:
+        """
+        Monta os perfis (embutidos + arquivo) e os publica. Arquivo inválido
+        levanta ValueError e mantém os perfis atuais (na primeira carga, só os
+        embutidos).
+
+        Formato do arquivo (linhas por letra ou índice):
+        {
+            "ladder": {"high_rows": {"from": "R", "row_cost": 6}},
+            "walking": {"golden_zone": {"from": "E", "to": "L", "outside_cost": 2}},
+            "cart": {"aisle_cost": 20, "shelf_cost": 8}
+        }
+        """
+        with CostProfileService._lock:
+            # mtime da tentativa: o watcher não repete a carga de um arquivo inválido
+            mtime = CostProfileService._mtime = CostProfileService._file_mtime()
+            specs = dict(BUILTIN_PROFILES)
+            try:
+                if mtime is not None:
+                    try:
+                        with open(CostProfileService.FILE, encoding="utf-8") as f:
+                            data = json.load(f)
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"{CostProfileService.FILE}: JSON inválido ({e})")
+                    if not isinstance(data, dict):
+                        raise ValueError(f"{CostProfileService.FILE}: esperado um objeto nome → perfil")
+                    specs.update(data)
+                profiles = CostProfileService._build(specs)
+            except ValueError:
+                if CostProfileService._profiles is None:
+                    CostProfileService._profiles = CostProfileService._build(BUILTIN_PROFILES)
+                raise
+            CostProfileService._profiles = profiles
+        logger.info("Perfis de custo carregados: %s", ", ".join(sorted(profiles)))
+        return profiles
+
+    @staticmethod
+    def profiles() -> Dict[str, CostProfile]:
+        profiles = CostProfileService._profiles
+        if profiles is not None:
+            return profiles
+        try:
+            return CostProfileService.load()
+        except ValueError:
+            logger.exception("Arquivo de perfis inválido: usando só os perfis embutidos")
+            return CostProfileService._profiles
+
+    @staticmethod
+    def get(name: Optional[str] = None) -> Optional[CostProfile]:
+        """Perfil pelo nome (None = "default"); None se não existir"""
+        return CostProfileService.profiles().get(name or DEFAULT_PROFILE)
+
+    @staticmethod
+    def refresh() -> bool:
+        """Recarrega se o arquivo mudou; retorna True quando trocou os perfis"""
+        if (
+            CostProfileService._profiles is not None
+            and CostProfileService._file_mtime() == CostProfileService._mtime
+        ):
+            return False
+        CostProfileService.load()
+        return True
+
+    @staticmethod
+    def list_profiles() -> List[dict]:
+        layout_active = DistanceService.layout() is not None
+        return [
+            profile.to_dict(layout_active)
+            for _, profile in sorted(CostProfileService.profiles().items())
+        ]
+
+
+async def run_cost_profile_watcher(interval_sec: Optional[int] = None) -> None:
+    """Verifica periodicamente o arquivo de perfis e recarrega quando muda"""
+    interval_sec = interval_sec or CostProfileService.CHECK_INTERVAL_SEC
+
+    while True:
+        await asyncio.sleep(interval_sec)
+        try:
+            if await asyncio.to_thread(CostProfileService.refresh):
+                logger.info("Perfis de custo alterados: recarregados")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Erro ao recarregar os perfis de custo")
@@ -1,6 +1,12 @@
 """
 Serviço para cálculo de distância Manhattan entre slots
 com custos configuráveis por mudança de rua/prateleira
+
+Com DISTANCE_MODEL=layout, usa o modelo físico (services/layout_service.py):
+menores caminhos pelo grafo de corredores, lidos de uma tabela mapeada em memória.
+
+Com um perfil de custo (services/cost_profile_service.py), os custos vêm do
+perfil em vez do .env; sem perfil, vale o modelo global.
 """
 import os
 from dotenv import load_dotenv
@@ -17,19 +23,63 @@ class DistanceService:
     CUSTO_POR_LINHA = int(os.getenv("CUSTO_POR_LINHA", "1"))
     CUSTO_POR_COLUNA = int(os.getenv("CUSTO_POR_COLUNA", "1"))
 
+    # "manhattan" (padrão) ou "layout" (modelo físico com tabela pré-calculada)
+    DISTANCE_MODEL = os.getenv("DISTANCE_MODEL", "manhattan")
+
+    # Layout carregado na startup quando DISTANCE_MODEL=layout
+    _layout = None
+
+    @staticmethod
+    def set_layout(layout) -> None:
+        """Define (ou remove, com None) o modelo físico usado nos cálculos"""
+        DistanceService._layout = layout
+
+    @staticmethod
+    def layout():
+        """Modelo físico em uso (WarehouseLayout) ou None no modelo Manhattan"""
+        return DistanceService._layout
+
     @staticmethod
-    def calculate_distance(slot1, slot2):
+    def distance_function(profile=None):
+        """
+        Função (aisle_1, shelf_1, row_1, col_1, aisle_2, shelf_2, row_2, col_2) -> custo
+        do perfil informado ou do modelo global, para laços sobre muitos slots
+        """
+        if profile is None:
+            return DistanceService.calculate_distance_from_coords
+        layout = DistanceService._layout
+        return lambda *coords: profile.distance_from_coords(layout, *coords)
+
+    @staticmethod
+    def calculate_distance(slot1, slot2, profile=None):
         """
         Calcula distância Manhattan entre dois slots com custos:
         - Custo por trocar de rua
         - Custo por trocar de prateleira
         - Custo por linha (diferença de linhas)
         - Custo por coluna (diferença de colunas)
+        Com profile, usa os custos do perfil (CostProfile)
         """
         # Se for o mesmo slot, distância é 0
         if slot1.id == slot2.id:
             return 0
 
+        if profile is not None:
+            return profile.distance_from_coords(
+                DistanceService._layout,
+                slot1.aisle_id, slot1.shelf_id, slot1.row_index, slot1.col_index,
+                slot2.aisle_id, slot2.shelf_id, slot2.row_index, slot2.col_index
+            )
+
+        layout = DistanceService._layout
+        if layout is not None:
+            cost = layout.distance_from_coords(
+                slot1.aisle_id, slot1.shelf_id, slot1.row_index, slot1.col_index,
+                slot2.aisle_id, slot2.shelf_id, slot2.row_index, slot2.col_index
+            )
+            if cost is not None:
+                return cost
+
         cost = 0
 
         # Custo por trocar de rua
@@ -53,11 +103,28 @@ class DistanceService:
     @staticmethod
     def calculate_distance_from_coords(
         aisle_id_1, shelf_id_1, row_1, col_1,
-        aisle_id_2, shelf_id_2, row_2, col_2
+        aisle_id_2, shelf_id_2, row_2, col_2,
+        profile=None
     ):
         """
         Calcula distância a partir de coordenadas (útil quando não tem objetos Slot)
         """
+        if profile is not None:
+            return profile.distance_from_coords(
+                DistanceService._layout,
+                aisle_id_1, shelf_id_1, row_1, col_1,
+                aisle_id_2, shelf_id_2, row_2, col_2
+            )
+
+        layout = DistanceService._layout
+        if layout is not None:
+            cost = layout.distance_from_coords(
+                aisle_id_1, shelf_id_1, row_1, col_1,
+                aisle_id_2, shelf_id_2, row_2, col_2
+            )
+            if cost is not None:
+                return cost
+
         cost = 0
 
         if aisle_id_1 != aisle_id_2:
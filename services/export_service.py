@@ -0,0 +1,181 @@
+"""
+Exportações em streaming (CSV ou NDJSON) de movimentos, inventário e planos:
+- Cursor no servidor com yield_per: as linhas são lidas em lotes de
+  EXPORT_YIELD_PER e escritas na resposta a cada EXPORT_CHUNK_ROWS, com
+  memória constante independente do tamanho da exportação
+- Conexão própria de leitura, aberta e fechada pelo gerador (também quando o
+  cliente desconecta no meio); com o SQLite em WAL a leitura não bloqueia commits
+"""
+from sqlalchemy import select
+from models.database import SessionLocal, engine
+from models.device import Device, DeviceStatus
+from models.slot import Slot
+from models.picking_plan_item import PickingPlanItem
+from services.movement_archive_service import MovementArchiveService
+from services.response_encoder import ResponseEncoder
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Sequence
+import csv
+import io
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CSV = "csv"
+NDJSON = "ndjson"
+
+MEDIA_TYPES = {
+    CSV: "text/csv",
+    NDJSON: "application/x-ndjson",
+}
+
+MOVEMENT_COLUMNS = (
+    "id", "device_id", "from_slot_id", "to_slot_id", "type", "ts", "meta_json", "operator_id", "archived"
+)
+INVENTORY_COLUMNS = (
+    "device_id", "status", "slot_id", "human_code", "aisle_id", "shelf_id", "row", "col", "plan_id"
+)
+PLAN_COLUMNS = (
+    "seq", "device_id", "slot_id", "human_code", "row", "col",
+    "distance_from_prev", "cumulative_distance", "status", "picked_at"
+)
+
+# Tipos escritos como estão (type exato: enums com mixin str passam por .value)
+_PLAIN = (str, int, float, bool)
+
+
+def _cell(value):
+    """Valor de célula CSV (enums pelo valor, datas em ISO 8601, JSON serializado)"""
+    if value is None or type(value) in _PLAIN:
+        return value
+    value = getattr(value, "value", value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return ResponseEncoder.dumps_json(value).decode("utf-8")
+    return value
+
+
+class ExportService:
+    """Geradores de bytes para StreamingResponse"""
+
+    YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))  # linhas por fetch do cursor
+    CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))  # linhas por bloco enviado
+
+    @staticmethod
+    def _rows(
+        build_statement: Callable,
+        to_row: Callable = tuple
+    ) -> Iterator[tuple]:
+        """
+        Executa o SELECT numa conexão própria, lendo em lotes de YIELD_PER.
+        build_statement recebe uma Session (consultas auxiliares, como a lista
+        de tabelas de arquivo) e devolve o statement.
+        """
+        db = SessionLocal()
+        try:
+            stmt = build_statement(db)
+        finally:
+            db.close()
+
+        with engine.connect() as connection:
+            result = connection.execution_options(yield_per=ExportService.YIELD_PER).execute(stmt)
+            for partition in result.partitions():
+                for row in partition:
+                    yield to_row(row)
+
+    @staticmethod
+    def _csv_chunks(columns: Sequence[str], rows: Iterator[tuple]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        pending = 0
+        for row in rows:
+            writer.writerow([_cell(value) for value in row])
+            pending += 1
+            if pending >= ExportService.CHUNK_ROWS:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate(0)
+                pending = 0
+        yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _ndjson_chunks(columns: Sequence[str], rows: Iterator[tuple]) -> Iterator[bytes]:
+        dumps = ResponseEncoder.dumps_json
+        lines: List[bytes] = []
+        for row in rows:
+            lines.append(dumps(dict(zip(columns, row))) + b"\n")
+            if len(lines) >= ExportService.CHUNK_ROWS:
+                yield b"".join(lines)
+                lines = []
+        if lines:
+            yield b"".join(lines)
+
+    @staticmethod
+    def chunks(
+        export_format: str,
+        columns: Sequence[str],
+        rows: Iterator[tuple],
+        gzip: bool = False
+    ) -> Iterator[bytes]:
+        """Blocos de bytes do arquivo no formato pedido (gzip opcional)"""
+        if export_format == NDJSON:
+            chunks = ExportService._ndjson_chunks(columns, rows)
+        else:
+            chunks = ExportService._csv_chunks(columns, rows)
+        return ResponseEncoder.gzip_chunks(chunks) if gzip else chunks
+
+    @staticmethod
+    def movement_rows(
+        device_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        movement_type: Optional[str] = None,
+        operator_id: Optional[str] = None
+    ) -> Iterator[tuple]:
+        """Movimentos (ativos e arquivados) em ordem cronológica"""
+        def build(db):
+            return MovementArchiveService.movements_statement(
+                db, device_id=device_id, since=since, until=until, ascending=True,
+                movement_type=movement_type, operator_id=operator_id
+            )
+
+        def to_row(row) -> tuple:
+            item = MovementArchiveService.row_to_dict(row)
+            return tuple(item[column] for column in MOVEMENT_COLUMNS)
+
+        return ExportService._rows(build, to_row)
+
+    @staticmethod
+    def inventory_rows(
+        status: Optional[DeviceStatus] = None,
+        aisle_id: Optional[int] = None
+    ) -> Iterator[tuple]:
+        """Devices com o slot atual (sem slot: colunas de slot vazias), por device_id"""
+        def build(db):
+            stmt = select(
+                Device.device_id, Device.status, Slot.id, Slot.human_code,
+                Slot.aisle_id, Slot.shelf_id, Slot.row_index, Slot.col_index, Device.plan_id
+            ).outerjoin(Slot, Slot.id == Device.slot_id)
+            if status is not None:
+                stmt = stmt.where(Device.status == status)
+            if aisle_id is not None:
+                stmt = stmt.where(Slot.aisle_id == aisle_id)
+            return stmt.order_by(Device.device_id)
+
+        return ExportService._rows(build)
+
+    @staticmethod
+    def plan_rows(plan_id: str) -> Iterator[tuple]:
+        """Paradas do plano na ordem da rota"""
+        def build(db):
+            return select(
+                PickingPlanItem.seq, PickingPlanItem.device_id, PickingPlanItem.slot_id,
+                PickingPlanItem.human_code, PickingPlanItem.row, PickingPlanItem.col,
+                PickingPlanItem.distance_from_prev, PickingPlanItem.cumulative_distance,
+                PickingPlanItem.status, PickingPlanItem.picked_at
+            ).where(PickingPlanItem.plan_id == plan_id).order_by(PickingPlanItem.seq)
+
+        return ExportService._rows(build)
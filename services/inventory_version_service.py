@@ -0,0 +1,165 @@
+"""
+Versão do inventário para cache de leituras:
+- Contador monotônico incrementado na mesma transação de cada mutação
+  (alocação, picking, scan)
+- Cópia em memória da versão: commits locais a atualizam na hora; a leitura
+  do banco (outros workers) acontece no máximo a cada INVENTORY_VERSION_TTL_SEC
+- ETags derivados de (versão, rota, parâmetros) para respostas 304
+- Cache de fragmentos renderizados por (rota, parâmetros, versão)
+- Publicação da versão (e das mudanças capturadas) no feed após o commit
+"""
+from fastapi.responses import Response
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from models.database import SessionLocal, engine
+from models.inventory_version import InventoryVersion
+from services.change_feed import ChangeFeed
+from collections import OrderedDict
+from typing import Optional, Tuple
+import hashlib
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_VERSION_ROW_ID = 1
+
+
+class InventoryVersionService:
+    """Incremento transacional e leitura (em cache) da versão do inventário"""
+
+    # Atraso máximo para enxergar mutações feitas por outros processos (0 = sempre ler)
+    TTL_SEC = float(os.getenv("INVENTORY_VERSION_TTL_SEC", "1.0"))
+
+    _version: Optional[int] = None
+    _checked_at = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def bump(db: Session) -> int:
+        """
+        Incrementa a versão dentro da transação atual de db (vale no commit,
+        é descartada no rollback). Chamar em toda mutação do inventário.
+        """
+        version = db.execute(
+            update(InventoryVersion)
+            .where(InventoryVersion.id == _VERSION_ROW_ID)
+            .values(version=InventoryVersion.version + 1)
+            .returning(InventoryVersion.version)
+        ).scalar()
+        if version is None:
+            db.add(InventoryVersion(id=_VERSION_ROW_ID, version=1))
+            db.flush()
+            version = 1
+        db.info["inventory_version"] = version
+        return version
+
+    @staticmethod
+    def ensure_row(db: Session) -> None:
+        """Cria a linha da versão se ainda não existir (bancos criados por create_all)"""
+        if db.get(InventoryVersion, _VERSION_ROW_ID) is None:
+            db.add(InventoryVersion(id=_VERSION_ROW_ID, version=0))
+            db.commit()
+
+    @staticmethod
+    def _observe(version: int) -> None:
+        with InventoryVersionService._lock:
+            current = InventoryVersionService._version
+            if current is None or version > current:
+                InventoryVersionService._version = version
+            InventoryVersionService._checked_at = time.monotonic()
+
+    @staticmethod
+    def current() -> int:
+        """Versão atual: da memória dentro do TTL, senão do banco"""
+        version = InventoryVersionService._version
+        if (
+            version is not None
+            and time.monotonic() - InventoryVersionService._checked_at < InventoryVersionService.TTL_SEC
+        ):
+            return version
+
+        with engine.connect() as conn:
+            version = conn.execute(
+                select(InventoryVersion.version).where(InventoryVersion.id == _VERSION_ROW_ID)
+            ).scalar() or 0
+        with InventoryVersionService._lock:
+            InventoryVersionService._version = version
+            InventoryVersionService._checked_at = time.monotonic()
+        return version
+
+    @staticmethod
+    def cache_key(path: str, query: Tuple[Tuple[str, str], ...]) -> Tuple[str, str, int]:
+        """Chave (rota, parâmetros normalizados, versão) para ETag e cache de fragmentos"""
+        params = "&".join(f"{k}={v}" for k, v in sorted(query))
+        return path, params, InventoryVersionService.current()
+
+    @staticmethod
+    def etag(key: Tuple[str, str, int]) -> str:
+        path, params, version = key
+        digest = hashlib.sha1(f"{path}?{params}".encode("utf-8")).hexdigest()[:12]
+        return f'W/"inv-{version}-{digest}"'
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _after_commit(session: Session) -> None:
+    version = session.info.pop("inventory_version", None)
+    changes = ChangeFeed.take_staged(session)
+    if version is not None:
+        InventoryVersionService._observe(version)
+        ChangeFeed.publish(version, changes)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop("inventory_version", None)
+    ChangeFeed.take_staged(session)
+
+
+class FragmentCache:
+    """LRU de respostas renderizadas (corpo + tipo), limitado por entradas e bytes"""
+
+    MAX_ENTRIES = int(os.getenv("FRAGMENT_CACHE_SIZE", "256"))  # 0 = desativado
+    MAX_ENTRY_BYTES = int(os.getenv("FRAGMENT_CACHE_MAX_ENTRY_BYTES", str(512 * 1024)))
+
+    _entries: "OrderedDict[tuple, Tuple[bytes, str]]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def response(key: tuple) -> Optional[Response]:
+        """Resposta em cache para a chave (None se ausente)"""
+        with FragmentCache._lock:
+            entry = FragmentCache._entries.get(key)
+            if entry is None:
+                return None
+            FragmentCache._entries.move_to_end(key)
+        body, media_type = entry
+        return Response(content=body, media_type=media_type)
+
+    @staticmethod
+    def store(key: tuple, response: Response) -> Response:
+        """Guarda o corpo da resposta (não-streaming) e a devolve inalterada"""
+        body = getattr(response, "body", None)
+        if (
+            FragmentCache.MAX_ENTRIES <= 0
+            or response.status_code != 200
+            or body is None
+            or len(body) > FragmentCache.MAX_ENTRY_BYTES
+        ):
+            return response
+
+        with FragmentCache._lock:
+            # Versões antigas da mesma rota/parâmetros não serão mais pedidas
+            for stale in [k for k in FragmentCache._entries if k[:2] == key[:2] and k != key]:
+                del FragmentCache._entries[stale]
+            FragmentCache._entries[key] = (body, response.media_type)
+            while len(FragmentCache._entries) > FragmentCache.MAX_ENTRIES:
+                FragmentCache._entries.popitem(last=False)
+        return response
+
+    @staticmethod
+    def clear() -> None:
+        with FragmentCache._lock:
+            FragmentCache._entries.clear()
@@ -0,0 +1,317 @@
+"""
+Modelo físico do armazém para cálculo de distância realista:
+- Coordenada x de cada rua (corredor), posições dos corredores transversais
+  e lado de cada prateleira
+- Menores caminhos entre posições (rua, coluna) calculados uma única vez sobre
+  o grafo de corredores, gravados em tabela binária e mapeados em memória (mmap)
+
+Distância entre slots = tabela[posição1][posição2]
+                        + |Δlinha| * CUSTO_POR_LINHA
+                        + custo de atravessar o corredor (prateleiras de lados opostos)
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from models.aisle import Aisle
+from models.shelf import Shelf
+from models.slot import Slot
+from array import array
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import heapq
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"PKLD"
+_FORMAT_VERSION = 1
+# magic, versão, nº de ruas, nº de colunas, hash da configuração (sha256)
+_HEADER = struct.Struct("<4sIII32s")
+
+
+class WarehouseLayout:
+    """
+    Tabela de distâncias mapeada em memória + metadados da topologia.
+    Instâncias são imutáveis; recarregar a topologia cria uma nova instância.
+    """
+
+    __slots__ = (
+        "aisle_index", "shelf_side", "num_aisles", "num_cols",
+        "row_cost", "facing_cost", "signature", "_table", "_mmap", "_file",
+    )
+
+    def __init__(
+        self,
+        aisle_index: Dict[int, int],
+        shelf_side: Dict[int, str],
+        num_cols: int,
+        row_cost: int,
+        facing_cost: int,
+        signature: str,
+        path: str
+    ):
+        self.aisle_index = aisle_index
+        self.shelf_side = shelf_side
+        self.num_aisles = len(aisle_index)
+        self.num_cols = num_cols
+        self.row_cost = row_cost
+        self.facing_cost = facing_cost
+        # sha256 da configuração gravado no cabeçalho: igual entre processos e reinícios
+        self.signature = signature
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._table = memoryview(self._mmap)[_HEADER.size:].cast("i")
+
+    def node(self, aisle_id: int, col_index: int) -> Optional[int]:
+        """Índice da posição (rua, coluna) na tabela, ou None se fora do layout"""
+        aisle_idx = self.aisle_index.get(aisle_id)
+        if aisle_idx is None or not 1 <= col_index <= self.num_cols:
+            return None
+        return aisle_idx * self.num_cols + (col_index - 1)
+
+    def distance_from_coords(
+        self,
+        aisle_id_1, shelf_id_1, row_1, col_1,
+        aisle_id_2, shelf_id_2, row_2, col_2
+    ) -> Optional[int]:
+        """Distância O(1) entre duas posições; None se alguma estiver fora do layout"""
+        cost = self.travel_cost(aisle_id_1, shelf_id_1, col_1, aisle_id_2, shelf_id_2, col_2)
+        if cost is None:
+            return None
+        return cost + abs(row_1 - row_2) * self.row_cost
+
+    def travel_cost(
+        self,
+        aisle_id_1, shelf_id_1, col_1,
+        aisle_id_2, shelf_id_2, col_2
+    ) -> Optional[int]:
+        """
+        Parte horizontal da distância (caminho pelos corredores + travessia),
+        sem o custo das linhas; usada também pelos perfis de custo
+        """
+        node_1 = self.node(aisle_id_1, col_1)
+        node_2 = self.node(aisle_id_2, col_2)
+        if node_1 is None or node_2 is None:
+            return None
+
+        cost = self._table[node_1 * self.num_aisles * self.num_cols + node_2]
+
+        # Mesma rua, lados opostos: atravessar o corredor
+        if aisle_id_1 == aisle_id_2 and shelf_id_1 != shelf_id_2:
+            if self.shelf_side.get(shelf_id_1) != self.shelf_side.get(shelf_id_2):
+                cost += self.facing_cost
+
+        return cost
+
+    def close(self) -> None:
+        self._table.release()
+        self._mmap.close()
+        self._file.close()
+
+
+class LayoutService:
+    """Monta, persiste e carrega o modelo físico do armazém"""
+
+    LAYOUT_FILE = os.getenv("LAYOUT_FILE", "layout.json")
+    TABLE_PATH = os.getenv("LAYOUT_TABLE_PATH", "storage/layout_distances.bin")
+
+    @staticmethod
+    def load_spec(db: Session) -> dict:
+        """
+        Carrega a spec física (LAYOUT_FILE) ou deriva uma padrão da topologia:
+        ruas lado a lado a CUSTO_MUDAR_RUA de distância e corredores
+        transversais nas duas pontas (coluna 0 e coluna máx. + 1).
+
+        Formato do arquivo:
+        {
+            "aisles": {"RUA 1": {"x": 0}, "RUA 2": {"x": 10}},
+            "cross_aisles": [0, 20, 41],
+            "facing_cost": 1
+        }
+        """
+        from services.distance_service import DistanceService
+
+        max_col = db.query(func.max(Slot.col_index)).scalar() or 0
+        names = [name for (name,) in db.query(Aisle.name).order_by(Aisle.id)]
+
+        spec = {}
+        if LayoutService.LAYOUT_FILE and os.path.exists(LayoutService.LAYOUT_FILE):
+            with open(LayoutService.LAYOUT_FILE, encoding="utf-8") as f:
+                spec = json.load(f)
+
+        aisles = spec.get("aisles") or {
+            name: {"x": i * DistanceService.CUSTO_MUDAR_RUA}
+            for i, name in enumerate(names)
+        }
+        return {
+            "aisles": aisles,
+            "cross_aisles": sorted(set(spec.get("cross_aisles") or [0, max_col + 1])),
+            "facing_cost": int(spec.get("facing_cost", 1)),
+            "col_cost": DistanceService.CUSTO_POR_COLUNA,
+            "row_cost": DistanceService.CUSTO_POR_LINHA,
+            "num_cols": max_col,
+        }
+
+    @staticmethod
+    def _aisle_positions(db: Session, spec: dict) -> List[Tuple[int, int]]:
+        """Lista (aisle_id, x) das ruas presentes na spec, na ordem dos ids"""
+        positions = []
+        for aisle_id, name in db.query(Aisle.id, Aisle.name).order_by(Aisle.id):
+            aisle_spec = spec["aisles"].get(name)
+            if aisle_spec is None:
+                logger.warning("Rua %s fora do layout: usará distância Manhattan", name)
+                continue
+            positions.append((aisle_id, int(aisle_spec["x"])))
+        return positions
+
+    @staticmethod
+    def _signature(spec: dict, positions: List[Tuple[int, int]]) -> bytes:
+        payload = json.dumps(
+            {"spec": spec, "positions": positions, "version": _FORMAT_VERSION},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).digest()
+
+    @staticmethod
+    def compute_table(
+        xs: List[int],
+        num_cols: int,
+        cross_aisles: List[int],
+        col_cost: int
+    ) -> array:
+        """
+        Menores caminhos entre todas as posições (rua, coluna).
+
+        Grafo: cada rua é um corredor de colunas 0..num_cols+1; nos corredores
+        transversais há arestas entre ruas vizinhas (custo |Δx|). O Dijkstra roda
+        só sobre as junções (rua × transversal); depois cada par de posições
+        combina o trecho até a junção de saída e o trecho a partir da junção
+        de chegada.
+        """
+        num_aisles = len(xs)
+        crosses = cross_aisles
+        k = len(crosses)
+        order = sorted(range(num_aisles), key=lambda i: xs[i])
+
+        # Grafo de junções: nó = a * k + ci
+        adjacency: List[List[Tuple[int, int]]] = [[] for _ in range(num_aisles * k)]
+        for a in range(num_aisles):
+            for ci in range(k - 1):
+                w = (crosses[ci + 1] - crosses[ci]) * col_cost
+                adjacency[a * k + ci].append((a * k + ci + 1, w))
+                adjacency[a * k + ci + 1].append((a * k + ci, w))
+        for left, right in zip(order, order[1:]):
+            w = abs(xs[right] - xs[left])
+            for ci in range(k):
+                adjacency[left * k + ci].append((right * k + ci, w))
+                adjacency[right * k + ci].append((left * k + ci, w))
+
+        junction = []
+        for source in range(num_aisles * k):
+            dist = [sys.maxsize] * (num_aisles * k)
+            dist[source] = 0
+            heap = [(0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                for v, w in adjacency[u]:
+                    nd = d + w
+                    if nd < dist[v]:
+                        dist[v] = nd
+                        heapq.heappush(heap, (nd, v))
+            junction.append(dist)
+
+        n = num_aisles * num_cols
+        table = array("i", bytes(4 * n * n))
+        cols = range(1, num_cols + 1)
+        for a in range(num_aisles):
+            for p in cols:
+                # Custo mínimo da posição (a, p) até cada junção (b, c)
+                to_junction = [
+                    min(abs(p - crosses[c1]) * col_cost + junction[a * k + c1][j] for c1 in range(k))
+                    for j in range(num_aisles * k)
+                ]
+                base = (a * num_cols + p - 1) * n
+                for b in range(num_aisles):
+                    offsets = [to_junction[b * k + c2] for c2 in range(k)]
+                    row_base = base + b * num_cols
+                    for q in cols:
+                        best = min(offsets[c2] + abs(q - crosses[c2]) * col_cost for c2 in range(k))
+                        if a == b:
+                            best = min(best, abs(p - q) * col_cost)
+                        table[row_base + q - 1] = best
+        return table
+
+    @staticmethod
+    def _read_header(path: str) -> Optional[tuple]:
+        try:
+            with open(path, "rb") as f:
+                raw = f.read(_HEADER.size)
+        except OSError:
+            return None
+        if len(raw) != _HEADER.size:
+            return None
+        return _HEADER.unpack(raw)
+
+    @staticmethod
+    def load_or_build(db: Session, path: Optional[str] = None) -> Optional[WarehouseLayout]:
+        """
+        Carrega a tabela persistida se corresponder à topologia/configuração atual;
+        caso contrário recalcula, grava atomicamente e carrega via mmap.
+        """
+        path = path or LayoutService.TABLE_PATH
+        spec = LayoutService.load_spec(db)
+        positions = LayoutService._aisle_positions(db, spec)
+        if not positions or spec["num_cols"] == 0:
+            return None
+
+        signature = LayoutService._signature(spec, positions)
+        num_aisles = len(positions)
+        num_cols = spec["num_cols"]
+
+        header = LayoutService._read_header(path)
+        if header != (_MAGIC, _FORMAT_VERSION, num_aisles, num_cols, signature):
+            logger.info("Calculando tabela de distâncias do layout (%d posições)", num_aisles * num_cols)
+            table = LayoutService.compute_table(
+                [x for _, x in positions], num_cols, spec["cross_aisles"], spec["col_cost"]
+            )
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, num_aisles, num_cols, signature))
+                table.tofile(f)
+            os.replace(tmp_path, path)
+
+        shelf_side = {shelf_id: side for shelf_id, side in db.query(Shelf.id, Shelf.side)}
+        return WarehouseLayout(
+            aisle_index={aisle_id: i for i, (aisle_id, _) in enumerate(positions)},
+            shelf_side=shelf_side,
+            num_cols=num_cols,
+            row_cost=spec["row_cost"],
+            facing_cost=spec["facing_cost"],
+            signature=signature.hex(),
+            path=path
+        )
+
+
+if __name__ == "__main__":
+    # Pré-calcula a tabela antes de subir os workers: python -m services.layout_service
+    from models.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        layout = LayoutService.load_or_build(db)
+        if layout:
+            print(f"✅ Tabela de distâncias pronta: {layout.num_aisles} ruas × {layout.num_cols} colunas")
+        else:
+            print("Nenhuma topologia encontrada")
+    finally:
+        db.close()
@@ -0,0 +1,254 @@
+"""
+Métricas no formato texto do Prometheus (sem dependências externas).
+
+Cada observação custa um bisect + incrementos sob um lock do próprio
+filho (série com labels), abaixo de 1µs, para ficar ligado sob carga total.
+
+Uso:
+    REQUEST_LATENCY.labels("GET", "/slots/available", "2xx").observe(0.012)
+    with timed(SERVICE_STAGE_SECONDS.labels("picking", "two_opt")):
+        ...
+"""
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+import threading
+import time
+
+# Buckets padrão de latência (segundos)
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric(ABC):
+    """Base: métrica com labels; cada combinação de labels é um filho"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+
+    @abstractmethod
+    def _new_child(self):
+        """Nova série (filho) do tipo da métrica"""
+
+    def labels(self, *values):
+        """Retorna o filho para os valores de label (criado e cacheado na 1ª vez)"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(float(self.value))}"]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # último = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def render(self, name, labelnames, key):
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, c in zip(self.bounds + (float("inf"),), counts):
+            cumulative += c
+            lines.append(
+                f"{name}_bucket{_format_labels(labelnames, key, ('le', _format_value(float(bound))))} {cumulative}"
+            )
+        labels = _format_labels(labelnames, key)
+        lines.append(f"{name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{name}_count{labels} {count}")
+        return lines
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+
+class MetricsRegistry:
+    """Conjunto de métricas expostas em /metrics"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP por rota",
+    ("method", "route", "status")
+))
+DB_STATEMENT_SECONDS = REGISTRY.register(Histogram(
+    "db_statement_duration_seconds", "Tempo por statement SQL", ("operation",)
+))
+REQUEST_DB_QUERIES = REGISTRY.register(Histogram(
+    "http_request_db_queries", "Statements SQL executados por requisição",
+    ("route",), buckets=COUNT_BUCKETS
+))
+SERVICE_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "service_stage_duration_seconds", "Tempo por etapa dos serviços de alocação e picking",
+    ("service", "stage")
+))
+TWO_OPT_ITERATIONS = REGISTRY.register(Histogram(
+    "picking_two_opt_iterations", "Iterações do 2-opt por plano",
+    buckets=COUNT_BUCKETS
+))
+TWO_OPT_STOPS = REGISTRY.register(Counter(
+    "picking_two_opt_stops_total",
+    "Motivo de parada do 2-opt (converged, max_iterations, max_time)",
+    ("reason",)
+))
+EXACT_SOLVES = REGISTRY.register(Counter(
+    "picking_exact_solves_total",
+    "Rotas pequenas resolvidas por branch-and-bound (optimal, time_cap)",
+    ("result",)
+))
+INVENTORY_FREE_SLOTS = REGISTRY.register(Gauge("inventory_free_slots", "Slots livres"))
+INVENTORY_DEVICES = REGISTRY.register(Gauge("inventory_devices", "Devices por status", ("status",)))
+CHANGE_FEED_SUBSCRIBERS = REGISTRY.register(Gauge(
+    "change_feed_subscribers", "Assinantes conectados ao feed de mudanças (SSE/WebSocket)"
+))
+
+
+class Stopwatch:
+    __slots__ = ("elapsed",)
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+
+@contextmanager
+def timed(histogram_child):
+    """
+    Observa a duração do bloco (segundos) em um filho de Histogram.
+    O Stopwatch retornado guarda a duração para uso local (with ... as sw).
+    """
+    stopwatch = Stopwatch()
+    started = time.perf_counter()
+    try:
+        yield stopwatch
+    finally:
+        stopwatch.elapsed = time.perf_counter() - started
+        histogram_child.observe(stopwatch.elapsed)
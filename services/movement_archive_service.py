@@ -0,0 +1,272 @@
+"""
+Serviço de arquivamento da tabela de movimentos:
+- Tabelas mensais de arquivo (movements_archive_AAAAMM)
+- Compactador que move linhas antigas em lotes pequenos (sem locks longos)
+- Consulta que cobre movimentos ativos e arquivados de forma transparente
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, DateTime, JSON,
+    Index, inspect, select, insert, delete, union_all, literal_column, func
+)
+from models.database import SessionLocal
+from models.movement import Movement
+from datetime import datetime, timedelta
+from typing import List, Optional, Dict
+import asyncio
+import logging
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PREFIX = "movements_archive_"
+
+# Metadata separado: tabelas de arquivo são criadas sob demanda, fora do create_all
+_archive_metadata = MetaData()
+_archive_lock = threading.Lock()
+
+
+def _archive_table_name(ts: datetime) -> str:
+    return f"{ARCHIVE_PREFIX}{ts.year:04d}{ts.month:02d}"
+
+
+def _month_of_table(name: str) -> Optional[datetime]:
+    suffix = name[len(ARCHIVE_PREFIX):]
+    try:
+        return datetime(int(suffix[:4]), int(suffix[4:6]), 1)
+    except ValueError:
+        return None
+
+
+def _next_month(month_start: datetime) -> datetime:
+    if month_start.month == 12:
+        return datetime(month_start.year + 1, 1, 1)
+    return datetime(month_start.year, month_start.month + 1, 1)
+
+
+def _archive_table(name: str) -> Table:
+    """Retorna (definindo se necessário) a tabela de arquivo com as colunas de movements"""
+    table = _archive_metadata.tables.get(name)
+    if table is not None:
+        return table
+    return Table(
+        name,
+        _archive_metadata,
+        # Mantém o id original para auditoria e replay ordenado
+        Column("id", Integer, primary_key=True, autoincrement=False),
+        Column("device_id", String, nullable=False),
+        Column("from_slot_id", Integer, nullable=True),
+        Column("to_slot_id", Integer, nullable=True),
+        Column("type", String, nullable=False),
+        Column("ts", DateTime, nullable=False),
+        Column("meta_json", JSON, nullable=True),
+        Column("operator_id", String, nullable=True),
+        Index(f"ix_{name}_ts", "ts"),
+        Index(f"ix_{name}_device_id", "device_id"),
+    )
+
+
+class MovementArchiveService:
+    """Gerencia retenção, arquivamento e consulta do histórico de movimentos"""
+
+    RETENTION_DAYS = int(os.getenv("MOVEMENT_RETENTION_DAYS", "0"))  # 0 = sem arquivamento
+    BATCH_SIZE = int(os.getenv("MOVEMENT_ARCHIVE_BATCH_SIZE", "500"))
+    COMPACT_INTERVAL_SEC = int(os.getenv("MOVEMENT_COMPACT_INTERVAL_SEC", "3600"))
+    BATCH_PAUSE_SEC = float(os.getenv("MOVEMENT_ARCHIVE_BATCH_PAUSE_SEC", "0.05"))
+
+    @staticmethod
+    def list_archive_tables(db: Session) -> List[str]:
+        """Lista tabelas de arquivo existentes, da mais antiga para a mais recente"""
+        names = inspect(db.get_bind()).get_table_names()
+        return sorted(n for n in names if n.startswith(ARCHIVE_PREFIX) and _month_of_table(n))
+
+    @staticmethod
+    def _ensure_archive_table(db: Session, name: str) -> Table:
+        table = _archive_table(name)
+        with _archive_lock:
+            table.create(bind=db.connection(), checkfirst=True)
+        return table
+
+    @staticmethod
+    def archive_batch(db: Session, cutoff: datetime, batch_size: Optional[int] = None) -> int:
+        """
+        Move um lote de movimentos anteriores a cutoff para as tabelas mensais.
+        Cada lote é uma transação curta (INSERT ... SELECT + DELETE por id).
+        O movimento mais recente nunca é arquivado, para que o SQLite não
+        reutilize ids já presentes no arquivo.
+        Retorna quantas linhas foram movidas.
+        """
+        batch_size = batch_size or MovementArchiveService.BATCH_SIZE
+        max_id = db.query(func.max(Movement.id)).scalar()
+        if max_id is None:
+            return 0
+
+        rows = db.query(Movement.id, Movement.ts).filter(
+            Movement.ts < cutoff,
+            Movement.id < max_id
+        ).order_by(Movement.id).limit(batch_size).all()
+
+        if not rows:
+            return 0
+
+        # Agrupar ids por mês de destino
+        by_month: Dict[str, List[int]] = {}
+        for movement_id, ts in rows:
+            by_month.setdefault(_archive_table_name(ts), []).append(movement_id)
+
+        hot = Movement.__table__
+        try:
+            for name, ids in by_month.items():
+                table = MovementArchiveService._ensure_archive_table(db, name)
+                db.execute(
+                    insert(table).from_select(
+                        [c.name for c in table.columns],
+                        select(*[hot.c[c.name] for c in table.columns]).where(hot.c.id.in_(ids))
+                    )
+                )
+                db.execute(delete(hot).where(hot.c.id.in_(ids)))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        return len(rows)
+
+    @staticmethod
+    def compact(
+        db: Session,
+        retention_days: Optional[int] = None,
+        max_batches: Optional[int] = None
+    ) -> dict:
+        """
+        Arquiva em lotes todos os movimentos mais antigos que retention_days.
+        Entre lotes pausa brevemente para liberar o lock de escrita aos scans.
+        """
+        retention_days = retention_days if retention_days is not None else MovementArchiveService.RETENTION_DAYS
+        if retention_days <= 0:
+            return {"archived": 0, "batches": 0, "cutoff": None}
+
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        archived = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            moved = MovementArchiveService.archive_batch(db, cutoff)
+            if not moved:
+                break
+            archived += moved
+            batches += 1
+            time.sleep(MovementArchiveService.BATCH_PAUSE_SEC)
+
+        return {"archived": archived, "batches": batches, "cutoff": cutoff.isoformat()}
+
+    @staticmethod
+    def movements_statement(
+        db: Session,
+        device_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        ascending: bool = False,
+        after_id: Optional[int] = None,
+        movement_type: Optional[str] = None,
+        operator_id: Optional[str] = None
+    ):
+        """
+        SELECT dos movimentos nas tabelas ativa e de arquivo (UNION ALL),
+        consultando apenas os meses que cruzam o intervalo pedido, ordenado por (ts, id).
+        after_id restringe a movimentos com id maior (replay incremental).
+        """
+        hot = Movement.__table__
+        sources = [hot]
+        for name in MovementArchiveService.list_archive_tables(db):
+            month_start = _month_of_table(name)
+            if since is not None and _next_month(month_start) <= since:
+                continue
+            if until is not None and month_start > until:
+                continue
+            sources.append(_archive_table(name))
+
+        selects = []
+        for table in sources:
+            stmt = select(
+                table.c.id,
+                table.c.device_id,
+                table.c.from_slot_id,
+                table.c.to_slot_id,
+                table.c.type,
+                table.c.ts,
+                table.c.meta_json,
+                table.c.operator_id,
+                literal_column("1" if table is not hot else "0").label("archived"),
+            )
+            if device_id is not None:
+                stmt = stmt.where(table.c.device_id == device_id)
+            if since is not None:
+                stmt = stmt.where(table.c.ts >= since)
+            if until is not None:
+                stmt = stmt.where(table.c.ts <= until)
+            if after_id is not None:
+                stmt = stmt.where(table.c.id > after_id)
+            if movement_type is not None:
+                stmt = stmt.where(table.c.type == movement_type)
+            if operator_id is not None:
+                stmt = stmt.where(table.c.operator_id == operator_id)
+            selects.append(stmt)
+
+        combined = union_all(*selects).subquery()
+        order = (combined.c.ts, combined.c.id) if ascending else (combined.c.ts.desc(), combined.c.id.desc())
+        return select(combined).order_by(*order)
+
+    @staticmethod
+    def row_to_dict(row) -> dict:
+        item = dict(row._mapping)
+        # Enum na tabela ativa, texto no arquivo
+        item["type"] = getattr(item["type"], "value", item["type"])
+        item["archived"] = bool(int(item["archived"]))
+        return item
+
+    @staticmethod
+    def query_movements(
+        db: Session,
+        device_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = 100,
+        ascending: bool = False,
+        after_id: Optional[int] = None
+    ) -> List[dict]:
+        """
+        Consulta movimentos nas tabelas ativa e de arquivo (ver movements_statement).
+        """
+        stmt = MovementArchiveService.movements_statement(
+            db, device_id=device_id, since=since, until=until, ascending=ascending, after_id=after_id
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return [MovementArchiveService.row_to_dict(row) for row in db.execute(stmt)]
+
+async def run_compactor(interval_sec: Optional[int] = None) -> None:
+    """Loop em background que roda o compactador periodicamente (thread separada)"""
+    interval_sec = interval_sec or MovementArchiveService.COMPACT_INTERVAL_SEC
+
+    def _compact_once():
+        db = SessionLocal()
+        try:
+            return MovementArchiveService.compact(db)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            result = await asyncio.to_thread(_compact_once)
+            if result["archived"]:
+                logger.info("Movimentos arquivados: %s", result)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Erro ao compactar movimentos")
+        await asyncio.sleep(interval_sec)
@@ -0,0 +1,210 @@
+"""
+Slots livres mais próximos de um ponto de partida, paginados por cursor.
+
+Para cada ponto de partida, todos os slots são ordenados uma única vez por
+(distância, id) e a ordem fica em cache (arrays compactos, LRU). Uma página
+percorre essa ordem a partir da posição do cursor e consulta a ocupação só
+dos candidatos, em blocos: custo O(k / fração livre) por página em vez de
+carregar, medir e ordenar todos os slots livres.
+"""
+from sqlalchemy.orm import Session
+from models.slot import Slot
+from services.distance_service import DistanceService
+from services.topology_registry import TopologyRegistry, format_human_code
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import base64
+import hashlib
+import json
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Candidatos verificados por consulta de ocupação (limite de parâmetros do SQLite)
+_MAX_CHUNK = 2000
+
+
+class InvalidCursor(ValueError):
+    """Cursor malformado ou gerado para outra topologia/modelo de distância"""
+
+
+class SlotRanking:
+    """Todos os slots ordenados por (distância, id) a partir de um ponto de partida"""
+
+    __slots__ = ("start_slot_id", "signature", "slot_ids", "distances")
+
+    def __init__(self, start_slot_id: int, signature: str, slot_ids: array, distances: array):
+        self.start_slot_id = start_slot_id
+        self.signature = signature
+        self.slot_ids = slot_ids
+        self.distances = distances
+
+    def __len__(self) -> int:
+        return len(self.slot_ids)
+
+
+class NearestSlotService:
+    """Consulta k-vizinhos livres com ranking pré-calculado por ponto de partida"""
+
+    RANK_CACHE_SIZE = int(os.getenv("NEAREST_RANK_CACHE_SIZE", "16"))
+
+    _rankings: "OrderedDict[Tuple[int, str], SlotRanking]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _signature(db: Session) -> str:
+        """Identifica topologia e modelo de distância (invalida rankings e cursores)"""
+        layout = DistanceService.layout()
+        payload = (
+            TopologyRegistry.get(db).fingerprint,
+            DistanceService.CUSTO_MUDAR_RUA, DistanceService.CUSTO_MUDAR_PRATELEIRA,
+            DistanceService.CUSTO_POR_LINHA, DistanceService.CUSTO_POR_COLUNA,
+            layout.signature if layout is not None else None,
+        )
+        return hashlib.sha1(repr(payload).encode("utf-8")).hexdigest()[:12]
+
+    @staticmethod
+    def ranking(db: Session, start_slot, signature: Optional[str] = None) -> SlotRanking:
+        """Ranking do ponto de partida (calculado na primeira vez, depois em cache)"""
+        signature = signature or NearestSlotService._signature(db)
+        key = (start_slot.id, signature)
+        with NearestSlotService._lock:
+            ranking = NearestSlotService._rankings.get(key)
+            if ranking is not None:
+                NearestSlotService._rankings.move_to_end(key)
+                return ranking
+
+        distance = DistanceService.calculate_distance_from_coords
+        a, s, r, c = start_slot.aisle_id, start_slot.shelf_id, start_slot.row_index, start_slot.col_index
+        # Geometria vem do registro de topologia (sem consulta ao banco)
+        ranked = sorted(
+            (distance(a, s, r, c, aisle_id, shelf_id, row, col), slot_id)
+            for slot_id, aisle_id, shelf_id, row, col in TopologyRegistry.get(db).iter_coords()
+        )
+        ranking = SlotRanking(
+            start_slot.id,
+            signature,
+            array("i", [slot_id for _, slot_id in ranked]),
+            array("d", [dist for dist, _ in ranked]),
+        )
+
+        with NearestSlotService._lock:
+            NearestSlotService._rankings[key] = ranking
+            while len(NearestSlotService._rankings) > max(1, NearestSlotService.RANK_CACHE_SIZE):
+                NearestSlotService._rankings.popitem(last=False)
+        return ranking
+
+    @staticmethod
+    def start_slot_from_params(
+        db: Session,
+        start_rua: Optional[int] = None,
+        start_prateleira: Optional[str] = None,
+        start_linha: Optional[int] = None,
+        start_coluna: Optional[int] = None
+    ):
+        """Ponto de partida informado (rua/prateleira/linha/coluna) ou o padrão"""
+        if start_rua and start_prateleira and start_linha and start_coluna:
+            return TopologyRegistry.get(db).slot_by_code(
+                format_human_code(start_rua, start_prateleira, start_linha, start_coluna)
+            )
+
+        from services.assignment_service import AssignmentService
+        return AssignmentService.get_default_start_slot(db)
+
+    @staticmethod
+    def clear_cache() -> None:
+        with NearestSlotService._lock:
+            NearestSlotService._rankings.clear()
+
+    @staticmethod
+    def encode_cursor(start_slot_id: int, position: int, signature: str) -> str:
+        raw = json.dumps({"s": start_slot_id, "p": position, "v": signature}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[int, int, str]:
+        """Retorna (start_slot_id, posição, assinatura)"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            data = json.loads(raw)
+            return int(data["s"]), int(data["p"]), str(data["v"])
+        except (ValueError, KeyError, TypeError):
+            raise InvalidCursor("Cursor inválido")
+
+    @staticmethod
+    def nearest_free(
+        db: Session,
+        start_slot,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Tuple[Slot, Optional[float]]], Optional[str]]:
+        """
+        Próxima página de slots livres em ordem de distância ao start_slot.
+        Com cursor, o ponto de partida vem do cursor (start_slot é ignorado).
+        Sem ponto de partida, pagina por id.
+        Retorna ([(slot, distância)], próximo cursor ou None).
+        """
+        signature = NearestSlotService._signature(db)
+        position = 0
+        if cursor:
+            start_slot_id, position, cursor_signature = NearestSlotService.decode_cursor(cursor)
+            if cursor_signature != signature:
+                raise InvalidCursor("Cursor expirado: topologia ou modelo de distância mudou")
+            start_slot = TopologyRegistry.get(db).slot(start_slot_id) if start_slot_id else None
+            if start_slot_id and start_slot is None:
+                raise InvalidCursor("Cursor inválido")
+
+        if start_slot is None:
+            return NearestSlotService._free_by_id(db, limit, position, signature)
+
+        ranking = NearestSlotService.ranking(db, start_slot, signature)
+        total = len(ranking)
+        page: List[Tuple[int, int]] = []  # (posição no ranking, slot_id)
+        chunk_size = min(_MAX_CHUNK, max(64, (limit + 1) * 2))
+
+        # Coletar limit + 1 livres: o excedente só indica se há próxima página
+        while len(page) <= limit and position < total:
+            chunk = ranking.slot_ids[position:position + chunk_size]
+            free_ids = {
+                slot_id for (slot_id,) in db.query(Slot.id).filter(
+                    Slot.occupied == False, Slot.id.in_(chunk.tolist())
+                )
+            }
+            for offset, slot_id in enumerate(chunk):
+                if slot_id in free_ids:
+                    page.append((position + offset, slot_id))
+                    if len(page) > limit:
+                        break
+            position += len(chunk)
+            chunk_size = min(_MAX_CHUNK, chunk_size * 2)
+
+        next_cursor = None
+        if len(page) > limit:
+            next_cursor = NearestSlotService.encode_cursor(start_slot.id, page[limit][0], signature)
+            page = page[:limit]
+
+        slots = {s.id: s for s in db.query(Slot).filter(Slot.id.in_([slot_id for _, slot_id in page]))}
+        results = [
+            (slots[slot_id], ranking.distances[rank])
+            for rank, slot_id in page if slot_id in slots
+        ]
+        return results, next_cursor
+
+    @staticmethod
+    def _free_by_id(
+        db: Session,
+        limit: int,
+        after_id: int,
+        signature: str
+    ) -> Tuple[List[Tuple[Slot, Optional[float]]], Optional[str]]:
+        slots = db.query(Slot).filter(
+            Slot.occupied == False, Slot.id > after_id
+        ).order_by(Slot.id).limit(limit + 1).all()
+        next_cursor = None
+        if len(slots) > limit:
+            slots = slots[:limit]
+            next_cursor = NearestSlotService.encode_cursor(0, slots[-1].id, signature)
+        return [(slot, None) for slot in slots], next_cursor
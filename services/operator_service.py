@@ -0,0 +1,52 @@
+"""
+Serviço para rastrear a posição atual de cada operador
+(substitui o cursor global do último movimento)
+"""
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from models.slot import Slot
+from models.operator_position import OperatorPosition
+from typing import Optional
+
+
+class OperatorService:
+    """Gerencia a posição atual de cada operador/sessão"""
+
+    @staticmethod
+    def get_position_slot(db: Session, operator_id: str) -> Optional[Slot]:
+        """
+        Retorna o slot onde o operador registrou o último movimento
+        (lookup pela chave primária, sem varrer a tabela de movimentos)
+        """
+        position = db.get(OperatorPosition, operator_id)
+        if not position or not position.slot_id:
+            return None
+        return db.get(Slot, position.slot_id)
+
+    @staticmethod
+    def update_position(
+        db: Session,
+        operator_id: Optional[str],
+        slot_id: Optional[int]
+    ) -> None:
+        """
+        Atualiza (ou cria) a posição do operador na mesma transação do movimento.
+        Não faz commit: quem registra o movimento é responsável pela transação.
+        """
+        if not operator_id or not slot_id:
+            return
+
+        # Upsert atômico: dois terminais com o mesmo operador novo não disputam o INSERT
+        db.execute(
+            sqlite_insert(OperatorPosition)
+            .values(operator_id=operator_id, slot_id=slot_id)
+            .on_conflict_do_update(
+                index_elements=[OperatorPosition.operator_id],
+                set_={"slot_id": slot_id, "updated_at": func.now()}
+            )
+        )
+        # Posição já carregada nesta sessão fica desatualizada pelo SQL direto
+        position = db.identity_map.get(db.identity_key(OperatorPosition, operator_id))
+        if position is not None:
+            db.expire(position)
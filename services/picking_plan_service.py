@@ -0,0 +1,221 @@
+"""
+Planos de picking persistidos (substitui o "último plano" em memória do router):
+- Cada plano tem id, status (ACTIVE/COMPLETED/CANCELLED) e as paradas em
+  picking_plan_items, na ordem da rota, com o progresso da coleta
+- Consultas indexadas por plano (plan_id, seq) e por device (device_id)
+- Qualquer worker/processo enxerga os mesmos planos: exportação e cancelamento
+  recebem o plan_id
+"""
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+from models.picking_plan import PickingPlan, PlanStatus
+from models.picking_plan_item import PickingPlanItem, PlanItemStatus
+from services.bulk_keys import BulkKeys
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import time
+import uuid
+
+
+class PickingPlanService:
+    """Paradas, progresso e consultas dos planos de picking"""
+
+    @staticmethod
+    def new_id() -> str:
+        """Id de 32 hex ordenável pela criação (ms) + parte aleatória"""
+        return f"{int(time.time() * 1000):012x}{uuid.uuid4().hex[:20]}"
+
+    @staticmethod
+    def add_items(db: Session, plan_id: str, route: List[dict]) -> None:
+        """Grava as paradas da rota (INSERT em lote, sem commit)"""
+        if not route:
+            return
+        db.execute(insert(PickingPlanItem), [
+            {
+                "plan_id": plan_id,
+                "seq": seq,
+                "device_id": item["device_id"],
+                "slot_id": item["slot_id"],
+                "human_code": item["human_code"],
+                "row": item["row"],
+                "col": item["col"],
+                "distance_from_prev": item["distance_from_prev"],
+                "cumulative_distance": item["cumulative_distance"],
+                "status": PlanItemStatus.PENDING,
+            }
+            for seq, item in enumerate(route, start=1)
+        ])
+
+    @staticmethod
+    def mark_picked(db: Session, device_ids: Iterable[str]) -> None:
+        """
+        Itens pendentes desses devices passam a PICKED; planos sem pendências
+        passam a COMPLETED. Sem commit (mesma transação da coleta).
+        """
+        device_ids = BulkKeys.unique(device_ids)
+        if not device_ids:
+            return
+        now = datetime.utcnow()
+        with BulkKeys.matching(db, PickingPlanItem.device_id, device_ids) as requested:
+            plan_ids = set(db.execute(
+                update(PickingPlanItem)
+                .where(requested, PickingPlanItem.status == PlanItemStatus.PENDING)
+                .values(status=PlanItemStatus.PICKED, picked_at=now)
+                .returning(PickingPlanItem.plan_id)
+                .execution_options(synchronize_session=False)
+            ).scalars())
+        PickingPlanService._complete_finished(db, plan_ids, now)
+
+    @staticmethod
+    def _complete_finished(db: Session, plan_ids: Iterable[str], now: datetime) -> None:
+        """Planos ativos sem itens pendentes passam a COMPLETED (sem commit)"""
+        plan_ids = set(plan_ids)
+        if not plan_ids:
+            return
+        pending = (
+            db.query(PickingPlanItem.id)
+            .filter(
+                PickingPlanItem.plan_id == PickingPlan.id,
+                PickingPlanItem.status == PlanItemStatus.PENDING
+            )
+            .exists()
+        )
+        db.execute(
+            update(PickingPlan)
+            .where(PickingPlan.id.in_(plan_ids), PickingPlan.status == PlanStatus.ACTIVE, ~pending)
+            .values(status=PlanStatus.COMPLETED, completed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def release(db: Session, plan_id: str) -> None:
+        """Itens ainda pendentes do plano cancelado passam a RELEASED (sem commit)"""
+        db.execute(
+            update(PickingPlanItem)
+            .where(PickingPlanItem.plan_id == plan_id, PickingPlanItem.status == PlanItemStatus.PENDING)
+            .values(status=PlanItemStatus.RELEASED)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def release_device(db: Session, device_id: str) -> None:
+        """
+        Item pendente do device que saiu do plano sem ser coletado (ex.: scan IN
+        de novo) passa a RELEASED; o plano sem outras pendências passa a
+        COMPLETED. Sem commit (mesma transação da movimentação).
+        """
+        plan_ids = set(db.execute(
+            update(PickingPlanItem)
+            .where(PickingPlanItem.device_id == device_id, PickingPlanItem.status == PlanItemStatus.PENDING)
+            .values(status=PlanItemStatus.RELEASED)
+            .returning(PickingPlanItem.plan_id)
+            .execution_options(synchronize_session=False)
+        ).scalars())
+        PickingPlanService._complete_finished(db, plan_ids, datetime.utcnow())
+
+    @staticmethod
+    def latest(
+        db: Session,
+        status: Optional[PlanStatus] = None,
+        operator_id: Optional[str] = None
+    ) -> Optional[PickingPlan]:
+        """Plano mais recente (opcionalmente filtrado por status e operador)"""
+        query = db.query(PickingPlan)
+        if status:
+            query = query.filter(PickingPlan.status == status)
+        if operator_id:
+            query = query.filter(PickingPlan.operator_id == operator_id)
+        return query.order_by(PickingPlan.id.desc()).first()
+
+    @staticmethod
+    def items(db: Session, plan_id: str) -> List[PickingPlanItem]:
+        """Paradas do plano na ordem da rota (índice plan_id, seq)"""
+        return (
+            db.query(PickingPlanItem)
+            .filter(PickingPlanItem.plan_id == plan_id)
+            .order_by(PickingPlanItem.seq)
+            .all()
+        )
+
+    @staticmethod
+    def _progress(db: Session, plan_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """Contagem de itens por status de cada plano"""
+        progress = {plan_id: {status.value: 0 for status in PlanItemStatus} for plan_id in plan_ids}
+        if not plan_ids:
+            return progress
+        rows = (
+            db.query(PickingPlanItem.plan_id, PickingPlanItem.status, func.count(PickingPlanItem.id))
+            .filter(PickingPlanItem.plan_id.in_(plan_ids))
+            .group_by(PickingPlanItem.plan_id, PickingPlanItem.status)
+        )
+        for plan_id, status, count in rows:
+            progress[plan_id][status.value] = count
+        return progress
+
+    @staticmethod
+    def _summary(plan: PickingPlan, progress: Dict[str, int]) -> dict:
+        return {
+            "plan_id": plan.id,
+            "status": plan.status.value,
+            "operator_id": plan.operator_id,
+            "created_at": plan.created_at,
+            "completed_at": plan.completed_at,
+            "requested_devices": plan.requested_devices,
+            "reserved_devices": plan.reserved_devices,
+            "total_distance": plan.total_distance,
+            "return_distance": plan.return_distance,
+            "start_slot_id": plan.start_slot_id,
+            "cost_profile": plan.cost_profile,
+            "progress": progress,
+        }
+
+    @staticmethod
+    def list_plans(
+        db: Session,
+        status: Optional[PlanStatus] = None,
+        operator_id: Optional[str] = None,
+        device_id: Optional[str] = None,
+        limit: int = 50
+    ) -> List[dict]:
+        """Planos mais recentes primeiro; com device_id, só os planos que o incluem"""
+        query = db.query(PickingPlan)
+        if status:
+            query = query.filter(PickingPlan.status == status)
+        if operator_id:
+            query = query.filter(PickingPlan.operator_id == operator_id)
+        if device_id:
+            query = query.filter(PickingPlan.id.in_(
+                db.query(PickingPlanItem.plan_id).filter(PickingPlanItem.device_id == device_id)
+            ))
+        plans = query.order_by(PickingPlan.id.desc()).limit(limit).all()
+        progress = PickingPlanService._progress(db, [plan.id for plan in plans])
+        return [PickingPlanService._summary(plan, progress[plan.id]) for plan in plans]
+
+    @staticmethod
+    def get(db: Session, plan_id: str) -> Optional[dict]:
+        """Plano com as paradas e o progresso de cada uma"""
+        plan = db.get(PickingPlan, plan_id)
+        if plan is None:
+            return None
+        items = PickingPlanService.items(db, plan_id)
+        progress = {status.value: 0 for status in PlanItemStatus}
+        for item in items:
+            progress[item.status.value] += 1
+        return {
+            **PickingPlanService._summary(plan, progress),
+            "excluded": plan.excluded_json or [],
+            "route": [
+                {
+                    "device_id": item.device_id,
+                    "slot_id": item.slot_id,
+                    "human_code": item.human_code,
+                    "row": item.row,
+                    "col": item.col,
+                    "distance_from_prev": item.distance_from_prev,
+                    "cumulative_distance": item.cumulative_distance,
+                    "status": item.status.value,
+                    "picked_at": item.picked_at,
+                }
+                for item in items
+            ],
+        }
@@ -1,52 +1,74 @@
 """
 Serviço para cálculo de ordem de picking (coleta)
-usando Nearest Neighbor + 2-opt simples
+usando Nearest Neighbor + 2-opt simples; listas pequenas
+(até PICKING_EXACT_MAX_STOPS paradas) vão para um branch-and-bound exato
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, insert, update
 from models.slot import Slot
 from models.device import Device, DeviceStatus
 from models.movement import Movement, MovementType
 from services.distance_service import DistanceService
+from services.cost_profile_service import CostProfile, DEFAULT_PROFILE
+from services.operator_service import OperatorService
+from services.plan_stats_service import PlanStatsService
+from services.inventory_version_service import InventoryVersionService
+from services.topology_registry import TopologyRegistry, SlotRecord
+from services.bulk_keys import BulkKeys
+from services.change_feed import ChangeFeed
+from services.picking_plan_service import PickingPlanService
+from models.picking_plan_stat import PickingPlanStat
+from models.picking_plan import PickingPlan, PlanStatus
+from services.metrics import (
+    SERVICE_STAGE_SECONDS, TWO_OPT_ITERATIONS, TWO_OPT_STOPS, EXACT_SOLVES, timed
+)
 from typing import List, Dict, Optional, Tuple
+import os
 import random
 import time
+from dotenv import load_dotenv
+
+load_dotenv()
 
 
 class PickingService:
     """Gerencia planejamento e execução de picking"""
 
+    # Rota exata (branch-and-bound) até esse nº de paradas; 0 = sempre heurística
+    EXACT_MAX_STOPS = int(os.getenv("PICKING_EXACT_MAX_STOPS", "15"))
+    # Tempo máximo do branch-and-bound; estourando, fica a melhor rota achada + 2-opt
+    EXACT_MAX_TIME_SEC = float(os.getenv("PICKING_EXACT_MAX_TIME_SEC", "0.1"))
+
     @staticmethod
     def get_device_slots(
         db: Session,
         device_ids: List[str]
-    ) -> Dict[str, Slot]:
+    ) -> Dict[str, SlotRecord]:
         """
-        Mapeia device_ids para seus slots atuais (apenas IN_STOCK)
+        Mapeia device_ids para seus slots atuais (apenas IN_STOCK).
+        A geometria vem do registro de topologia (sem carregar objetos Slot).
         """
-        devices = db.query(Device).filter(
-            Device.device_id.in_(device_ids),
-            Device.status == DeviceStatus.IN_STOCK,
-            Device.slot_id.isnot(None)
-        ).all()
-
-        # Buscar slots
-        slot_ids = [d.slot_id for d in devices if d.slot_id]
-        slots = db.query(Slot).filter(Slot.id.in_(slot_ids)).all()
-        slot_dict = {s.id: s for s in slots}
-
-        # Criar mapeamento device_id -> slot
+        with BulkKeys.matching(db, Device.device_id, device_ids) as requested:
+            devices = db.query(Device.device_id, Device.slot_id).filter(
+                requested,
+                Device.status == DeviceStatus.IN_STOCK,
+                Device.slot_id.isnot(None)
+            ).all()
+
+        topology = TopologyRegistry.get(db)
         device_slot_map = {}
-        for device in devices:
-            if device.slot_id and device.slot_id in slot_dict:
-                device_slot_map[device.device_id] = slot_dict[device.slot_id]
+        for device_id, slot_id in devices:
+            slot = topology.slot(slot_id)
+            if slot is not None:
+                device_slot_map[device_id] = slot
 
         return device_slot_map
 
     @staticmethod
     def nearest_neighbor_route(
         start_slot: Slot,
-        target_slots: List[Slot]
+        target_slots: List[Slot],
+        profile: Optional[CostProfile] = None
     ) -> List[Slot]:
         """
         Constrói rota usando Nearest Neighbor (vizinho mais próximo)
@@ -66,7 +88,7 @@ class PickingService:
             best_key = None
 
             for slot in unvisited:
-                dist = DistanceService.calculate_distance(current, slot)
+                dist = DistanceService.calculate_distance(current, slot, profile)
                 d_row = abs(current.row_index - slot.row_index)
                 d_col = abs(current.col_index - slot.col_index)
                 # Preferir mesma coluna primeiro; chave: distância, variação de coluna, variação de linha, coluna, linha
@@ -86,24 +108,38 @@ class PickingService:
     def two_opt_improve(
         route: List[Slot],
         max_iterations: int = 200,
-        max_time_sec: float = 2.0
+        max_time_sec: float = 2.0,
+        profile: Optional[CostProfile] = None
     ) -> List[Slot]:
         """
         Melhora rota usando algoritmo 2-opt simples
         Tenta inverter segmentos da rota para reduzir distância total
         """
+        best_route, _, _ = PickingService._two_opt(route, max_iterations, max_time_sec, profile)
+        return best_route
+
+    @staticmethod
+    def _two_opt(
+        route: List[Slot],
+        max_iterations: int = 200,
+        max_time_sec: float = 2.0,
+        profile: Optional[CostProfile] = None
+    ) -> Tuple[List[Slot], int, str]:
+        """2-opt retornando (rota, iterações, motivo de parada)"""
         if len(route) < 3:
-            return route
+            return route, 0, "converged"
 
         best_route = route.copy()
-        best_distance = PickingService._route_distance(best_route)
+        best_distance = PickingService._route_distance(best_route, profile)
 
         start_time = time.time()
         improved = True
         iterations = 0
+        stop_reason = "converged"
 
         while improved and iterations < max_iterations:
             if time.time() - start_time > max_time_sec:
+                stop_reason = "max_time"
                 break
 
             improved = False
@@ -113,7 +149,7 @@ class PickingService:
                 for j in range(i + 1, len(best_route)):
                     # Tentar inverter segmento [i:j]
                     new_route = best_route[:i] + best_route[i:j+1][::-1] + best_route[j+1:]
-                    new_distance = PickingService._route_distance(new_route)
+                    new_distance = PickingService._route_distance(new_route, profile)
 
                     if new_distance < best_distance:
                         best_route = new_route
@@ -124,17 +160,152 @@ class PickingService:
                 if improved:
                     break
 
-        return best_route
+        if improved and stop_reason == "converged":
+            stop_reason = "max_iterations"
+        TWO_OPT_ITERATIONS.observe(iterations)
+        TWO_OPT_STOPS.labels(stop_reason).inc()
+
+        return best_route, iterations, stop_reason
+
+    @staticmethod
+    def route_lower_bound(
+        start_slot: Slot,
+        target_slots: List[Slot],
+        profile: Optional[CostProfile] = None
+    ) -> float:
+        """
+        Limite inferior da rota: peso da árvore geradora mínima sobre o início
+        e as paradas (toda rota que parte do início é uma árvore geradora).
+        Prim em O(n²) chamadas de distância.
+        """
+        if not target_slots:
+            return 0.0
+
+        remaining = list(target_slots)
+        # Menor distância de cada parada até a árvore (inicialmente só o início)
+        best = [DistanceService.calculate_distance(start_slot, slot, profile) for slot in remaining]
+        total = 0.0
+        while remaining:
+            index = min(range(len(remaining)), key=best.__getitem__)
+            total += best[index]
+            added = remaining[index]
+            # Remover trocando pelo último (O(1))
+            remaining[index] = remaining[-1]
+            best[index] = best[-1]
+            remaining.pop()
+            best.pop()
+            for k, slot in enumerate(remaining):
+                d = DistanceService.calculate_distance(added, slot, profile)
+                if d < best[k]:
+                    best[k] = d
+        return total
 
     @staticmethod
-    def _route_distance(route: List[Slot]) -> float:
+    def _tree_weight(dist: List[List[float]], nodes: List[int]) -> float:
+        """Peso da árvore geradora mínima sobre nodes (índices da matriz), Prim O(n²)"""
+        if len(nodes) < 2:
+            return 0.0
+        remaining = nodes[1:]
+        root = dist[nodes[0]]
+        best = [root[v] for v in remaining]
+        total = 0.0
+        while remaining:
+            index = min(range(len(remaining)), key=best.__getitem__)
+            total += best[index]
+            added = dist[remaining[index]]
+            remaining[index] = remaining[-1]
+            best[index] = best[-1]
+            remaining.pop()
+            best.pop()
+            for k, v in enumerate(remaining):
+                if added[v] < best[k]:
+                    best[k] = added[v]
+        return total
+
+    @staticmethod
+    def exact_route(
+        start_slot: Slot,
+        route: List[Slot],
+        profile: Optional[CostProfile] = None,
+        max_time_sec: Optional[float] = None
+    ) -> Tuple[List[Slot], bool]:
+        """
+        Rota ótima (sem retorno) por branch-and-bound em profundidade sobre a
+        matriz de distâncias das paradas, com route como incumbente inicial.
+
+        Poda:
+        - limite inferior = custo até aqui + menor aresta saindo da parada atual
+          + árvore geradora mínima das não visitadas (em cache por conjunto)
+        - dominância: mesmo conjunto visitado e mesma parada atual com custo
+          maior ou igual a um já visto (o restante ótimo é o mesmo)
+        Filhos em ordem de distância, para achar boas rotas cedo.
+
+        Retorna (rota, ótimo provado). Se max_time_sec estoura, devolve a melhor
+        rota encontrada até então (nunca pior que route) e False.
+        """
+        n = len(route)
+        if n < 2:
+            return list(route), True
+        max_time_sec = PickingService.EXACT_MAX_TIME_SEC if max_time_sec is None else max_time_sec
+        deadline = time.perf_counter() + max_time_sec
+
+        # Índice 0 = início; parada i da rota = índice i
+        points = [start_slot] + list(route)
+        dist = [[DistanceService.calculate_distance(a, b, profile) for b in points] for a in points]
+
+        best_order = list(range(1, n + 1))
+        best_cost = sum(dist[i][i + 1] for i in range(n))
+        seen: Dict[Tuple[int, int], float] = {}
+        trees: Dict[int, float] = {}
+        path: List[int] = []
+        nodes = 0
+        timed_out = False
+
+        def visit(current: int, unvisited: List[int], visited_mask: int, cost: float) -> None:
+            nonlocal best_order, best_cost, nodes, timed_out
+            nodes += 1
+            if not unvisited:
+                if cost < best_cost:
+                    best_order, best_cost = list(path), cost
+                return
+            if nodes & 255 == 0 and time.perf_counter() > deadline:
+                timed_out = True
+            if timed_out:
+                return
+
+            key = (visited_mask, current)
+            if seen.get(key, float("inf")) <= cost:
+                return
+            seen[key] = cost
+
+            row = dist[current]
+            unvisited_mask = ((1 << (n + 1)) - 2) & ~visited_mask
+            tree = trees.get(unvisited_mask)
+            if tree is None:
+                tree = trees[unvisited_mask] = PickingService._tree_weight(dist, unvisited)
+            if cost + min(row[v] for v in unvisited) + tree >= best_cost:
+                return
+
+            for k in sorted(unvisited, key=lambda v: (row[v], v)):
+                next_cost = cost + row[k]
+                if next_cost >= best_cost:
+                    continue
+                path.append(k)
+                visit(k, [v for v in unvisited if v != k], visited_mask | (1 << k), next_cost)
+                path.pop()
+
+        visit(0, list(range(1, n + 1)), 0, 0.0)
+        return [points[i] for i in best_order], not timed_out
+
+    @staticmethod
+    def _route_distance(route: List[Slot], profile: Optional[CostProfile] = None) -> float:
         """Calcula distância total de uma rota"""
         if len(route) < 2:
             return 0.0
 
         total = 0.0
         for i in range(len(route) - 1):
-            total += DistanceService.calculate_distance(route[i], route[i + 1])
+            total += DistanceService.calculate_distance(route[i], route[i + 1], profile)
 
         return total
 
@@ -142,10 +313,17 @@ class PickingService:
     def create_picking_plan(
         db: Session,
         device_ids: List[str],
-        start_slot: Optional[Slot] = None
+        start_slot: Optional[Slot] = None,
+        operator_id: Optional[str] = None,
+        profile: Optional[CostProfile] = None
     ) -> dict:
         """
-        Cria plano de picking usando Nearest Neighbor + 2-opt
+        Cria plano de picking usando Nearest Neighbor + 2-opt; com até
+        EXACT_MAX_STOPS paradas, a rota do NN vira incumbente de um
+        branch-and-bound exato (2-opt só se o tempo do exato estourar)
+        Com operator_id, a rota parte da posição atual do operador
+        Com profile, as distâncias usam os custos do perfil (sem perfil: "default")
+        A estatística do plano fica pendente na sessão: o chamador a grava no commit
 
         Retorna:
             {
@@ -161,12 +339,29 @@ class PickingService:
                     }
                 ],
                 "total_distance": float,
-                "start_position": {slot_id, human_code}
+                "start_position": {slot_id, human_code},
+                "cost_profile": str,
+                "quality": {
+                    "lower_bound": float,  # árvore geradora mínima (início + paradas)
+                    "gap": float,  # (total - lower_bound) / lower_bound
+                    "nn_distance": float,  # rota do NN, antes do exato/2-opt
+                    "improvement": float,  # nn_distance - total (ganho do exato e/ou 2-opt)
+                    "two_opt_iterations": int,
+                    "two_opt_stop_reason": str,  # "skipped" quando o exato provou o ótimo
+                    "solver": str,  # heuristic ou branch_and_bound
+                    "optimal": bool,  # ótimo provado pelo branch-and-bound
+                    "phases_ms": {lookup, nearest_neighbor, exact, two_opt, lower_bound}
+                }
             }
+        A telemetria de qualidade é gravada em picking_plan_stats.
         """
         from services.assignment_service import AssignmentService
 
-        # Usar slot de início padrão se não fornecido
+        plan_started = time.perf_counter()
+
+        # Usar posição do operador (ou slot de início padrão) se não fornecido
+        if start_slot is None and operator_id:
+            start_slot = OperatorService.get_position_slot(db, operator_id)
         if start_slot is None:
             start_slot = AssignmentService.get_default_start_slot(db)
 
@@ -179,7 +374,8 @@ class PickingService:
             }
 
         # Mapear devices para slots
-        device_slot_map = PickingService.get_device_slots(db, device_ids)
+        with timed(SERVICE_STAGE_SECONDS.labels("picking", "device_lookup")) as lookup_time:
+            device_slot_map = PickingService.get_device_slots(db, device_ids)
 
         # Filtrar apenas devices que estão em slots
         valid_devices = [
@@ -202,12 +398,35 @@ class PickingService:
         target_slots = [device_slot_map[did] for did in valid_devices]
 
         # Construir rota com Nearest Neighbor
-        route_slots = PickingService.nearest_neighbor_route(
-            start_slot, target_slots
-        )
+        with timed(SERVICE_STAGE_SECONDS.labels("picking", "nearest_neighbor")) as nn_time:
+            route_slots = PickingService.nearest_neighbor_route(
+                start_slot, target_slots, profile
+            )
+        nn_distance = PickingService._route_distance([start_slot] + route_slots, profile)
+
+        # Listas pequenas: rota ótima por branch-and-bound (NN como incumbente)
+        solver, optimal = "heuristic", False
+        exact_ms = 0.0
+        if len(route_slots) <= PickingService.EXACT_MAX_STOPS:
+            with timed(SERVICE_STAGE_SECONDS.labels("picking", "exact")) as exact_time:
+                route_slots, optimal = PickingService.exact_route(start_slot, route_slots, profile)
+            solver = "branch_and_bound"
+            exact_ms = exact_time.elapsed * 1000
+            EXACT_SOLVES.labels("optimal" if optimal else "time_cap").inc()
+
+        # Melhorar rota com 2-opt (listas grandes ou exato sem tempo para provar o ótimo)
+        two_opt_iterations, two_opt_stop_reason = 0, "skipped"
+        two_opt_ms = 0.0
+        if not optimal:
+            with timed(SERVICE_STAGE_SECONDS.labels("picking", "two_opt")) as two_opt_time:
+                route_slots, two_opt_iterations, two_opt_stop_reason = PickingService._two_opt(
+                    route_slots, profile=profile
+                )
+            two_opt_ms = two_opt_time.elapsed * 1000
 
-        # Melhorar rota com 2-opt
-        route_slots = PickingService.two_opt_improve(route_slots)
+        # Limite inferior para medir a distância até o ótimo
+        with timed(SERVICE_STAGE_SECONDS.labels("picking", "lower_bound")) as lower_bound_time:
+            lower_bound = PickingService.route_lower_bound(start_slot, route_slots, profile)
 
         # Construir resposta com informações completas
         route_result = []
@@ -223,9 +442,9 @@ class PickingService:
                     break
 
             if device_id:
-                distance_from_prev = DistanceService.calculate_distance(
-                    previous_slot, slot
-                )
+                distance_from_prev = float(DistanceService.calculate_distance(
+                    previous_slot, slot, profile
+                ))
                 cumulative_distance += distance_from_prev
 
                 route_result.append({
@@ -241,11 +460,55 @@ class PickingService:
                 previous_slot = slot
 
         # Distância de retorno ao início (opcional, para fechar o ciclo)
-        return_distance = DistanceService.calculate_distance(
-            previous_slot, start_slot
-        )
+        return_distance = float(DistanceService.calculate_distance(
+            previous_slot, start_slot, profile
+        ))
         total_distance = cumulative_distance
 
+        if lower_bound > 0:
+            gap = (total_distance - lower_bound) / lower_bound
+        else:
+            gap = 0.0 if total_distance == 0 else None
+        phases_ms = {
+            "lookup": lookup_time.elapsed * 1000,
+            "nearest_neighbor": nn_time.elapsed * 1000,
+            "exact": exact_ms,
+            "two_opt": two_opt_ms,
+            "lower_bound": lower_bound_time.elapsed * 1000,
+        }
+        quality = {
+            "lower_bound": lower_bound,
+            "gap": gap,
+            "nn_distance": nn_distance,
+            "improvement": nn_distance - total_distance,
+            "two_opt_iterations": two_opt_iterations,
+            "two_opt_stop_reason": two_opt_stop_reason,
+            "solver": solver,
+            "optimal": optimal,
+            "phases_ms": phases_ms,
+        }
+
+        PlanStatsService.record(db, PickingPlanStat(
+            operator_id=operator_id,
+            distance_model="layout" if DistanceService.layout() is not None else "manhattan",
+            requested_devices=len(device_ids),
+            stops=len(route_result),
+            total_distance=total_distance,
+            nn_distance=nn_distance,
+            lower_bound=lower_bound,
+            gap=gap,
+            two_opt_iterations=two_opt_iterations,
+            two_opt_stop_reason=two_opt_stop_reason,
+            solver=solver,
+            optimal=optimal,
+            lookup_ms=phases_ms["lookup"],
+            nearest_neighbor_ms=phases_ms["nearest_neighbor"],
+            exact_ms=phases_ms["exact"],
+            two_opt_ms=phases_ms["two_opt"],
+            lower_bound_ms=phases_ms["lower_bound"],
+            total_ms=(time.perf_counter() - plan_started) * 1000,
+        ))
+
         return {
             "route": route_result,
             "total_distance": total_distance,
@@ -253,13 +516,16 @@ class PickingService:
             "start_position": {
                 "slot_id": start_slot.id,
                 "human_code": start_slot.human_code
-            }
+            },
+            "cost_profile": profile.name if profile is not None else DEFAULT_PROFILE,
+            "quality": quality
         }
 
     @staticmethod
     def mark_device_in_transit(
         db: Session,
-        device_id: str
+        device_id: str,
+        operator_id: Optional[str] = None
     ) -> dict:
         """
         Marca um device como em trânsito (IN_TRANSIT) ao iniciar a coleta.
@@ -277,9 +543,12 @@ class PickingService:
                 from_slot_id=device.slot_id,
                 to_slot_id=device.slot_id,
                 type=MovementType.MOVE,
-                meta_json={"in_transit": True}
+                meta_json={"in_transit": True},
+                operator_id=operator_id
             )
             db.add(movement)
+            OperatorService.update_position(db, operator_id, device.slot_id)
+            InventoryVersionService.bump(db)
             db.commit()
             return {"success": True}
         except Exception as e:
@@ -289,7 +558,8 @@ class PickingService:
     @staticmethod
     def mark_device_picked(
         db: Session,
-        device_id: str
+        device_id: str,
+        operator_id: Optional[str] = None
     ) -> dict:
         """
         Marca um device como coletado (picked)
@@ -329,6 +599,7 @@ class PickingService:
             old_slot_id = device.slot_id
             device.slot_id = None
             device.status = DeviceStatus.OUT_STOCK
+            device.plan_id = None
 
             # Registrar movimento
             movement = Movement(
@@ -336,9 +607,13 @@ class PickingService:
                 from_slot_id=old_slot_id,
                 to_slot_id=None,
                 type=MovementType.CHECK_OUT,
-                meta_json={"picked": True}
+                meta_json={"picked": True},
+                operator_id=operator_id
             )
             db.add(movement)
+            OperatorService.update_position(db, operator_id, old_slot_id)
+            PickingPlanService.mark_picked(db, [device_id])
+            InventoryVersionService.bump(db)
 
             db.commit()
 
@@ -356,29 +631,138 @@ class PickingService:
                 "error": f"Erro ao marcar device como coletado: {str(e)}"
             }
 
+    @staticmethod
+    def _bulk_transition(
+        db: Session,
+        device_ids: List[str],
+        from_statuses: Tuple[DeviceStatus, ...],
+        to_status: DeviceStatus,
+        movement_type: MovementType,
+        meta_json: dict,
+        operator_id: Optional[str] = None,
+        release_slot: bool = False,
+        where: tuple = (),
+        values: Optional[dict] = None
+    ) -> dict:
+        """
+        Transição de status em lote, sem carregar objetos Device:
+        um UPDATE ... WHERE status IN (...) RETURNING e um INSERT em lote em movements.
+        Com release_slot, libera os slots (occupied=False) e desvincula os devices.
+        where/values: critérios e colunas extras do UPDATE (p.ex. plan_id).
+        Não faz commit. Retorna {device_id: slot_id} dos devices alterados.
+        """
+        with BulkKeys.matching(db, Device.device_id, device_ids) as requested:
+            criteria = [requested, Device.status.in_(from_statuses), *where]
+            if release_slot:
+                criteria.append(Device.slot_id.isnot(None))
+            changed = dict(db.execute(
+                update(Device).where(*criteria).values(status=to_status, **(values or {}))
+                .returning(Device.device_id, Device.slot_id)
+                .execution_options(synchronize_session=False)
+            ).all())
+
+        if not changed:
+            return changed
+
+        slot_ids = [slot_id for slot_id in changed.values() if slot_id is not None]
+        if release_slot and slot_ids:
+            with BulkKeys.matching(db, Slot.id, slot_ids) as freed:
+                db.execute(
+                    update(Slot).where(freed).values(occupied=False)
+                    .execution_options(synchronize_session=False)
+                )
+            with BulkKeys.matching(db, Device.slot_id, slot_ids) as holding:
+                db.execute(
+                    update(Device).where(holding).values(slot_id=None)
+                    .execution_options(synchronize_session=False)
+                )
+
+        movements = db.execute(
+            insert(Movement).returning(Movement.id, Movement.device_id),
+            [
+                {
+                    "device_id": device_id,
+                    "from_slot_id": slot_id,
+                    "to_slot_id": None if release_slot else slot_id,
+                    "type": movement_type,
+                    "meta_json": meta_json,
+                    "operator_id": operator_id,
+                }
+                for device_id, slot_id in changed.items()
+            ]
+        ).all()
+
+        # Statements em lote não passam pelo flush: registrar as mudanças no feed
+        for device_id, slot_id in changed.items():
+            ChangeFeed.stage(db, {
+                "kind": "device",
+                "device_id": device_id,
+                "status": to_status.value,
+                "previous_status": from_statuses[0].value if len(from_statuses) == 1 else None,
+                "slot_id": None if release_slot else slot_id,
+            })
+        if release_slot:
+            topology = TopologyRegistry.get(db)
+            for slot_id in slot_ids:
+                ChangeFeed.stage(db, {
+                    "kind": "slot", "id": slot_id, "human_code": topology.code_for_id(slot_id), "occupied": False
+                })
+        for movement_id, device_id in movements:
+            ChangeFeed.stage(db, {
+                "kind": "movement", "id": movement_id, "device_id": device_id, "type": movement_type.value
+            })
+
+        InventoryVersionService.bump(db)
+        return changed
+
+    @staticmethod
+    def _bulk_outcomes(
+        db: Session,
+        device_ids: List[str],
+        changed: dict,
+        from_statuses: Tuple[DeviceStatus, ...]
+    ) -> List[dict]:
+        """Resultado por device: updated, not_found, invalid_status (com o status atual) ou no_slot"""
+        requested = BulkKeys.unique(device_ids)
+        pending = [device_id for device_id in requested if device_id not in changed]
+        current = {}
+        if pending:
+            with BulkKeys.matching(db, Device.device_id, pending) as criteria:
+                current = {
+                    device_id: (status, slot_id)
+                    for device_id, status, slot_id in db.query(
+                        Device.device_id, Device.status, Device.slot_id
+                    ).filter(criteria)
+                }
+
+        outcomes = []
+        for device_id in requested:
+            if device_id in changed:
+                outcomes.append({"device_id": device_id, "outcome": "updated"})
+            elif device_id not in current:
+                outcomes.append({"device_id": device_id, "outcome": "not_found"})
+            else:
+                status, slot_id = current[device_id]
+                outcome = "no_slot" if status in from_statuses and slot_id is None else "invalid_status"
+                outcomes.append({"device_id": device_id, "outcome": outcome, "status": status.value})
+        return outcomes
+
     @staticmethod
     def mark_devices_in_transit(
         db: Session,
-        device_ids: List[str]
+        device_ids: List[str],
+        operator_id: Optional[str] = None
     ) -> dict:
         """Marca todos os devices da lista como IN_TRANSIT (se estiverem IN_STOCK)."""
-        updated = 0
         try:
-            devices = db.query(Device).filter(Device.device_id.in_(device_ids)).all()
-            for d in devices:
-                if d.status == DeviceStatus.IN_STOCK:
-                    d.status = DeviceStatus.IN_TRANSIT
-                    mv = Movement(
-                        device_id=d.device_id,
-                        from_slot_id=d.slot_id,
-                        to_slot_id=d.slot_id,
-                        type=MovementType.MOVE,
-                        meta_json={"in_transit": True, "bulk_plan": True}
-                    )
-                    db.add(mv)
-                    updated += 1
-            db.commit()
-            return {"success": True, "updated": updated}
+            changed = PickingService._bulk_transition(
+                db, device_ids, (DeviceStatus.IN_STOCK,), DeviceStatus.IN_TRANSIT,
+                MovementType.MOVE, {"in_transit": True, "bulk_plan": True}, operator_id
+            )
+            results = PickingService._bulk_outcomes(db, device_ids, changed, (DeviceStatus.IN_STOCK,))
+            with timed(SERVICE_STAGE_SECONDS.labels("picking", "db_commit")):
+                db.commit()
+            return {"success": True, "updated": len(changed), "results": results}
         except Exception as e:
             db.rollback()
             return {"success": False, "error": str(e)}
@@ -386,27 +770,196 @@ class PickingService:
     @staticmethod
     def reset_devices_from_transit(
         db: Session,
-        device_ids: List[str]
+        device_ids: List[str],
+        operator_id: Optional[str] = None
     ) -> dict:
         """Cancela plano: volta devices IN_TRANSIT para IN_STOCK sem liberar slot."""
-        updated = 0
         try:
-            devices = db.query(Device).filter(Device.device_id.in_(device_ids)).all()
-            for d in devices:
-                if d.status == DeviceStatus.IN_TRANSIT:
-                    d.status = DeviceStatus.IN_STOCK
-                    mv = Movement(
-                        device_id=d.device_id,
-                        from_slot_id=d.slot_id,
-                        to_slot_id=d.slot_id,
-                        type=MovementType.RELEASE,
-                        meta_json={"cancel_plan": True}
-                    )
-                    db.add(mv)
-                    updated += 1
+            changed = PickingService._bulk_transition(
+                db, device_ids, (DeviceStatus.IN_TRANSIT,), DeviceStatus.IN_STOCK,
+                MovementType.RELEASE, {"cancel_plan": True}, operator_id,
+                values={"plan_id": None}
+            )
+            results = PickingService._bulk_outcomes(db, device_ids, changed, (DeviceStatus.IN_TRANSIT,))
             db.commit()
-            return {"success": True, "updated": updated}
+            return {"success": True, "updated": len(changed), "results": results}
         except Exception as e:
             db.rollback()
             return {"success": False, "error": str(e)}
 
+    @staticmethod
+    def mark_devices_picked(
+        db: Session,
+        device_ids: List[str],
+        operator_id: Optional[str] = None
+    ) -> dict:
+        """
+        Marca a rota inteira como coletada: devices IN_STOCK/IN_TRANSIT com slot
+        passam a OUT_STOCK, os slots são liberados e um CHECK_OUT é registrado
+        por device. O operador fica na posição do último device coletado.
+        """
+        try:
+            changed = PickingService._bulk_transition(
+                db, device_ids, (DeviceStatus.IN_STOCK, DeviceStatus.IN_TRANSIT), DeviceStatus.OUT_STOCK,
+                MovementType.CHECK_OUT, {"picked": True, "bulk": True}, operator_id, release_slot=True,
+                values={"plan_id": None}
+            )
+            results = PickingService._bulk_outcomes(
+                db, device_ids, changed, (DeviceStatus.IN_STOCK, DeviceStatus.IN_TRANSIT)
+            )
+            last_picked = next((d for d in reversed(BulkKeys.unique(device_ids)) if d in changed), None)
+            if last_picked:
+                OperatorService.update_position(db, operator_id, changed[last_picked])
+            PickingPlanService.mark_picked(db, changed)
+            db.commit()
+            return {"success": True, "updated": len(changed), "results": results}
+        except Exception as e:
+            db.rollback()
+            return {"success": False, "error": str(e)}
+
+
+    @staticmethod
+    def _reprice_route(
+        start_slot_id: int,
+        route: List[dict],
+        slot_by_device: Dict[str, int],
+        profile: Optional[CostProfile] = None
+    ) -> Tuple[List[dict], float, Optional[float]]:
+        """
+        Recalcula as distâncias da rota mantendo a ordem, com os slots informados
+        (devices que saíram da rota ou mudaram de slot desde o planejamento).
+        Retorna (rota, distância total, distância de retorno).
+        """
+        topology = TopologyRegistry.get()
+        start = previous = topology.slot(start_slot_id)
+        repriced = []
+        cumulative_distance = 0.0
+        for item in route:
+            slot = topology.slot(slot_by_device[item["device_id"]])
+            distance_from_prev = float(DistanceService.calculate_distance(previous, slot, profile))
+            cumulative_distance += distance_from_prev
+            repriced.append({
+                **item,
+                "slot_id": slot.id,
+                "human_code": slot.human_code,
+                "row": slot.row_index,
+                "col": slot.col_index,
+                "distance_from_prev": distance_from_prev,
+                "cumulative_distance": cumulative_distance
+            })
+            previous = slot
+        return_distance = float(DistanceService.calculate_distance(previous, start, profile)) if repriced else None
+        return repriced, cumulative_distance, return_distance
+
+    @staticmethod
+    def reserve_picking_plan(
+        db: Session,
+        device_ids: List[str],
+        operator_id: Optional[str] = None,
+        profile: Optional[CostProfile] = None
+    ) -> dict:
+        """
+        Planeja e reserva os devices da rota para um novo plano.
+
+        O planejamento (leitura) roda fora da transação de escrita; a reserva é
+        um UPDATE condicional (IN_STOCK → IN_TRANSIT com plan_id) na mesma
+        transação que grava o plano. Devices que outro plano reservou entre as
+        duas fases ficam fora da rota (outcome "contended"), sem bloqueio global:
+        planejadores concorrentes só disputam a escrita curta da reserva.
+
+        Retorna o resultado de create_picking_plan com a rota reservada, mais
+        plan_id e excluded (devices pedidos e não reservados, com o motivo).
+        """
+        result = PickingService.create_picking_plan(db, device_ids, operator_id=operator_id, profile=profile)
+        route = result.get("route") or []
+        planned = {item["device_id"] for item in route}
+
+        def excluded(changed: dict) -> List[dict]:
+            outcomes = PickingService._bulk_outcomes(db, device_ids, changed, (DeviceStatus.IN_STOCK,))
+            for outcome in outcomes:
+                if outcome["outcome"] != "updated" and outcome["device_id"] in planned:
+                    outcome["outcome"] = "contended"
+            return [outcome for outcome in outcomes if outcome["outcome"] != "updated"]
+
+        if not route:
+            # Só a estatística do planejamento está pendente
+            db.commit()
+            return {**result, "plan_id": None, "excluded": excluded({})}
+
+        plan = PickingPlan(
+            id=PickingPlanService.new_id(),
+            operator_id=operator_id,
+            status=PlanStatus.ACTIVE,
+            requested_devices=len(BulkKeys.unique(device_ids)),
+            start_slot_id=result["start_position"]["slot_id"],
+            cost_profile=result["cost_profile"]
+        )
+        try:
+            # Plano antes dos devices (FK de devices.plan_id)
+            db.add(plan)
+            db.flush()
+            with timed(SERVICE_STAGE_SECONDS.labels("picking", "reserve")):
+                changed = PickingService._bulk_transition(
+                    db, [item["device_id"] for item in route], (DeviceStatus.IN_STOCK,), DeviceStatus.IN_TRANSIT,
+                    MovementType.MOVE, {"in_transit": True, "plan_id": plan.id}, operator_id,
+                    values={"plan_id": plan.id}
+                )
+            if not changed:
+                db.rollback()
+                return {
+                    **result,
+                    "route": [],
+                    "total_distance": 0.0,
+                    "return_distance": None,
+                    "plan_id": None,
+                    "excluded": excluded({}),
+                    "error": "Todos os devices da rota foram reservados por outro plano"
+                }
+
+            moved = any(
+                changed[item["device_id"]] != item["slot_id"] for item in route if item["device_id"] in changed
+            )
+            if len(changed) < len(route) or moved:
+                route, total_distance, return_distance = PickingService._reprice_route(
+                    plan.start_slot_id, [item for item in route if item["device_id"] in changed], changed, profile
+                )
+                result = {**result, "route": route, "total_distance": total_distance, "return_distance": return_distance}
+
+            plan.reserved_devices = len(changed)
+            plan.total_distance = result["total_distance"]
+            plan.return_distance = result.get("return_distance")
+            plan.excluded_json = excluded(changed)
+            PickingPlanService.add_items(db, plan.id, route)
+            with timed(SERVICE_STAGE_SECONDS.labels("picking", "db_commit")):
+                db.commit()
+            return {**result, "plan_id": plan.id, "excluded": plan.excluded_json}
+        except Exception as e:
+            db.rollback()
+            return {**result, "route": [], "plan_id": None, "excluded": [], "error": f"Erro ao reservar o plano: {str(e)}"}
+
+    @staticmethod
+    def cancel_picking_plan(
+        db: Session,
+        plan_id: str,
+        operator_id: Optional[str] = None
+    ) -> dict:
+        """Cancela o plano: só os devices ainda reservados por ele voltam para IN_STOCK"""
+        plan = db.get(PickingPlan, plan_id)
+        if plan is None:
+            return {"success": False, "error": f"Plano {plan_id} não encontrado"}
+        if plan.status != PlanStatus.ACTIVE:
+            return {"success": False, "error": f"Plano {plan_id} não está ativo ({plan.status.value})"}
+        try:
+            device_ids = [item.device_id for item in PickingPlanService.items(db, plan_id)]
+            changed = PickingService._bulk_transition(
+                db, device_ids, (DeviceStatus.IN_TRANSIT,), DeviceStatus.IN_STOCK,
+                MovementType.RELEASE, {"cancel_plan": True, "plan_id": plan_id}, operator_id,
+                where=(Device.plan_id == plan_id,), values={"plan_id": None}
+            )
+            PickingPlanService.release(db, plan_id)
+            plan.status = PlanStatus.CANCELLED
+            db.commit()
+            return {"success": True, "plan_id": plan_id, "updated": len(changed)}
+        except Exception as e:
+            db.rollback()
+            return {"success": False, "error": str(e)}
@@ -0,0 +1,126 @@
+"""
+Telemetria de qualidade dos planos de picking: gravação por plano e
+agregação (gap até o limite inferior, tempo por fase, ganho do 2-opt,
+planos resolvidos pelo solver exato)
+para calibrar os orçamentos do planejador contra a latência
+"""
+from sqlalchemy.orm import Session
+from models.picking_plan_stat import PickingPlanStat
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Faixas de tamanho de plano (nº de paradas) usadas na agregação
+SIZE_BUCKETS = ((1, 10), (11, 50), (51, 200), (201, None))
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+class PlanStatsService:
+    """Grava e agrega estatísticas de qualidade dos planos"""
+
+    @staticmethod
+    def record(db: Session, stat: PickingPlanStat) -> None:
+        """
+        Inclui a estatística do plano na transação do chamador, que a grava no
+        próprio commit (a estatística acompanha a reserva e some com o rollback).
+        O INSERT roda num savepoint: uma falha não desfaz o que o chamador
+        tem pendente e não interrompe o planejamento.
+        """
+        try:
+            with db.begin_nested():
+                db.add(stat)
+        except Exception:
+            logger.exception("Erro ao gravar estatística do plano de picking")
+
+    @staticmethod
+    def _aggregate(rows: List[PickingPlanStat]) -> dict:
+        gaps = sorted(r.gap for r in rows if r.gap is not None)
+        stop_reasons: Dict[str, int] = {}
+        solvers: Dict[str, int] = {}
+        # Ganho relativo sobre o NN por solver: no exato, vem do branch-and-bound
+        # (e do 2-opt, se o tempo estourou), então não entra no ganho do 2-opt
+        improvements: Dict[str, List[float]] = {}
+        for r in rows:
+            if r.two_opt_stop_reason:
+                stop_reasons[r.two_opt_stop_reason] = stop_reasons.get(r.two_opt_stop_reason, 0) + 1
+            solver = r.solver or "heuristic"
+            solvers[solver] = solvers.get(solver, 0) + 1
+            if r.nn_distance:
+                improvements.setdefault(solver, []).append(
+                    (r.nn_distance - r.total_distance) / r.nn_distance
+                )
+        total_ms = sorted(r.total_ms for r in rows)
+
+        return {
+            "plans": len(rows),
+            "gap": {
+                "mean": _mean(gaps),
+                "p50": _percentile(gaps, 0.5),
+                "p95": _percentile(gaps, 0.95),
+                "max": gaps[-1] if gaps else None,
+            },
+            # Só planos em que o 2-opt partiu da rota do NN (solver heurístico)
+            "two_opt_improvement_mean": _mean(improvements.get("heuristic", [])),
+            "improvement_mean_by_solver": {
+                solver: _mean(values) for solver, values in sorted(improvements.items())
+            },
+            "two_opt_iterations_mean": _mean([r.two_opt_iterations for r in rows]),
+            "two_opt_stop_reasons": stop_reasons,
+            "solvers": solvers,
+            "optimal": sum(1 for r in rows if r.optimal),
+            "phases_ms_mean": {
+                "lookup": _mean([r.lookup_ms for r in rows]),
+                "nearest_neighbor": _mean([r.nearest_neighbor_ms for r in rows]),
+                "exact": _mean([r.exact_ms or 0.0 for r in rows]),
+                "two_opt": _mean([r.two_opt_ms for r in rows]),
+                "lower_bound": _mean([r.lower_bound_ms for r in rows]),
+            },
+            "total_ms": {
+                "mean": _mean(total_ms),
+                "p50": _percentile(total_ms, 0.5),
+                "p95": _percentile(total_ms, 0.95),
+            },
+        }
+
+    @staticmethod
+    def summary(
+        db: Session,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        operator_id: Optional[str] = None,
+        distance_model: Optional[str] = None
+    ) -> dict:
+        """Agregado geral e por faixa de tamanho do plano"""
+        query = db.query(PickingPlanStat)
+        if since:
+            query = query.filter(PickingPlanStat.created_at >= since)
+        if until:
+            query = query.filter(PickingPlanStat.created_at < until)
+        if operator_id:
+            query = query.filter(PickingPlanStat.operator_id == operator_id)
+        if distance_model:
+            query = query.filter(PickingPlanStat.distance_model == distance_model)
+        rows = query.all()
+
+        by_size = []
+        for low, high in SIZE_BUCKETS:
+            bucket = [r for r in rows if r.stops >= low and (high is None or r.stops <= high)]
+            if bucket:
+                by_size.append({
+                    "stops": f"{low}-{high}" if high else f"{low}+",
+                    **PlanStatsService._aggregate(bucket)
+                })
+
+        return {**PlanStatsService._aggregate(rows), "by_size": by_size}
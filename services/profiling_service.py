@@ -0,0 +1,237 @@
+"""
+Profiling sob demanda de requisições individuais:
+- CPU: amostragem das pilhas de todas as threads (sys._current_frames) em
+  intervalo fixo, agregadas em formato "folded" (compatível com flamegraph.pl
+  e speedscope)
+- Memória: diferença de tracemalloc antes/depois da requisição
+
+Ativado somente quando PROFILING_TOKEN está definido e a requisição envia o
+token no header X-Profile (ou no parâmetro profile). Um profile por vez.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Folhas de pilha que indicam thread ociosa (loop de eventos, pool de threads)
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_-]+")
+_PROFILE_NAME = re.compile(r"^[A-Za-z0-9_.-]+\.json$")
+
+
+class StackSampler(threading.Thread):
+    """Thread que amostra as pilhas das demais threads até stop()"""
+
+    def __init__(self, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Dict[str, int] = {}
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        own_ident = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(ident, str(ident)))
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class RequestProfile:
+    """Profile em andamento de uma requisição"""
+
+    def __init__(self, interval: float, memory_top: int):
+        self.memory_top = memory_top
+        self.started_at = datetime.utcnow()
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start(ProfilingService.TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        self._before = tracemalloc.take_snapshot()
+        self._sampler = StackSampler(interval)
+        self._started = time.perf_counter()
+        self._sampler.start()
+
+    def finish(self) -> dict:
+        """Para a amostragem e retorna CPU (pilhas) e memória (diferença)"""
+        self._sampler.stop()
+        duration = time.perf_counter() - self._started
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        diff = [
+            stat for stat in after.compare_to(self._before, "lineno")
+            if stat.size_diff or stat.count_diff
+        ][:self.memory_top]
+
+        stacks = sorted(self._sampler.stacks.items(), key=lambda item: -item[1])
+        return {
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "cpu": {
+                "interval_ms": round(self._sampler.interval * 1000, 3),
+                "samples": self._sampler.samples,
+                "top_functions": ProfilingService.top_functions(stacks),
+                "folded": [f"{stack} {count}" for stack, count in stacks],
+            },
+            "memory": {
+                "peak_kb": round(peak / 1024, 1),
+                "top_allocations": [
+                    {
+                        "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                        "size_diff_kb": round(stat.size_diff / 1024, 1),
+                        "count_diff": stat.count_diff,
+                    }
+                    for stat in diff
+                ],
+            },
+        }
+
+
+class ProfilingService:
+    """Configuração, gravação e listagem dos profiles em PROFILE_DIR"""
+
+    TOKEN = os.getenv("PROFILING_TOKEN", "")  # vazio = profiling desativado
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "storage/profiles")
+    SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+    TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "1"))
+    MEMORY_TOP = int(os.getenv("PROFILE_MEMORY_TOP", "30"))
+    KEEP = int(os.getenv("PROFILE_KEEP", "50"))  # 0 = manter todos
+
+    _lock = threading.Lock()
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(ProfilingService.TOKEN)
+
+    @staticmethod
+    def is_authorized(token: Optional[str]) -> bool:
+        return ProfilingService.enabled() and bool(token) and hmac.compare_digest(
+            token.encode("utf-8"), ProfilingService.TOKEN.encode("utf-8")
+        )
+
+    @staticmethod
+    def start() -> Optional[RequestProfile]:
+        """Inicia um profile; None se outro já estiver em andamento"""
+        if not ProfilingService._lock.acquire(blocking=False):
+            return None
+        try:
+            return RequestProfile(ProfilingService.SAMPLE_INTERVAL_MS / 1000, ProfilingService.MEMORY_TOP)
+        except Exception:
+            ProfilingService._lock.release()
+            raise
+
+    @staticmethod
+    def finish(profile: RequestProfile, request_info: dict) -> str:
+        """Finaliza o profile, grava em PROFILE_DIR e retorna o nome do arquivo"""
+        try:
+            result = profile.finish()
+        finally:
+            ProfilingService._lock.release()
+
+        result["request"] = request_info
+        slug = _SAFE_NAME.sub("_", request_info.get("path", "")).strip("_") or "root"
+        name = (
+            f"{profile.started_at.strftime('%Y%m%dT%H%M%S')}_"
+            f"{request_info.get('method', 'GET')}_{slug[:60]}_{uuid.uuid4().hex[:8]}.json"
+        )
+        os.makedirs(ProfilingService.PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(ProfilingService.PROFILE_DIR, name), "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, default=str)
+        ProfilingService._prune()
+        return name
+
+    @staticmethod
+    def top_functions(stacks: List[tuple], limit: int = 25) -> List[dict]:
+        """Funções por amostras self (no topo da pilha), depois total (em qualquer ponto da pilha)"""
+        self_counts: Dict[str, int] = {}
+        total_counts: Dict[str, int] = {}
+        for stack, count in stacks:
+            frames = stack.split(";")[1:]  # primeiro elemento é o nome da thread
+            if not frames:
+                continue
+            leaf = frames[-1].rsplit(":", 1)[0]
+            self_counts[leaf] = self_counts.get(leaf, 0) + count
+            for function in {frame.rsplit(":", 1)[0] for frame in frames}:
+                total_counts[function] = total_counts.get(function, 0) + count
+        ranked = sorted(
+            total_counts, key=lambda function: (-self_counts.get(function, 0), -total_counts[function])
+        )[:limit]
+        return [
+            {"function": function, "self": self_counts.get(function, 0), "total": total_counts[function]}
+            for function in ranked
+        ]
+
+    @staticmethod
+    def _prune() -> None:
+        keep = ProfilingService.KEEP
+        if keep <= 0:
+            return
+        for name in [p["name"] for p in ProfilingService.list_profiles()][keep:]:
+            try:
+                os.remove(os.path.join(ProfilingService.PROFILE_DIR, name))
+            except OSError:
+                pass
+
+    @staticmethod
+    def list_profiles() -> List[dict]:
+        """Profiles gravados, mais recentes primeiro"""
+        directory = ProfilingService.PROFILE_DIR
+        if not os.path.isdir(directory):
+            return []
+        profiles = []
+        for name in os.listdir(directory):
+            if not _PROFILE_NAME.match(name):
+                continue
+            stat = os.stat(os.path.join(directory, name))
+            profiles.append({
+                "name": name,
+                "size_bytes": stat.st_size,
+                "created_at": datetime.utcfromtimestamp(stat.st_mtime).isoformat(),
+            })
+        profiles.sort(key=lambda p: p["name"], reverse=True)
+        return profiles
+
+    @staticmethod
+    def profile_path(name: str) -> Optional[str]:
+        """Caminho do profile pelo nome (None se inválido ou inexistente)"""
+        if not _PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(ProfilingService.PROFILE_DIR, name)
+        return path if os.path.isfile(path) else None
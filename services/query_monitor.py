@@ -0,0 +1,186 @@
+"""
+Instrumentação de statements SQL via eventos do SQLAlchemy:
+- Contagem e tempo por statement, acumulados por requisição
+- Log de statements lentos com o EXPLAIN QUERY PLAN (SQLite)
+- Detector de N+1: orçamento de statements por requisição e limite de
+  repetições do mesmo formato de statement (só loga ou levanta exceção)
+
+Uso em testes/benchmarks:
+    with QueryMonitor.track(budget=10, repeat_limit=3) as stats:
+        PickingService.create_picking_plan(db, device_ids)
+    print(stats.count, stats.total_time)
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import logging
+import os
+import re
+import time
+from dotenv import load_dotenv
+from services.metrics import DB_STATEMENT_SECONDS
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Listas de placeholders (IN expandido, VALUES de vários registros) viram um só
+_PLACEHOLDER_LIST = re.compile(r"\?(\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Requisição excedeu o orçamento de statements ou repetiu o mesmo statement demais"""
+
+
+class QueryStats:
+    """Statements executados em uma requisição (ou bloco de QueryMonitor.track)"""
+
+    __slots__ = ("label", "count", "total_time", "shapes", "budget", "repeat_limit", "raise_on_violation")
+
+    def __init__(
+        self,
+        label: str = "",
+        budget: int = 0,
+        repeat_limit: int = 0,
+        raise_on_violation: bool = False
+    ):
+        self.label = label
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Dict[str, int] = {}
+        self.budget = budget
+        self.repeat_limit = repeat_limit
+        self.raise_on_violation = raise_on_violation
+
+    def repeated(self, min_count: int = 2) -> List[tuple]:
+        """Formatos de statement executados pelo menos min_count vezes (mais frequentes primeiro)"""
+        return sorted(
+            ((shape, n) for shape, n in self.shapes.items() if n >= min_count),
+            key=lambda item: -item[1]
+        )
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+class QueryMonitor:
+    """Hooks do SQLAlchemy para contagem, tempo e detecção de N+1"""
+
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))  # 0 = desativado
+    EXPLAIN_SLOW = os.getenv("SLOW_QUERY_EXPLAIN", "1") == "1"
+    # off | log | raise ("raise" é para testes: a requisição falha no statement excedente)
+    GUARD_MODE = os.getenv("QUERY_GUARD", "log")
+    QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "100"))  # 0 = sem limite
+    REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "20"))  # 0 = sem limite
+
+    @staticmethod
+    def statement_shape(statement: str) -> str:
+        """Formato normalizado do statement (independe do tamanho de listas IN)"""
+        return _PLACEHOLDER_LIST.sub("?", _WHITESPACE.sub(" ", statement).strip())
+
+    @staticmethod
+    def start_request(label: str = "") -> QueryStats:
+        """Inicia a contagem para a requisição atual conforme QUERY_GUARD"""
+        guard = QueryMonitor.GUARD_MODE
+        stats = QueryStats(
+            label=label,
+            budget=QueryMonitor.QUERY_BUDGET if guard != "off" else 0,
+            repeat_limit=QueryMonitor.REPEAT_LIMIT if guard != "off" else 0,
+            raise_on_violation=guard == "raise"
+        )
+        _current.set(stats)
+        return stats
+
+    @staticmethod
+    def current() -> Optional[QueryStats]:
+        return _current.get()
+
+    @staticmethod
+    @contextmanager
+    def track(label: str = "", budget: int = 0, repeat_limit: int = 0, raise_on_violation: bool = True):
+        """Conta os statements do bloco com orçamento próprio (útil em testes)"""
+        stats = QueryStats(label, budget, repeat_limit, raise_on_violation)
+        token = _current.set(stats)
+        try:
+            yield stats
+        finally:
+            _current.reset(token)
+
+    @staticmethod
+    def explain(dbapi_connection, statement: str, parameters) -> List[str]:
+        """EXPLAIN QUERY PLAN do statement em um cursor separado (não afeta o resultado original)"""
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[-1] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _violation(stats: QueryStats, message: str) -> None:
+        if stats.raise_on_violation:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+    @staticmethod
+    def record(statement: str, elapsed: float) -> Optional[QueryStats]:
+        """Acumula o statement na requisição atual e aplica orçamento/limite de repetição"""
+        stats = _current.get()
+        if stats is None:
+            return None
+
+        stats.count += 1
+        stats.total_time += elapsed
+        shape = QueryMonitor.statement_shape(statement)
+        repeats = stats.shapes.get(shape, 0) + 1
+        stats.shapes[shape] = repeats
+
+        # Cada violação é reportada uma única vez por requisição (no statement que a cruza)
+        if stats.budget and stats.count == stats.budget + 1:
+            QueryMonitor._violation(
+                stats, f"{stats.label or 'bloco'}: mais de {stats.budget} statements SQL"
+            )
+        if stats.repeat_limit and repeats == stats.repeat_limit:
+            QueryMonitor._violation(
+                stats,
+                f"{stats.label or 'bloco'}: possível N+1, statement repetido {repeats}x: {shape[:200]}"
+            )
+        return stats
+
+    @staticmethod
+    def instrument(engine) -> None:
+        """Registra os hooks before/after_cursor_execute no engine"""
+        from sqlalchemy import event
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            context._query_started = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context._query_started
+            operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "other"
+            DB_STATEMENT_SECONDS.labels(operation).observe(elapsed)
+
+            slow_ms = QueryMonitor.SLOW_QUERY_MS
+            if slow_ms and elapsed * 1000 >= slow_ms:
+                plan = []
+                if (
+                    QueryMonitor.EXPLAIN_SLOW
+                    and not executemany
+                    and conn.dialect.name == "sqlite"
+                    and operation in ("select", "with")
+                ):
+                    try:
+                        plan = QueryMonitor.explain(cursor.connection, statement, parameters)
+                    except Exception:
+                        logger.debug("Falha no EXPLAIN QUERY PLAN", exc_info=True)
+                logger.warning(
+                    "Statement lento (%.1f ms): %s%s",
+                    elapsed * 1000,
+                    QueryMonitor.statement_shape(statement)[:500],
+                    "".join(f"\n    plano: {step}" for step in plan)
+                )
+
+            QueryMonitor.record(statement, elapsed)
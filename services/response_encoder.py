@@ -0,0 +1,272 @@
+"""
+Camada de resposta para payloads grandes (planos de picking, alocações, slots):
+- Serializa a saída dos serviços direto em bytes, sem reconstruir e validar
+  modelos Pydantic (os schemas continuam documentando a resposta no OpenAPI)
+- JSON com orjson quando instalado (fallback: json da biblioteca padrão)
+- Negociação de conteúdo: JSON, NDJSON em streaming (uma linha por item) e
+  MessagePack (pacote msgpack se instalado, senão codificador embutido)
+- gzip quando o cliente aceita e o corpo passa de RESPONSE_GZIP_MIN_BYTES
+"""
+from fastapi.responses import Response, StreamingResponse
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterator, List, Optional, Tuple
+import enum
+import gzip
+import json
+import os
+import struct
+import zlib
+from dotenv import load_dotenv
+
+load_dotenv()
+
+try:
+    import orjson
+except ImportError:  # opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # opcional
+    msgpack = None
+
+JSON = "json"
+NDJSON = "ndjson"
+MSGPACK = "msgpack"
+
+MEDIA_TYPES = {
+    JSON: "application/json",
+    NDJSON: "application/x-ndjson",
+    MSGPACK: "application/msgpack",
+}
+_ACCEPT_FORMATS = {
+    "application/json": JSON,
+    "application/x-ndjson": NDJSON,
+    "application/ndjson": NDJSON,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+
+
+def _default(value):
+    """Tipos que não são JSON nativos (também usado pelo MessagePack)"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def _parse_header(value: Optional[str]) -> List[Tuple[str, float]]:
+    """Itens de Accept/Accept-Encoding como (valor em minúsculas, q)"""
+    parsed = []
+    for part in (value or "").split(","):
+        token, *params = [p.strip() for p in part.split(";")]
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        parsed.append((token.lower(), q))
+    return parsed
+
+
+def _pack(value, out: bytearray) -> None:
+    """Codificador MessagePack mínimo (nil, bool, int, float, str, bin, array, map)"""
+    if value is None:
+        out.append(0xC0)
+    elif value is True:
+        out.append(0xC3)
+    elif value is False:
+        out.append(0xC2)
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            out.append(value)
+        elif -32 <= value < 0:
+            out.append(value & 0xFF)
+        elif value >= 0:
+            for limit, code, fmt in ((0xFF, 0xCC, ">B"), (0xFFFF, 0xCD, ">H"), (0xFFFFFFFF, 0xCE, ">I")):
+                if value <= limit:
+                    out.append(code)
+                    out += struct.pack(fmt, value)
+                    break
+            else:
+                out.append(0xCF)
+                out += struct.pack(">Q", value)
+        else:
+            for limit, code, fmt in ((0x80, 0xD0, ">b"), (0x8000, 0xD1, ">h"), (0x80000000, 0xD2, ">i")):
+                if value >= -limit:
+                    out.append(code)
+                    out += struct.pack(fmt, value)
+                    break
+            else:
+                out.append(0xD3)
+                out += struct.pack(">q", value)
+    elif isinstance(value, float):
+        out.append(0xCB)
+        out += struct.pack(">d", value)
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        size = len(data)
+        if size < 32:
+            out.append(0xA0 | size)
+        elif size < 0x100:
+            out += bytes((0xD9, size))
+        elif size < 0x10000:
+            out.append(0xDA)
+            out += struct.pack(">H", size)
+        else:
+            out.append(0xDB)
+            out += struct.pack(">I", size)
+        out += data
+    elif isinstance(value, (bytes, bytearray)):
+        size = len(value)
+        if size < 0x100:
+            out += bytes((0xC4, size))
+        elif size < 0x10000:
+            out.append(0xC5)
+            out += struct.pack(">H", size)
+        else:
+            out.append(0xC6)
+            out += struct.pack(">I", size)
+        out += value
+    elif isinstance(value, (list, tuple)):
+        size = len(value)
+        if size < 16:
+            out.append(0x90 | size)
+        elif size < 0x10000:
+            out.append(0xDC)
+            out += struct.pack(">H", size)
+        else:
+            out.append(0xDD)
+            out += struct.pack(">I", size)
+        for item in value:
+            _pack(item, out)
+    elif isinstance(value, dict):
+        size = len(value)
+        if size < 16:
+            out.append(0x80 | size)
+        elif size < 0x10000:
+            out.append(0xDE)
+            out += struct.pack(">H", size)
+        else:
+            out.append(0xDF)
+            out += struct.pack(">I", size)
+        for key, item in value.items():
+            _pack(key, out)
+            _pack(item, out)
+    else:
+        _pack(_default(value), out)
+
+
+class ResponseFormat:
+    """Formato negociado para a requisição (ver routers.dependencies.response_format)"""
+
+    __slots__ = ("format", "gzip")
+
+    def __init__(self, format: str = JSON, gzip: bool = False):
+        self.format = format
+        self.gzip = gzip
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.format]
+
+
+class ResponseEncoder:
+    """Serialização e negociação de conteúdo das respostas grandes"""
+
+    GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))  # 0 = sem gzip
+    GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+    NDJSON_BATCH = int(os.getenv("RESPONSE_NDJSON_BATCH", "500"))  # linhas por bloco enviado
+
+    @staticmethod
+    def negotiate(accept: Optional[str], accept_encoding: Optional[str], format: Optional[str] = None) -> ResponseFormat:
+        """Formato pelo parâmetro format (prioridade) ou pelo header Accept (maior q)"""
+        chosen = format if format in MEDIA_TYPES else None
+        if chosen is None and accept:
+            best_q = 0.0
+            for media, q in _parse_header(accept):
+                if media in _ACCEPT_FORMATS and q > best_q:
+                    chosen, best_q = _ACCEPT_FORMATS[media], q
+        accepts_gzip = any(coding == "gzip" and q > 0 for coding, q in _parse_header(accept_encoding))
+        return ResponseFormat(chosen or JSON, accepts_gzip)
+
+    @staticmethod
+    def dumps_json(value) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(value, default=_default)
+        return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def dumps_msgpack(value) -> bytes:
+        if msgpack is not None:
+            return msgpack.packb(value, default=_default, use_bin_type=True)
+        out = bytearray()
+        _pack(value, out)
+        return bytes(out)
+
+    @staticmethod
+    def json_response(value, status_code: int = 200) -> Response:
+        """JSON sem validação de modelo nem jsonable_encoder"""
+        return Response(
+            content=ResponseEncoder.dumps_json(value),
+            status_code=status_code,
+            media_type=MEDIA_TYPES[JSON]
+        )
+
+    @staticmethod
+    def respond(payload: dict, response_format: ResponseFormat, items_field: str) -> Response:
+        """
+        Resposta no formato negociado. Em NDJSON, a primeira linha traz os campos
+        do envelope (sem items_field, mais "count") e cada linha seguinte é um item.
+        """
+        headers = {"Vary": "Accept, Accept-Encoding"}
+        if response_format.format == NDJSON:
+            items = payload.get(items_field) or []
+            header = {key: value for key, value in payload.items() if key != items_field}
+            header["count"] = len(items)
+            chunks = ResponseEncoder._ndjson_chunks(header, items)
+            if response_format.gzip and ResponseEncoder.GZIP_MIN_BYTES > 0:
+                chunks = ResponseEncoder.gzip_chunks(chunks)
+                headers["Content-Encoding"] = "gzip"
+            return StreamingResponse(chunks, media_type=response_format.media_type, headers=headers)
+
+        if response_format.format == MSGPACK:
+            body = ResponseEncoder.dumps_msgpack(payload)
+        else:
+            body = ResponseEncoder.dumps_json(payload)
+        if (
+            response_format.gzip
+            and ResponseEncoder.GZIP_MIN_BYTES > 0
+            and len(body) >= ResponseEncoder.GZIP_MIN_BYTES
+        ):
+            body = gzip.compress(body, compresslevel=ResponseEncoder.GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type=response_format.media_type, headers=headers)
+
+    @staticmethod
+    def _ndjson_chunks(header: dict, items: List[dict]) -> Iterator[bytes]:
+        dumps = ResponseEncoder.dumps_json
+        yield dumps(header) + b"\n"
+        batch = max(1, ResponseEncoder.NDJSON_BATCH)
+        for start in range(0, len(items), batch):
+            yield b"".join(dumps(item) + b"\n" for item in items[start:start + batch])
+
+    @staticmethod
+    def gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+        # Z_SYNC_FLUSH por bloco: o cliente descomprime linha a linha conforme chega
+        compressor = zlib.compressobj(ResponseEncoder.GZIP_LEVEL, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
@@ -0,0 +1,173 @@
+"""
+Serviço de reconstrução do inventário em um instante passado:
+- Fotos periódicas compactas (device_id -> slot_id)
+- Consulta "as-of": carrega a foto mais próxima e reaplica apenas
+  os movimentos posteriores a ela
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from models.database import SessionLocal
+from models.device import Device
+from models.movement import Movement, MovementType
+from models.inventory_snapshot import InventorySnapshot
+from services.movement_archive_service import MovementArchiveService
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Fotos são imutáveis: cache pequeno de fotos já decodificadas (id -> mapa)
+_snapshot_cache: "OrderedDict[int, Dict[str, int]]" = OrderedDict()
+_snapshot_cache_lock = threading.Lock()
+_SNAPSHOT_CACHE_SIZE = 4
+
+
+class InventorySnapshotService:
+    """Gerencia fotos do inventário e consultas em um instante passado"""
+
+    INTERVAL_SEC = int(os.getenv("INVENTORY_SNAPSHOT_INTERVAL_SEC", "3600"))  # 0 = desativado
+    KEEP = int(os.getenv("INVENTORY_SNAPSHOT_KEEP", "720"))  # 0 = manter todas
+
+    @staticmethod
+    def take_snapshot(db: Session, force: bool = False) -> Optional[InventorySnapshot]:
+        """
+        Grava uma foto do mapa device -> slot atual.
+        Estado dos devices e último movimento são lidos na mesma transação.
+        Sem force, não grava se nenhum movimento ocorreu desde a última foto.
+        """
+        last_movement_id = db.query(func.max(Movement.id)).scalar() or 0
+
+        if not force:
+            latest = db.query(InventorySnapshot.last_movement_id).order_by(
+                InventorySnapshot.id.desc()
+            ).first()
+            if latest and latest[0] == last_movement_id:
+                return None
+
+        data = {
+            device_id: slot_id
+            for device_id, slot_id in db.query(Device.device_id, Device.slot_id).filter(
+                Device.slot_id.isnot(None)
+            )
+        }
+
+        try:
+            snapshot = InventorySnapshot(
+                last_movement_id=last_movement_id,
+                device_count=len(data),
+                data=data
+            )
+            db.add(snapshot)
+            db.flush()
+            InventorySnapshotService._prune(db)
+            db.commit()
+            return snapshot
+        except Exception:
+            db.rollback()
+            raise
+
+    @staticmethod
+    def _prune(db: Session) -> None:
+        """Remove as fotos mais antigas além de KEEP"""
+        keep = InventorySnapshotService.KEEP
+        if keep <= 0:
+            return
+        threshold = db.query(InventorySnapshot.id).order_by(
+            InventorySnapshot.id.desc()
+        ).offset(keep - 1).limit(1).scalar()
+        if threshold:
+            db.query(InventorySnapshot).filter(
+                InventorySnapshot.id < threshold
+            ).delete(synchronize_session=False)
+
+    @staticmethod
+    def _load_snapshot(db: Session, as_of: datetime) -> Tuple[Optional[InventorySnapshot], Dict[str, int]]:
+        """Carrega a foto mais recente com ts <= as_of (decodificada e em cache)"""
+        snapshot = db.query(InventorySnapshot).filter(
+            InventorySnapshot.ts <= as_of
+        ).order_by(InventorySnapshot.ts.desc(), InventorySnapshot.id.desc()).first()
+
+        if snapshot is None:
+            return None, {}
+
+        with _snapshot_cache_lock:
+            cached = _snapshot_cache.get(snapshot.id)
+            if cached is not None:
+                _snapshot_cache.move_to_end(snapshot.id)
+                return snapshot, dict(cached)
+
+        data = {device_id: int(slot_id) for device_id, slot_id in (snapshot.data or {}).items()}
+        with _snapshot_cache_lock:
+            _snapshot_cache[snapshot.id] = data
+            while len(_snapshot_cache) > _SNAPSHOT_CACHE_SIZE:
+                _snapshot_cache.popitem(last=False)
+        return snapshot, dict(data)
+
+    @staticmethod
+    def inventory_as_of(db: Session, as_of: datetime) -> dict:
+        """
+        Reconstrói o mapa device_id -> slot_id no instante as_of
+
+        Retorna:
+            {
+                "as_of": datetime,
+                "snapshot_id": int | None,
+                "replayed_movements": int,
+                "devices": {device_id: slot_id}
+            }
+        """
+        snapshot, devices = InventorySnapshotService._load_snapshot(db, as_of)
+
+        movements = MovementArchiveService.query_movements(
+            db,
+            since=snapshot.ts if snapshot else None,
+            until=as_of,
+            limit=None,
+            ascending=True,
+            after_id=snapshot.last_movement_id if snapshot else None
+        )
+        movements.sort(key=lambda m: m["id"])
+
+        for movement in movements:
+            movement_type = movement["type"]
+            if movement_type == MovementType.CHECK_IN.value and movement["to_slot_id"]:
+                devices[movement["device_id"]] = movement["to_slot_id"]
+            elif movement_type == MovementType.CHECK_OUT.value:
+                devices.pop(movement["device_id"], None)
+            # MOVE/RESERVE/RELEASE apenas mudam status, não a posição
+
+        return {
+            "as_of": as_of,
+            "snapshot_id": snapshot.id if snapshot else None,
+            "replayed_movements": len(movements),
+            "devices": devices
+        }
+
+
+async def run_snapshotter(interval_sec: Optional[int] = None) -> None:
+    """Loop em background que grava fotos periódicas (thread separada)"""
+    interval_sec = interval_sec or InventorySnapshotService.INTERVAL_SEC
+
+    def _snapshot_once():
+        db = SessionLocal()
+        try:
+            return InventorySnapshotService.take_snapshot(db)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            await asyncio.to_thread(_snapshot_once)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Erro ao gravar foto do inventário")
+        await asyncio.sleep(interval_sec)
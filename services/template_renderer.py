@@ -0,0 +1,76 @@
+"""
+Renderização de templates Jinja2:
+- Cache de bytecode em disco (templates compilados sobrevivem ao restart)
+- Pré-compilação de todos os templates na startup
+- Renderização em streaming (generate() → StreamingResponse) para parciais
+  grandes: o HTML sai em blocos conforme é gerado, sem montar a string inteira
+"""
+from fastapi.responses import HTMLResponse, StreamingResponse
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+import logging
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateRenderer:
+    """Ambiente Jinja2 compartilhado e respostas HTML (completas ou em streaming)"""
+
+    TEMPLATE_DIR = os.getenv("TEMPLATE_DIR", "templates")
+    CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", "storage/template_cache")  # vazio = sem cache em disco
+    # Verificar alterações nos arquivos a cada uso (desligar em produção)
+    AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "1") == "1"
+    # Blocos de saída agrupados por envio no streaming
+    STREAM_BUFFER = int(os.getenv("TEMPLATE_STREAM_BUFFER", "64"))
+
+    _env = None
+
+    @staticmethod
+    def env() -> Environment:
+        if TemplateRenderer._env is None:
+            bytecode_cache = None
+            if TemplateRenderer.CACHE_DIR:
+                os.makedirs(TemplateRenderer.CACHE_DIR, exist_ok=True)
+                bytecode_cache = FileSystemBytecodeCache(TemplateRenderer.CACHE_DIR)
+            TemplateRenderer._env = Environment(
+                loader=FileSystemLoader(TemplateRenderer.TEMPLATE_DIR),
+                bytecode_cache=bytecode_cache,
+                auto_reload=TemplateRenderer.AUTO_RELOAD,
+                cache_size=-1,  # manter todos os templates compilados em memória
+            )
+        return TemplateRenderer._env
+
+    @staticmethod
+    def precompile() -> int:
+        """Compila todos os templates (memória + cache de bytecode); retorna a quantidade"""
+        env = TemplateRenderer.env()
+        names = env.list_templates(extensions=["html"])
+        for name in names:
+            env.get_template(name)
+        logger.info("Templates pré-compilados: %d", len(names))
+        return len(names)
+
+    @staticmethod
+    def render(template_name: str, context: dict) -> HTMLResponse:
+        """Renderiza o template inteiro e retorna HTMLResponse"""
+        template = TemplateRenderer.env().get_template(template_name)
+        return HTMLResponse(content=template.render(**context))
+
+    @staticmethod
+    def stream(template_name: str, context: dict) -> StreamingResponse:
+        """
+        Renderiza em streaming: o gerador do Jinja2 é consumido pelo threadpool
+        do Starlette, então o loop de eventos não fica bloqueado e a memória
+        por requisição se limita ao bloco em envio.
+        """
+        template = TemplateRenderer.env().get_template(template_name)
+        stream = template.stream(**context)
+        if TemplateRenderer.STREAM_BUFFER > 1:
+            stream.enable_buffering(TemplateRenderer.STREAM_BUFFER)
+        return StreamingResponse(
+            (chunk.encode("utf-8") for chunk in stream),
+            media_type="text/html"
+        )
@@ -0,0 +1,222 @@
+"""
+Registro imutável da topologia (geometria dos slots), carregado uma vez por processo:
+- Arrays compactos (struct-of-arrays) indexados pela posição do slot; com ids
+  contíguos, id → posição é aritmético, senão um dicionário
+- Codec O(1) human_code ↔ id
+- SlotRecord (__slots__) com os mesmos atributos de geometria de Slot, aceito
+  pelo DistanceService no lugar do objeto ORM
+- Recarga atômica: uma nova Topology é montada e trocada por referência quando a
+  impressão digital da tabela de slots muda (verificada pelo watcher em background)
+
+Ocupação não faz parte do registro: continua vindo do banco.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from models.database import SessionLocal
+from models.aisle import Aisle
+from models.shelf import Shelf
+from models.slot import Slot
+from services.codecs import row_to_letter
+from array import array
+from typing import Dict, Iterator, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def format_human_code(rua, prateleira: str, linha: int, coluna: int) -> str:
+    """Código humano do slot: R{rua}-{prateleira}-{letra da linha}-C{coluna}"""
+    return f"R{rua}-{prateleira}-{row_to_letter(linha)}-C{coluna}"
+
+
+class SlotRecord:
+    """Geometria de um slot (somente leitura)"""
+
+    __slots__ = ("id", "aisle_id", "shelf_id", "row_index", "col_index", "human_code")
+
+    def __init__(self, id: int, aisle_id: int, shelf_id: int, row_index: int, col_index: int, human_code: str):
+        self.id = id
+        self.aisle_id = aisle_id
+        self.shelf_id = shelf_id
+        self.row_index = row_index
+        self.col_index = col_index
+        self.human_code = human_code
+
+    def __repr__(self) -> str:
+        return f"SlotRecord({self.id}, {self.human_code})"
+
+
+class Topology:
+    """Foto imutável da geometria de todos os slots"""
+
+    __slots__ = (
+        "fingerprint", "slot_ids", "aisle_ids", "shelf_ids", "rows", "cols",
+        "human_codes", "_offset", "_position", "_by_code",
+    )
+
+    def __init__(self, fingerprint: str, rows_iter):
+        self.fingerprint = fingerprint
+        self.slot_ids = array("i")
+        self.aisle_ids = array("i")
+        self.shelf_ids = array("i")
+        self.rows = array("i")
+        self.cols = array("i")
+        self.human_codes = []
+        for slot_id, aisle_id, shelf_id, row, col, human_code in rows_iter:
+            self.slot_ids.append(slot_id)
+            self.aisle_ids.append(aisle_id)
+            self.shelf_ids.append(shelf_id)
+            self.rows.append(row)
+            self.cols.append(col)
+            self.human_codes.append(human_code)
+
+        # ids contíguos (caso normal do seed): posição = id - primeiro id
+        n = len(self.slot_ids)
+        contiguous = n > 0 and self.slot_ids[-1] - self.slot_ids[0] == n - 1
+        self._offset = self.slot_ids[0] if contiguous else None
+        self._position: Optional[Dict[int, int]] = (
+            None if contiguous else {slot_id: i for i, slot_id in enumerate(self.slot_ids)}
+        )
+        self._by_code: Dict[str, int] = {code: i for i, code in enumerate(self.human_codes)}
+
+    def __len__(self) -> int:
+        return len(self.slot_ids)
+
+    def __contains__(self, slot_id: int) -> bool:
+        return self.position(slot_id) is not None
+
+    def position(self, slot_id: int) -> Optional[int]:
+        if self._offset is not None:
+            i = slot_id - self._offset
+            return i if 0 <= i < len(self.slot_ids) else None
+        return self._position.get(slot_id)
+
+    def slot(self, slot_id: int) -> Optional[SlotRecord]:
+        i = self.position(slot_id)
+        if i is None:
+            return None
+        return SlotRecord(
+            self.slot_ids[i], self.aisle_ids[i], self.shelf_ids[i],
+            self.rows[i], self.cols[i], self.human_codes[i]
+        )
+
+    def coords(self, slot_id: int) -> Optional[Tuple[int, int, int, int]]:
+        """(aisle_id, shelf_id, row_index, col_index) do slot"""
+        i = self.position(slot_id)
+        if i is None:
+            return None
+        return self.aisle_ids[i], self.shelf_ids[i], self.rows[i], self.cols[i]
+
+    def id_for_code(self, human_code: str) -> Optional[int]:
+        i = self._by_code.get(human_code)
+        return self.slot_ids[i] if i is not None else None
+
+    def code_for_id(self, slot_id: int) -> Optional[str]:
+        i = self.position(slot_id)
+        return self.human_codes[i] if i is not None else None
+
+    def slot_by_code(self, human_code: str) -> Optional[SlotRecord]:
+        slot_id = self.id_for_code(human_code)
+        return self.slot(slot_id) if slot_id is not None else None
+
+    def iter_coords(self) -> Iterator[Tuple[int, int, int, int, int]]:
+        """(slot_id, aisle_id, shelf_id, row_index, col_index) de todos os slots, por id"""
+        return zip(self.slot_ids, self.aisle_ids, self.shelf_ids, self.rows, self.cols)
+
+
+class TopologyRegistry:
+    """Topologia corrente do processo (carregada sob demanda, trocada atomicamente)"""
+
+    CHECK_INTERVAL_SEC = int(os.getenv("TOPOLOGY_CHECK_INTERVAL_SEC", "30"))  # 0 = sem watcher
+
+    _current: Optional[Topology] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(db: Session) -> str:
+        """Impressão digital barata da geometria (contagens, faixas de id e soma ponderada)"""
+        slots = db.query(
+            func.count(Slot.id), func.min(Slot.id), func.max(Slot.id),
+            func.sum(Slot.aisle_id * 1000003 + Slot.shelf_id * 10007 + Slot.row_index * 101 + Slot.col_index)
+        ).one()
+        shelves = db.query(func.count(Shelf.id), func.max(Shelf.id)).one()
+        aisles = db.query(func.count(Aisle.id), func.max(Aisle.id)).one()
+        payload = (tuple(slots), tuple(shelves), tuple(aisles))
+        return hashlib.sha1(repr(payload).encode("utf-8")).hexdigest()[:12]
+
+    @staticmethod
+    def load(db: Session) -> Topology:
+        """Monta uma nova Topology com uma única consulta de colunas e a publica"""
+        with TopologyRegistry._lock:
+            topology = Topology(
+                TopologyRegistry.fingerprint(db),
+                db.query(
+                    Slot.id, Slot.aisle_id, Slot.shelf_id, Slot.row_index, Slot.col_index, Slot.human_code
+                ).order_by(Slot.id)
+            )
+            TopologyRegistry._current = topology
+        logger.info("Topologia carregada: %d slots (%s)", len(topology), topology.fingerprint)
+        return topology
+
+    @staticmethod
+    def get(db: Optional[Session] = None) -> Topology:
+        """Topologia corrente; carrega na primeira chamada (com db ou sessão própria)"""
+        topology = TopologyRegistry._current
+        if topology is not None:
+            return topology
+        if db is not None:
+            return TopologyRegistry.load(db)
+        db = SessionLocal()
+        try:
+            return TopologyRegistry.load(db)
+        finally:
+            db.close()
+
+    @staticmethod
+    def refresh(db: Session) -> bool:
+        """Recarrega se a geometria mudou; retorna True quando trocou a topologia"""
+        current = TopologyRegistry._current
+        if current is not None and current.fingerprint == TopologyRegistry.fingerprint(db):
+            return False
+        TopologyRegistry.load(db)
+        return current is not None
+
+    @staticmethod
+    def clear() -> None:
+        with TopologyRegistry._lock:
+            TopologyRegistry._current = None
+
+
+async def run_topology_watcher(interval_sec: Optional[int] = None) -> None:
+    """Verifica periodicamente a impressão digital e recarrega topologia e layout"""
+    interval_sec = interval_sec or TopologyRegistry.CHECK_INTERVAL_SEC
+
+    def _check_once() -> None:
+        db = SessionLocal()
+        try:
+            if TopologyRegistry.refresh(db):
+                logger.info("Topologia alterada: recarregada")
+                from services.distance_service import DistanceService
+                from services.nearest_slot_service import NearestSlotService
+                if DistanceService.DISTANCE_MODEL == "layout":
+                    from services.layout_service import LayoutService
+                    DistanceService.set_layout(LayoutService.load_or_build(db))
+                NearestSlotService.clear_cache()
+        finally:
+            db.close()
+
+    while True:
+        await asyncio.sleep(interval_sec)
+        try:
+            await asyncio.to_thread(_check_once)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Erro ao verificar a topologia")
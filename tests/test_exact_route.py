@@ -0,0 +1,114 @@
+"""
+Solver exato de rotas (PickingService.exact_route) contra força bruta:
+rotas curtas aleatórias, com e sem perfil de custo, e o limite de tempo
+"""
+from itertools import permutations
+import random
+
+import pytest
+
+from models.slot import Slot
+from services.cost_profile_service import BUILTIN_PROFILES, CostProfile, CostProfileService
+from services.distance_service import DistanceService
+from services.picking_service import PickingService
+
+AISLES = 3
+SHELVES_PER_AISLE = 2
+ROWS = 24
+COLS = 40
+
+
+@pytest.fixture(autouse=True)
+def manhattan():
+    """Modelo de distância sem layout físico (independe do ambiente)"""
+    layout = DistanceService.layout()
+    DistanceService.set_layout(None)
+    yield
+    DistanceService.set_layout(layout)
+
+
+def _profiles():
+    base = CostProfileService.default_profile()
+    profiles = {"none": None, "default": base}
+    for name, spec in BUILTIN_PROFILES.items():
+        profiles[name] = CostProfile.from_spec(name, spec, base)
+    return profiles
+
+
+def _random_slots(rng: random.Random, count: int):
+    """count + 1 slots distintos (o primeiro é o ponto de partida)"""
+    coords = set()
+    while len(coords) < count + 1:
+        aisle = rng.randint(1, AISLES)
+        shelf = (aisle - 1) * SHELVES_PER_AISLE + rng.randint(1, SHELVES_PER_AISLE)
+        coords.add((aisle, shelf, rng.randint(1, ROWS), rng.randint(1, COLS)))
+    slots = [
+        Slot(id=i, aisle_id=aisle, shelf_id=shelf, row_index=row, col_index=col)
+        for i, (aisle, shelf, row, col) in enumerate(sorted(coords), start=1)
+    ]
+    rng.shuffle(slots)
+    return slots[0], slots[1:]
+
+
+def _cost(start, route, profile) -> float:
+    points = [start] + list(route)
+    return sum(
+        DistanceService.calculate_distance(a, b, profile) for a, b in zip(points, points[1:])
+    )
+
+
+def _brute_force(start, stops, profile) -> float:
+    """Menor custo entre todas as ordens das paradas (matriz calculada uma vez)"""
+    points = [start] + list(stops)
+    dist = [[DistanceService.calculate_distance(a, b, profile) for b in points] for a in points]
+    best = float("inf")
+    for order in permutations(range(1, len(points))):
+        cost = dist[0][order[0]]
+        for a, b in zip(order, order[1:]):
+            cost += dist[a][b]
+        best = min(best, cost)
+    return best
+
+
+@pytest.mark.parametrize("profile_name", sorted(_profiles()))
+def test_matches_brute_force(profile_name):
+    profile = _profiles()[profile_name]
+    rng = random.Random(f"exact-{profile_name}")
+    for _ in range(30):
+        start, stops = _random_slots(rng, rng.randint(3, 8))
+        incumbent = PickingService.nearest_neighbor_route(start, stops, profile)
+
+        route, optimal = PickingService.exact_route(start, incumbent, profile, max_time_sec=10)
+
+        assert optimal
+        assert sorted(slot.id for slot in route) == sorted(slot.id for slot in stops)
+        assert _cost(start, route, profile) == pytest.approx(_brute_force(start, stops, profile))
+
+
+@pytest.mark.parametrize("profile_name", ["none", "walking"])
+def test_time_cap_never_worse_than_incumbent(profile_name):
+    profile = _profiles()[profile_name]
+    rng = random.Random(f"cap-{profile_name}")
+    capped = 0
+    for _ in range(10):
+        start, stops = _random_slots(rng, 14)
+        nn_route = PickingService.nearest_neighbor_route(start, stops, profile)
+        # Incumbente ruim também: a busca interrompida nunca piora o que recebeu
+        shuffled = list(stops)
+        rng.shuffle(shuffled)
+
+        for incumbent in (nn_route, shuffled):
+            route, optimal = PickingService.exact_route(start, incumbent, profile, max_time_sec=0)
+
+            capped += not optimal
+            assert sorted(slot.id for slot in route) == sorted(slot.id for slot in stops)
+            assert _cost(start, route, profile) <= _cost(start, incumbent, profile) + 1e-9
+
+    # Com limite zero, a busca para na primeira verificação de tempo (256 nós)
+    assert capped > 0, capped
+
+
+def test_trivial_routes_are_optimal():
+    start, stops = _random_slots(random.Random(0), 1)
+    assert PickingService.exact_route(start, [], max_time_sec=0) == ([], True)
+    assert PickingService.exact_route(start, stops, max_time_sec=0) == (stops, True)